@@ -0,0 +1,308 @@
+"""
+JSON API for NetMaster, under /api/v1.
+
+    GET /api/v1/subnets?network=10.0.0.0/16&hosts=500
+    GET /api/v1/subnets?network=10.0.0.0/16&vlans=10:Servers;20:Voice;30:Guests
+
+The result rows are those of the web calculator (plan_host_subnet and
+plan_vlan_subnets), with the same validation and error messages. A result
+depends on nothing but the URL, so responses are public and cacheable for
+API_CACHE_MAX_AGE seconds: repeat queries can be answered by the browser,
+the reverse proxy or a CDN without reaching a worker. Each response has a
+strong ETag (a hash of the body), so an expired entry is revalidated with
+a 304 instead of a new body. Errors are not cached.
+
+Everything else needs a personal API token, created on the profile page
+and sent as "Authorization: Bearer nm_...":
+
+    POST   /api/v1/calculations       {"network_ip", "num_hosts"} or {"network_ip", "vlan_mode": true, "vlans"}
+    GET    /api/v1/notes?page=1&per_page=50
+    POST   /api/v1/notes              {"title", "content"}
+    GET    /api/v1/notes/<id>
+    PUT    /api/v1/notes/<id>         {"title", "content"}, saved as a new revision
+    DELETE /api/v1/notes/<id>
+
+Scripts do not need the browser machinery for this. API requests never
+open the session cookie (ApiSessionInterface), are exempt from CSRF, and
+do not get the page security headers. A token is checked against an
+in-memory index of all tokens, keyed by the token's selector. The index
+is reloaded from the database every API_TOKEN_CACHE_TTL seconds and at
+once when this worker creates or revokes a token, so a request costs one
+dict lookup, one SHA-256 and a constant-time comparison. Authenticated
+requests are rate limited per token (API_TOKEN_RATE_LIMIT), and
+anonymous ones per client address (API_RATE_LIMIT).
+
+Configuration:
+    API_CACHE_MAX_AGE     Cache lifetime of API results in seconds (default: 31536000, one year)
+    API_RATE_LIMIT        Flask-Limiter limit for each client address (default: "600 per minute")
+    API_TOKEN_RATE_LIMIT  Flask-Limiter limit for each token (default: "1200 per minute")
+    API_TOKEN_CACHE_TTL   Seconds before the token index is reloaded (default: 30)
+"""
+
+import hmac
+import time
+import hashlib
+import threading
+from flask import Blueprint, current_app, jsonify, request, g
+from flask.sessions import SecureCookieSessionInterface
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+# Endpoints that need no token
+PUBLIC_ENDPOINTS = {'api.subnets'}
+MAX_PER_PAGE = 100
+
+
+class ApiSessionInterface(SecureCookieSessionInterface):
+    """The usual cookie session, except that API requests get none at all"""
+
+    def open_session(self, app, request):
+        if request.path.startswith(bp.url_prefix + '/'):
+            # A null session is neither decoded nor saved, so no Set-Cookie or Vary: Cookie
+            return self.make_null_session(app)
+        return super().open_session(app, request)
+
+
+class TokenIndex:
+    """selector -> (token id, user id, secret hash) for every API token in the database"""
+
+    def __init__(self):
+        self._tokens = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._tokens = None
+
+    def lookup(self, selector):
+        tokens = self._tokens
+        if tokens is None or time.monotonic() - self._loaded_at > current_app.config['API_TOKEN_CACHE_TTL']:
+            tokens = self._load()
+        return tokens.get(selector)
+
+    def _load(self):
+        from app import db, ApiToken
+
+        with self._lock:
+            rows = db.session.query(ApiToken.selector, ApiToken.id, ApiToken.user_id, ApiToken.secret_hash).all()
+            self._tokens = {row.selector: (row.id, row.user_id, row.secret_hash) for row in rows}
+            self._loaded_at = time.monotonic()
+            return self._tokens
+
+
+api_tokens_index = TokenIndex()
+# Compared against when the selector is unknown, so both cases take the same work
+_NO_SECRET_HASH = hashlib.sha256(b'').hexdigest()
+
+
+def current_api_token():
+    """(token id, user id) for the request's bearer token, or None; checked once per request"""
+    if 'api_token' not in g:
+        g.api_token = _authenticate(request.headers.get('Authorization', ''))
+    return g.api_token
+
+
+def _authenticate(header):
+    scheme, _, token = header.partition(' ')
+    if scheme.lower() != 'bearer':
+        return None
+    prefix, _, rest = token.strip().partition('_')
+    selector, _, secret = rest.partition('_')
+    if prefix != 'nm' or not selector or not secret:
+        return None
+    entry = api_tokens_index.lookup(selector)
+    secret_hash = hashlib.sha256(secret.encode()).hexdigest()
+    if not hmac.compare_digest(secret_hash, entry[2] if entry else _NO_SECRET_HASH) or entry is None:
+        return None
+    return entry[0], entry[1]
+
+
+def token_rate_limit_key():
+    token = current_api_token()
+    return f'api-token:{token[0]}' if token else None
+
+
+def has_api_token():
+    return current_api_token() is not None
+
+
+@bp.before_request
+def require_token():
+    if request.endpoint in PUBLIC_ENDPOINTS:
+        return None
+    if current_api_token() is None:
+        response = jsonify({'status': 'error', 'message': 'A valid API token is required.'})
+        response.status_code = 401
+        response.headers['WWW-Authenticate'] = 'Bearer'
+        return response
+    return None
+
+
+def cacheable(response):
+    """Mark a response public and long-lived, with a strong ETag of its body"""
+    response.set_etag(hashlib.sha256(response.get_data()).hexdigest()[:32])
+    response.headers['Cache-Control'] = f"public, max-age={current_app.config['API_CACHE_MAX_AGE']}"
+    return response.make_conditional(request)
+
+
+@bp.route('/subnets')
+def subnets():
+    """Subnet plan for ?network= with either ?hosts= or ?vlans=id:name;id:name"""
+    from app import (plan_host_subnet, plan_vlan_subnets, parse_vlans, validate_vlans, validate_num_hosts,
+                     SubnetCalculationError)
+
+    network_ip = request.args.get('network', '').strip()
+    hosts = request.args.get('hosts')
+    vlans = request.args.get('vlans')
+    try:
+        if not network_ip:
+            raise SubnetCalculationError('network is required')
+        if (hosts is None) == (vlans is None):
+            raise SubnetCalculationError('Give either hosts or vlans')
+        if vlans is not None:
+            results = list(plan_vlan_subnets(network_ip, validate_vlans(parse_vlans(vlans))))
+            body = {'status': 'success', 'mode': 'vlan', 'network': network_ip, 'results': results}
+        else:
+            num_hosts = validate_num_hosts(hosts)
+            results = plan_host_subnet(network_ip, num_hosts)
+            body = {'status': 'success', 'mode': 'host', 'network': network_ip, 'hosts': num_hosts,
+                    'results': results}
+    except SubnetCalculationError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"API subnet calculation error: {str(e)}")
+        return jsonify({'status': 'error', 'message': 'An unexpected error occurred'}), 500
+    return cacheable(jsonify(body))
+
+
+@bp.route('/calculations', methods=['POST'])
+def calculations():
+    """Run a calculation, record it in the token owner's history, and return the rows"""
+    from app import (db, User, plan_host_subnet, plan_vlan_subnets, read_calculation_request, record_calculation,
+                     SubnetCalculationError)
+
+    if not isinstance(request.get_json(silent=True), dict):
+        return jsonify({'status': 'error', 'message': 'Send the calculation as a JSON object.'}), 400
+    try:
+        network_ip, vlans, num_hosts = read_calculation_request()
+        if vlans is not None:
+            results = list(plan_vlan_subnets(network_ip, vlans))
+        else:
+            results = plan_host_subnet(network_ip, num_hosts)
+        user_id = g.api_token[1]
+        auto_save = db.session.query(User.auto_save_results).filter_by(id=user_id).scalar() == 'always'
+        record_calculation(network_ip, vlans, num_hosts, results, user_id, auto_save)
+        return jsonify({'status': 'success', 'results': results, 'saved_note': auto_save})
+    except SubnetCalculationError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"API calculation error: {str(e)}")
+        return jsonify({'status': 'error', 'message': 'An unexpected error occurred'}), 500
+
+
+def note_json(note):
+    return {
+        'id': note.id,
+        'title': note.title,
+        'content': note.content,
+        'created_at': note.created_at.isoformat() if note.created_at else None,
+        'updated_at': note.updated_at.isoformat() if note.updated_at else None,
+    }
+
+
+def read_note():
+    """Sanitized (title, content) from the JSON body, or (None, error response)"""
+    from app import sanitize_input
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return None, (jsonify({'status': 'error', 'message': 'Send the note as a JSON object.'}), 400)
+    title = sanitize_input(str(data.get('title') or '').strip())
+    content = sanitize_input(str(data.get('content') or '').strip())
+    if not title or not content:
+        return None, (jsonify({'status': 'error', 'message': 'Title and content are required.'}), 400)
+    if len(title) > 200:
+        return None, (jsonify({'status': 'error', 'message': 'Title must be at most 200 characters.'}), 400)
+    return (title, content), None
+
+
+def owned_note(note_id):
+    from app import Note
+
+    note = Note.get_by_id(note_id)
+    if note is None or note.user_id != g.api_token[1]:
+        return None
+    return note
+
+
+def note_not_found():
+    return jsonify({'status': 'error', 'message': 'Note not found.'}), 404
+
+
+@bp.route('/notes', methods=['GET'])
+def list_notes():
+    from app import Note
+
+    page = max(1, request.args.get('page', 1, type=int))
+    per_page = min(MAX_PER_PAGE, max(1, request.args.get('per_page', 20, type=int)))
+    pagination = Note.get_all_paginated(page, per_page, g.api_token[1])
+    return jsonify({
+        'status': 'success',
+        'notes': [note_json(note) for note in pagination.items],
+        'page': page,
+        'per_page': per_page,
+        'total': pagination.total,
+    })
+
+
+@bp.route('/notes', methods=['POST'])
+def create_note():
+    from app import Note
+
+    fields, error = read_note()
+    if error:
+        return error
+    title, content = fields
+    try:
+        note = Note(title=title, content=content, user_id=g.api_token[1]).save()
+    except Exception as e:
+        current_app.logger.error(f"API error creating note: {str(e)}")
+        return jsonify({'status': 'error', 'message': 'Failed to create note.'}), 500
+    return jsonify({'status': 'success', 'note': note_json(note)}), 201
+
+
+@bp.route('/notes/<int:note_id>', methods=['GET'])
+def get_note(note_id):
+    note = owned_note(note_id)
+    if note is None:
+        return note_not_found()
+    return jsonify({'status': 'success', 'note': note_json(note)})
+
+
+@bp.route('/notes/<int:note_id>', methods=['PUT'])
+def update_note(note_id):
+    note = owned_note(note_id)
+    if note is None:
+        return note_not_found()
+    fields, error = read_note()
+    if error:
+        return error
+    try:
+        note.revise(*fields)
+    except Exception as e:
+        current_app.logger.error(f"API error updating note: {str(e)}")
+        return jsonify({'status': 'error', 'message': 'Failed to update note.'}), 500
+    return jsonify({'status': 'success', 'note': note_json(note)})
+
+
+@bp.route('/notes/<int:note_id>', methods=['DELETE'])
+def delete_note(note_id):
+    note = owned_note(note_id)
+    if note is None:
+        return note_not_found()
+    try:
+        note.delete()
+    except Exception as e:
+        current_app.logger.error(f"API error deleting note: {str(e)}")
+        return jsonify({'status': 'error', 'message': 'Failed to delete note.'}), 500
+    return jsonify({'status': 'success', 'message': 'Note deleted.'})
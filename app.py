@@ -1,4 +1,6 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify, flash, send_from_directory, session
+from flask import Flask, Blueprint, current_app, render_template, request, redirect, url_for, jsonify, flash, send_from_directory, session
+from jinja2 import FileSystemBytecodeCache
+import click
 import ipaddress
 import math
 import re
@@ -7,23 +9,40 @@ from datetime import datetime, timezone
 import sqlite3
 from flask_sqlalchemy import SQLAlchemy
 import secrets
+import hashlib
+import threading
+from sqlalchemy import func, case
 from sqlalchemy.exc import SQLAlchemyError, OperationalError, TimeoutError
 from contextlib import contextmanager
 import time
 import json
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from flask_wtf.csrf import CSRFProtect, CSRFError
-from werkzeug.security import generate_password_hash, check_password_hash
-import bleach
 from functools import wraps
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from flask_migrate import Migrate
+from flask_limiter.errors import RateLimitExceeded
+import limiter_storage  # noqa: F401  registers the sqlite:// rate limit storage
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+from password_hashing import hasher, PasswordHashingBusyError
+from page_cache import page_cache
+from metrics import metrics, bp as metrics_bp
+from write_behind import write_buffer
+from profiling import profiler, bp as profiling_bp
+from health import health, disk_space_check, bp as health_bp
+from provisioning import bp as provisioning_bp
+from api import bp as api_bp, api_tokens_index, ApiSessionInterface, has_api_token, token_rate_limit_key
+from sanitize import sanitize_input, sanitize_many
+import revisions
+import assets
+import query_stats
+import compression
+import cli
+
 # Custom exceptions for subnet calculation
 class SubnetCalculationError(Exception):
     """Base exception for subnet calculation errors"""
@@ -45,37 +64,38 @@ class NetworkSizeError(SubnetCalculationError):
     """Raised when network size is invalid"""
     pass
 
-app = Flask(__name__, static_folder='static')
-# Use environment variable for secret key, raise error if not set in production
-if os.environ.get('FLASK_ENV') == 'production':
-    if not os.environ.get('FLASK_SECRET_KEY'):
-        raise RuntimeError('FLASK_SECRET_KEY environment variable must be set in production!')
-    app.secret_key = os.environ['FLASK_SECRET_KEY']
-else:
-    app.secret_key = os.environ.get('FLASK_SECRET_KEY')
-    if not app.secret_key:
-        raise RuntimeError('FLASK_SECRET_KEY environment variable must be set!')
+# Extensions are created unbound and attached to an app in create_app()
+db = SQLAlchemy()
+csrf = CSRFProtect()
+login_manager = LoginManager()
+login_manager.login_view = 'main.login'
+login_manager.login_message = 'Please log in to access this page.'
+
+# Rate limit counters live in a SQLite file shared by every worker on the host
+# unless RATELIMIT_STORAGE_URI points elsewhere (e.g. redis://...). The storage
+# is connected on first use, not when the app is created.
+limiter = Limiter(
+    key_func=get_remote_address,
+    default_limits=["200 per day", "50 per hour"]
+)
+
+bp = Blueprint('main', __name__)
 
 # Add escapejs filter
-@app.template_filter('escapejs')
+@bp.app_template_filter('escapejs')
 def escapejs_filter(s):
     if s is None:
         return ''
     return str(s).replace('\\', '\\\\').replace("'", "\\'").replace('"', '\\"').replace('\n', '\\n')
 
-# Security configurations
-app.config['SESSION_COOKIE_SECURE'] = os.environ.get('FLASK_ENV') == 'production'
-app.config['SESSION_COOKIE_HTTPONLY'] = True
-app.config['PERMANENT_SESSION_LIFETIME'] = 3600  # 1 hour
-app.config['WTF_CSRF_ENABLED'] = True
-app.config['WTF_CSRF_TIME_LIMIT'] = 3600  # 1 hour
-app.config['SESSION_COOKIE_SAMESITE'] = "Lax"
-
 # Additional security headers
-@app.after_request
+@bp.after_app_request
 def add_security_headers(response):
     """Add security headers to all responses"""
     response.headers['X-Content-Type-Options'] = 'nosniff'
+    # API responses are JSON for scripts, never rendered as pages
+    if request.blueprint == api_bp.name:
+        return response
     response.headers['X-Frame-Options'] = 'DENY'
     response.headers['X-XSS-Protection'] = '1; mode=block'
     response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
@@ -95,60 +115,28 @@ def add_security_headers(response):
     
     return response
 
-# Initialize security extensions
-csrf = CSRFProtect(app)
-login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
-login_manager.login_message = 'Please log in to access this page.'
-
-# Initialize rate limiter with Redis storage (fallback to memory for development)
-def get_redis_uri():
-    """Get Redis URI if available, otherwise return None"""
-    try:
-        import redis
-        # Test Redis connection with a short timeout
-        r = redis.Redis(host='localhost', port=6379, db=0, socket_connect_timeout=1)
-        r.ping()
-        return "redis://localhost:6379"
-    except (ImportError, redis.ConnectionError, redis.TimeoutError, Exception):
-        return None
-
-redis_uri = get_redis_uri()
-if redis_uri:
-    limiter = Limiter(
-        app=app,
-        key_func=get_remote_address,
-        default_limits=["200 per day", "50 per hour"],
-        storage_uri=redis_uri
-    )
-else:
-    # Fallback to memory storage when Redis is not available
-    limiter = Limiter(
-        app=app,
-        key_func=get_remote_address,
-        default_limits=["200 per day", "50 per hour"]
-    )
-
-# Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///notes.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'connect_args': {
-        'timeout': 30  # SQLite connection timeout in seconds
-    }
-}
-
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
-
-# Create database tables
-with app.app_context():
-    db.create_all()
-
 # Store calculation progress
 calculation_progress = {}
 
+metrics.gauge('netmaster_calculation_tasks', 'Calculation tasks held in memory',
+              lambda: len(calculation_progress))
+def running_calculations():
+    return sum(1 for t in threading.enumerate() if t.name.startswith('calculation-'))
+
+metrics.gauge('netmaster_calculation_threads', 'Calculation threads currently running', running_calculations)
+
+def start_calculation(target, *args, **kwargs):
+    """Run a calculation function in a background thread with an app context"""
+    app = current_app._get_current_object()
+    def run():
+        with app.app_context():
+            target(*args, **kwargs)
+    # Unchanged unless an admin has asked to profile calculations
+    run = profiler.wrap_calculation(run)
+    thread = threading.Thread(target=run, name=f'calculation-{target.__name__}')
+    thread.start()
+    return thread
+
 # Database connection retry decorator with enhanced error handling
 def with_db_retry(max_retries=3, delay=1):
     def decorator(func):
@@ -162,11 +150,11 @@ def with_db_retry(max_retries=3, delay=1):
                     last_error = e
                     retries += 1
                     if retries == max_retries:
-                        app.logger.error(f"Database operation failed after {max_retries} retries: {str(e)}")
+                        current_app.logger.error(f"Database operation failed after {max_retries} retries: {str(e)}")
                         raise
                     time.sleep(delay * retries)  # Exponential backoff
                 except SQLAlchemyError as e:
-                    app.logger.error(f"SQLAlchemy error: {str(e)}")
+                    current_app.logger.error(f"SQLAlchemy error: {str(e)}")
                     raise
             return None
         wrapper.__name__ = func.__name__
@@ -185,11 +173,11 @@ def transaction():
         db.session.commit()
     except SQLAlchemyError as e:
         db.session.rollback()
-        app.logger.error(f"Transaction failed: {str(e)}")
+        current_app.logger.error(f"Transaction failed: {str(e)}")
         raise
     except Exception as e:
         db.session.rollback()
-        app.logger.error(f"Unexpected error in transaction: {str(e)}")
+        current_app.logger.error(f"Unexpected error in transaction: {str(e)}")
         raise
     finally:
         # Ensure session is properly closed
@@ -204,17 +192,51 @@ def check_db_health():
         db.session.execute(text('SELECT 1'))
         return True
     except Exception as e:
-        app.logger.error(f"Database health check failed: {str(e)}")
+        current_app.logger.error(f"Database health check failed: {str(e)}")
         return False
 
+# Readiness checks run by the background prober behind /readyz
+def database_health():
+    healthy = check_db_health()
+    db.session.remove()
+    return {'ok': healthy}
+
+def rate_limit_storage_health():
+    if not limiter.enabled:
+        return {'ok': True, 'enabled': False}
+    return {'ok': bool(limiter.storage.check()), 'enabled': True}
+
+def calculation_health():
+    running = running_calculations()
+    limit = current_app.config['HEALTH_MAX_CALCULATIONS']
+    return {'ok': running < limit, 'running': running, 'limit': limit}
+
+def password_hashing_health():
+    return {'ok': hasher.in_flight < hasher.max_pending, 'in_flight': hasher.in_flight, 'limit': hasher.max_pending}
+
+def disk_health():
+    paths = [current_app.instance_path]
+    if db.engine.url.get_backend_name() == 'sqlite' and db.engine.url.database not in (None, '', ':memory:'):
+        paths.append(os.path.dirname(os.path.abspath(db.engine.url.database)))
+    return disk_space_check(paths, current_app.config['HEALTH_MIN_FREE_DISK_MB'] * 1024 * 1024)()
+
+health.check('database', database_health)
+health.check('rate_limit_storage', rate_limit_storage_health)
+health.check('calculations', calculation_health)
+health.check('password_hashing', password_hashing_health)
+health.check('disk', disk_health)
+
 # Database connection manager
 class DatabaseConnectionManager:
     """Manages database connections and provides connection health monitoring"""
     
     @staticmethod
     def get_connection():
-        """Get a database connection with health check"""
-        if not check_db_health():
+        """Get a database connection, using the prober's last database check when it is recent"""
+        healthy = health.is_healthy('database')
+        if healthy is None:
+            healthy = check_db_health()
+        if not healthy:
             raise SQLAlchemyError("Database connection is not healthy")
         return db.session
 
@@ -231,7 +253,7 @@ class DatabaseConnectionManager:
             db.session.execute(text('PRAGMA busy_timeout = ?'), (timeout * 1000,))
             return db.session.execute(query)
         except Exception as e:
-            app.logger.error(f"Query execution failed: {str(e)}")
+            current_app.logger.error(f"Query execution failed: {str(e)}")
             raise
 
 def get_local_time():
@@ -268,10 +290,14 @@ class User(UserMixin, db.Model):
                 return user_id
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        """True if the stored hash predates the configured hash parameters"""
+        return hasher.needs_rehash(self.password_hash)
 
 class Note(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -280,6 +306,7 @@ class Note(db.Model):
     created_at = db.Column(db.DateTime(timezone=True), default=get_local_time, index=True)
     updated_at = db.Column(db.DateTime(timezone=True), default=get_local_time, onupdate=get_local_time, index=True)
     user_id = db.Column(db.String(8), db.ForeignKey('user.id'), nullable=False)
+    revisions = db.relationship('NoteRevision', backref='note', lazy='dynamic', cascade='all, delete-orphan')
 
     def __repr__(self):
         return f'<Note {self.id}>'
@@ -309,17 +336,123 @@ class Note(db.Model):
         db.session.delete(self)
         db.session.commit()
 
+    def revise(self, title, content):
+        """Save a new title and content, recording them as the next revision"""
+        if title == self.title and content == self.content:
+            return self
+        latest, last_snapshot = db.session.query(
+            func.max(NoteRevision.number),
+            func.max(case((NoteRevision.is_snapshot, NoteRevision.number))),
+        ).filter(NoteRevision.note_id == self.id).one()
+        if latest is None:
+            # Notes from before revision history start it with their current version
+            db.session.add(NoteRevision.encode(self, 1, self.title, None, self.content, 0,
+                                               created_at=self.updated_at))
+            latest = last_snapshot = 1
+        db.session.add(NoteRevision.encode(self, latest + 1, title, self.content, content,
+                                           latest - last_snapshot))
+        self.title = title
+        self.content = content
+        return self.save()
+
+class NoteRevision(db.Model):
+    """One version of a note, stored as a compressed snapshot or as a delta from the
+    previous revision (see revisions.py)"""
+    __table_args__ = (db.UniqueConstraint('note_id', 'number', name='uq_note_revision_number'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    note_id = db.Column(db.Integer, db.ForeignKey('note.id'), nullable=False)
+    # 1, 2, 3... per note
+    number = db.Column(db.Integer, nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    is_snapshot = db.Column(db.Boolean, nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+    # Length of the content, for listing revisions without decoding them
+    size = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime(timezone=True), default=get_local_time)
+
+    def __repr__(self):
+        return f'<NoteRevision {self.note_id}.{self.number}>'
+
+    @classmethod
+    def encode(cls, note, number, title, previous, content, since_snapshot, **kwargs):
+        is_snapshot, data = revisions.encode(previous, content, since_snapshot)
+        return cls(note=note, number=number, title=title, is_snapshot=is_snapshot, data=data,
+                   size=len(content), **kwargs)
+
+    @classmethod
+    def list_for(cls, note_id):
+        """Revisions of a note, newest first, without their data"""
+        return db.session.query(
+            cls.number, cls.title, cls.size, cls.is_snapshot, cls.created_at
+        ).filter(cls.note_id == note_id).order_by(cls.number.desc()).all()
+
+    @classmethod
+    def read(cls, note_id, number):
+        """(revision, content) for one revision of a note, or (None, None)"""
+        start = db.session.query(func.max(cls.number)).filter(
+            cls.note_id == note_id, cls.is_snapshot, cls.number <= number
+        ).scalar()
+        if start is None:
+            return None, None
+        chain = cls.query.filter(
+            cls.note_id == note_id, cls.number >= start, cls.number <= number
+        ).order_by(cls.number).all()
+        if chain[-1].number != number:
+            return None, None
+        return chain[-1], revisions.decode((revision.is_snapshot, revision.data) for revision in chain)
+
+class ApiToken(db.Model):
+    """A personal token for /api/v1.
+
+    The token is "nm_<selector>_<secret>". The selector finds the row, and
+    only a SHA-256 hash of the secret is stored. The secret is 256 random
+    bits, so a fast hash is enough, and the plain token is shown once.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(8), db.ForeignKey('user.id'), nullable=False, index=True)
+    name = db.Column(db.String(100), nullable=False)
+    selector = db.Column(db.String(16), unique=True, nullable=False)
+    secret_hash = db.Column(db.String(64), nullable=False)
+    created_at = db.Column(db.DateTime(timezone=True), default=get_local_time)
+
+    def __repr__(self):
+        return f'<ApiToken {self.selector}>'
+
+    @staticmethod
+    def hash_secret(secret):
+        return hashlib.sha256(secret.encode()).hexdigest()
+
+    @classmethod
+    def issue(cls, user_id, name):
+        """Create a token; returns (token, plain token string)"""
+        selector = secrets.token_hex(6)
+        secret = secrets.token_urlsafe(32)
+        token = cls(user_id=user_id, name=name, selector=selector, secret_hash=cls.hash_secret(secret))
+        return token, f'nm_{selector}_{secret}'
+
+class CalculationHistory(db.Model):
+    """A finished subnet calculation, written through the write-behind buffer"""
+    __table_args__ = (db.Index('ix_calculation_history_user_created', 'user_id', 'created_at'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Null for calculations by anonymous users
+    user_id = db.Column(db.String(8), db.ForeignKey('user.id'), nullable=True)
+    mode = db.Column(db.String(10), nullable=False)
+    network_ip = db.Column(db.String(50), nullable=False)
+    num_hosts = db.Column(db.Integer)
+    num_vlans = db.Column(db.Integer)
+    result_count = db.Column(db.Integer, nullable=False)
+    results = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime(timezone=True), default=get_local_time, index=True)
+
+    def __repr__(self):
+        return f'<CalculationHistory {self.id}>'
+
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(user_id)
 
-def sanitize_input(text):
-    """Sanitize user input to prevent XSS attacks"""
-    if not text:
-        return text
-    # Remove HTML tags and encode special characters
-    return bleach.clean(text, strip=True)
-
 def validate_username(username):
     """Validate username format and length"""
     if not username or len(username) < 3 or len(username) > 80:
@@ -339,10 +472,13 @@ def validate_email(email):
 
 import re
 EMAIL_REGEX = re.compile(r"[^@]+@[^@]+\.[^@]+")
+MAX_API_TOKENS = 10
+
 PASSWORD_REGEX = re.compile(r'^(?=.*[a-z])(?=.*[A-Z])(?=.*\d).{8,}$')
 
-@app.route('/login', methods=['GET', 'POST'])
-# @limiter.limit("5 per minute")  # Temporarily disabled
+@bp.route('/login', methods=['GET', 'POST'])
+@limiter.limit("5 per minute")
+@page_cache.cached
 def login():
     if request.method == 'POST':
         username = sanitize_input(request.form.get('username', '').strip())
@@ -360,21 +496,33 @@ def login():
         
         user = User.query.filter_by(username=username).first()
         
-        if user and user.check_password(password):
-            login_user(user)
-            return redirect(url_for('home'))
+        try:
+            if user and user.check_password(password):
+                # Upgrade hashes made with older parameters while we have the password
+                if user.password_needs_rehash():
+                    try:
+                        user.set_password(password)
+                        db.session.commit()
+                    except (SQLAlchemyError, PasswordHashingBusyError) as e:
+                        db.session.rollback()
+                        current_app.logger.warning(f"Password rehash skipped for user {user.id}: {str(e)}")
+                login_user(user)
+                return redirect(url_for('main.home'))
+        except PasswordHashingBusyError:
+            flash('The server is busy, please try again in a moment', 'error')
+            return render_template('login.html'), 503
         flash('Invalid username or password', 'error')
     return render_template('login.html')
 
-@app.route('/logout', methods=['GET', 'POST'])
+@bp.route('/logout', methods=['GET', 'POST'])
 @login_required
 def logout():
     logout_user()
     flash('You have been successfully logged out.', 'success')
-    return redirect(url_for('login'))
+    return redirect(url_for('main.login'))
 
-@app.route('/register', methods=['GET', 'POST'])
-# @limiter.limit("10 per hour")  # Temporarily disabled
+@bp.route('/register', methods=['GET', 'POST'])
+@limiter.limit("10 per hour")
 def register():
     if request.method == 'POST':
         try:
@@ -386,55 +534,59 @@ def register():
             is_valid, error_msg = validate_username(username)
             if not is_valid:
                 flash(error_msg, 'error')
-                return redirect(url_for('register'))
+                return redirect(url_for('main.register'))
             
             # Validate email
             is_valid, error_msg = validate_email(email)
             if not is_valid:
                 flash(error_msg, 'error')
-                return redirect(url_for('register'))
+                return redirect(url_for('main.register'))
             
             # Validate password complexity
             if not password or not PASSWORD_REGEX.match(password):
                 flash('Password must be at least 8 characters long and include at least one uppercase letter, one lowercase letter, and one number.', 'error')
-                return redirect(url_for('register'))
+                return redirect(url_for('main.register'))
             
             # Check if username exists
             if User.query.filter_by(username=username).first():
                 flash('Username already exists', 'error')
-                return redirect(url_for('register'))
+                return redirect(url_for('main.register'))
             
             # Check if email exists
             if User.query.filter_by(email=email).first():
                 flash('Email already registered', 'error')
-                return redirect(url_for('register'))
+                return redirect(url_for('main.register'))
             
             # Create new user
             user = User(username=username, email=email)
-            user.set_password(password)
+            try:
+                user.set_password(password)
+            except PasswordHashingBusyError:
+                flash('The server is busy, please try again in a moment', 'error')
+                return redirect(url_for('main.register'))
             
             try:
                 db.session.add(user)
                 db.session.commit()
                 login_user(user)
                 flash('Registration successful! Welcome to Subnet Calculator.', 'success')
-                return redirect(url_for('home'))
+                return redirect(url_for('main.home'))
             except SQLAlchemyError as e:
                 db.session.rollback()
-                app.logger.error(f"Database error during registration: {str(e)}")
+                current_app.logger.error(f"Database error during registration: {str(e)}")
                 flash('An error occurred during registration. Please try again.', 'error')
-                return redirect(url_for('register'))
+                return redirect(url_for('main.register'))
                 
         except Exception as e:
-            app.logger.error(f"Unexpected error during registration: {str(e)}")
+            current_app.logger.error(f"Unexpected error during registration: {str(e)}")
             flash('An unexpected error occurred. Please try again.', 'error')
-            return redirect(url_for('register'))
+            return redirect(url_for('main.register'))
             
     return render_template('register.html')
 
-@app.route('/notes')
+@bp.route('/notes')
 @login_required
-# @limiter.limit("30 per minute")  # Temporarily disabled
+@limiter.limit("30 per minute")
 def notes():
     try:
         page = request.args.get('page', 1, type=int)
@@ -443,13 +595,13 @@ def notes():
         notes = pagination.items
         return render_template('notes.html', notes=notes, pagination=pagination)
     except Exception as e:
-        app.logger.error(f"Error fetching notes: {str(e)}")
+        current_app.logger.error(f"Error fetching notes: {str(e)}")
         flash('An error occurred while fetching notes', 'error')
         return render_template('notes.html', notes=[], pagination=None)
 
-@app.route('/notes/create', methods=['POST'])
+@bp.route('/notes/create', methods=['POST'])
 @login_required
-# @limiter.limit("10 per minute")  # Temporarily disabled
+@limiter.limit("10 per minute")
 def create_note():
     try:
         title = sanitize_input(request.form.get('title', '').strip())
@@ -457,51 +609,51 @@ def create_note():
         
         if not title or not content:
             flash('Title and content are required', 'error')
-            return redirect(url_for('notes'))
+            return redirect(url_for('main.notes'))
         
         note = Note(title=title, content=content, user_id=current_user.id)
         note.save()
         
         flash('Note created successfully', 'success')
-        return redirect(url_for('notes'))
+        return redirect(url_for('main.notes'))
     except Exception as e:
-        app.logger.error(f"Error creating note: {str(e)}")
+        current_app.logger.error(f"Error creating note: {str(e)}")
         flash('An error occurred while creating the note', 'error')
-        return redirect(url_for('notes'))
+        return redirect(url_for('main.notes'))
 
-@app.route('/notes/delete/<int:note_id>', methods=['POST'])
+@bp.route('/notes/delete/<int:note_id>', methods=['POST'])
 @login_required
-# @limiter.limit("10 per minute")  # Temporarily disabled
+@limiter.limit("10 per minute")
 def delete_note(note_id):
     try:
         note = Note.get_by_id(note_id)
         
         if not note:
             flash('Note not found', 'error')
-            return redirect(url_for('notes'))
+            return redirect(url_for('main.notes'))
             
         if note.user_id != current_user.id:
             flash('Access denied', 'error')
-            return redirect(url_for('notes'))
+            return redirect(url_for('main.notes'))
         
         note.delete()
         flash('Note deleted successfully', 'success')
-        return redirect(url_for('notes'))
+        return redirect(url_for('main.notes'))
         
     except Exception as e:
-        app.logger.error(f"Error deleting note: {str(e)}", exc_info=True)
+        current_app.logger.error(f"Error deleting note: {str(e)}", exc_info=True)
         flash('An error occurred while deleting the note', 'error')
-        return redirect(url_for('notes'))
+        return redirect(url_for('main.notes'))
 
-@app.route('/notes/edit/<int:note_id>', methods=['GET', 'POST'])
+@bp.route('/notes/edit/<int:note_id>', methods=['GET', 'POST'])
 @login_required
-# @limiter.limit("10 per minute")  # Temporarily disabled
+@limiter.limit("10 per minute")
 def edit_note(note_id):
     try:
         note = Note.get_by_id(note_id)
         if not note or note.user_id != current_user.id:
             flash('Note not found or access denied', 'error')
-            return redirect(url_for('notes'))
+            return redirect(url_for('main.notes'))
         
         if request.method == 'POST':
             title = sanitize_input(request.form.get('title', '').strip())
@@ -509,156 +661,288 @@ def edit_note(note_id):
             
             if not title or not content:
                 flash('Title and content are required', 'error')
-                return redirect(url_for('edit_note', note_id=note_id))
+                return redirect(url_for('main.edit_note', note_id=note_id))
             
-            note.title = title
-            note.content = content
-            note.save()
+            note.revise(title, content)
             
             flash('Note updated successfully', 'success')
-            return redirect(url_for('notes'))
+            return redirect(url_for('main.notes'))
         
         return render_template('edit_note.html', note=note)
     except Exception as e:
-        app.logger.error(f"Error editing note: {str(e)}", exc_info=True)
+        current_app.logger.error(f"Error editing note: {str(e)}", exc_info=True)
         flash('An error occurred while editing the note', 'error')
-        return redirect(url_for('notes'))
+        return redirect(url_for('main.notes'))
 
-@app.route('/notes/view/<int:note_id>')
+@bp.route('/notes/view/<int:note_id>')
 @login_required
 def view_note(note_id):
     try:
         note = Note.get_by_id(note_id)
         if not note or note.user_id != current_user.id:
             flash('Note not found or access denied', 'error')
-            return redirect(url_for('notes'))
-        return render_template('view_note.html', note=note)
+            return redirect(url_for('main.notes'))
+        return render_template('view_note.html', note=note, revisions=NoteRevision.list_for(note.id))
     except Exception as e:
-        app.logger.error(f"Error viewing note: {str(e)}", exc_info=True)
+        current_app.logger.error(f"Error viewing note: {str(e)}", exc_info=True)
         flash('An error occurred while viewing the note', 'error')
-        return redirect(url_for('notes'))
+        return redirect(url_for('main.notes'))
+
+def revision_json(revision, content=None):
+    data = {
+        'number': revision.number,
+        'title': revision.title,
+        'size': revision.size,
+        'snapshot': revision.is_snapshot,
+        'created_at': revision.created_at.isoformat() if revision.created_at else None,
+    }
+    if content is not None:
+        data['content'] = content
+    return data
 
-@app.route('/calculate_subnets', methods=['POST'])
-# @limiter.limit("20 per minute")  # Temporarily disabled
-def calculate_subnets_route():
+@bp.route('/notes/<int:note_id>/revisions')
+@login_required
+@limiter.limit("30 per minute")
+def note_revisions(note_id):
+    note = Note.get_by_id(note_id)
+    if not note or note.user_id != current_user.id:
+        return jsonify({'status': 'error', 'message': 'Note not found or access denied'}), 404
+    try:
+        return jsonify({
+            'status': 'success',
+            'revisions': [revision_json(revision) for revision in NoteRevision.list_for(note_id)],
+        })
+    except Exception as e:
+        current_app.logger.error(f"Error listing note revisions: {str(e)}")
+        return jsonify({'status': 'error', 'message': 'Failed to list revisions'}), 500
+
+@bp.route('/notes/<int:note_id>/revisions/<int:number>')
+@login_required
+@limiter.limit("30 per minute")
+def note_revision(note_id, number):
+    note = Note.get_by_id(note_id)
+    if not note or note.user_id != current_user.id:
+        return jsonify({'status': 'error', 'message': 'Note not found or access denied'}), 404
+    try:
+        revision, content = NoteRevision.read(note_id, number)
+        if revision is None:
+            return jsonify({'status': 'error', 'message': 'Revision not found'}), 404
+        return jsonify({'status': 'success', 'revision': revision_json(revision, content)})
+    except Exception as e:
+        current_app.logger.error(f"Error reading note revision: {str(e)}")
+        return jsonify({'status': 'error', 'message': 'Failed to read revision'}), 500
+
+@bp.route('/notes/<int:note_id>/revisions/<int:number>/restore', methods=['POST'])
+@login_required
+@limiter.limit("10 per minute")
+def restore_note_revision(note_id, number):
+    """Make an earlier revision the current version, as a new revision"""
     try:
+        note = Note.get_by_id(note_id)
+        if not note or note.user_id != current_user.id:
+            if request.is_json:
+                return jsonify({'status': 'error', 'message': 'Note not found or access denied'}), 404
+            flash('Note not found or access denied', 'error')
+            return redirect(url_for('main.notes'))
+        revision, content = NoteRevision.read(note_id, number)
+        if revision is None:
+            if request.is_json:
+                return jsonify({'status': 'error', 'message': 'Revision not found'}), 404
+            flash('Revision not found', 'error')
+            return redirect(url_for('main.view_note', note_id=note_id))
+        note.revise(revision.title, content)
         if request.is_json:
-            data = request.get_json()
-            network_ip = data.get('network_ip', '').strip()
-            vlan_mode = data.get('vlan_mode', False)
-        else:
-            network_ip = request.form.get('network_ip', '').strip()
-            vlan_mode = False
+            return jsonify({'status': 'success', 'message': f'Revision {number} restored.'})
+        flash(f'Revision {number} restored', 'success')
+        return redirect(url_for('main.view_note', note_id=note_id))
+    except Exception as e:
+        current_app.logger.error(f"Error restoring note revision: {str(e)}", exc_info=True)
+        db.session.rollback()
+        if request.is_json:
+            return jsonify({'status': 'error', 'message': 'Failed to restore revision'}), 500
+        flash('An error occurred while restoring the revision', 'error')
+        return redirect(url_for('main.notes'))
+
+def read_calculation_request():
+    """Validate the calculator input posted as JSON or a form.
+
+    Returns (network_ip, vlans, num_hosts) with vlans None in host mode and
+    num_hosts None in VLAN mode. Raises a SubnetCalculationError subclass
+    if the input is invalid.
+    """
+    if request.is_json:
+        data = request.get_json()
+        network_ip = data.get('network_ip', '').strip()
+        vlan_mode = data.get('vlan_mode', False)
+    else:
+        data = request.form
+        network_ip = request.form.get('network_ip', '').strip()
+        vlan_mode = False
+
+    if not network_ip:
+        raise NetworkValidationError("Network IP is required")
+    
+    # Additional validation for network IP length
+    if len(network_ip) > 50:  # Reasonable limit for IP/CIDR
+        raise NetworkValidationError("Network IP is too long")
+
+    # VLAN mode
+    if vlan_mode:
+        return network_ip, validate_vlans(data.get('vlans', [])), None
 
-        if not network_ip:
-            raise NetworkValidationError("Network IP is required")
+    # Host-based mode
+    return network_ip, None, validate_num_hosts(data.get('num_hosts', '1'))
+
+def validate_vlans(vlans, max_vlans=100):
+    """Check a list of {'vlan_id', 'vlan_name'} entries and return them cleaned.
+
+    Raises SegmentCountError if the list or an entry is invalid.
+    """
+    if not vlans or not isinstance(vlans, list):
+        raise SegmentCountError("VLAN details are required")
+    
+    # Validate VLAN count limit
+    if len(vlans) > max_vlans:
+        raise SegmentCountError(f"Too many VLANs requested (maximum {max_vlans})")
+    
+    vlan_ids = []
+    vlan_names = []
+    
+    # Validate each VLAN entry
+    for v in vlans:
+        if not isinstance(v, dict) or 'vlan_id' not in v or 'vlan_name' not in v:
+            raise SegmentCountError("Invalid VLAN entry format")
         
-        # Additional validation for network IP length
-        if len(network_ip) > 50:  # Reasonable limit for IP/CIDR
-            raise NetworkValidationError("Network IP is too long")
-
-        # VLAN mode
-        if vlan_mode:
-            vlans = data.get('vlans', [])
-            if not vlans or not isinstance(vlans, list):
-                raise SegmentCountError("VLAN details are required")
-            
-            # Validate VLAN count limit
-            if len(vlans) > 100:  # Reasonable limit
-                raise SegmentCountError("Too many VLANs requested (maximum 100)")
-            
-            num_segments = len(vlans)
-            vlan_ids = []
-            vlan_names = []
-            
-            # Validate each VLAN entry
-            for v in vlans:
-                if not isinstance(v, dict) or 'vlan_id' not in v or 'vlan_name' not in v:
-                    raise SegmentCountError("Invalid VLAN entry format")
-                
-                try:
-                    vlan_id = int(v['vlan_id'])
-                    if not 1 <= vlan_id <= 4094:  # Valid VLAN ID range
-                        raise SegmentCountError(f"VLAN ID {vlan_id} is out of range (1-4094)")
-                    vlan_ids.append(vlan_id)
-                except (ValueError, TypeError):
-                    raise SegmentCountError("Invalid VLAN ID format")
-                
-                vlan_name = str(v['vlan_name']).strip()
-                if not vlan_name or len(vlan_name) > 50:
-                    raise SegmentCountError("VLAN name must be 1-50 characters")
-                vlan_names.append(sanitize_input(vlan_name))
-            # Generate a unique task ID
-            task_id = secrets.token_hex(16)
-            calculation_progress[task_id] = {
-                'progress': 0,
-                'results': [],
-                'error': None
-            }
-            import threading
-            thread = threading.Thread(
-                target=lambda: calculate_vlan_subnet(task_id, network_ip, vlans)
-            )
-            thread.start()
-            return jsonify({'status': 'started', 'task_id': task_id})
+        try:
+            vlan_id = int(v['vlan_id'])
+            if not 1 <= vlan_id <= 4094:  # Valid VLAN ID range
+                raise SegmentCountError(f"VLAN ID {vlan_id} is out of range (1-4094)")
+            vlan_ids.append(vlan_id)
+        except (ValueError, TypeError):
+            raise SegmentCountError("Invalid VLAN ID format")
+        
+        vlan_name = str(v['vlan_name']).strip()
+        if not vlan_name or len(vlan_name) > 50:
+            raise SegmentCountError("VLAN name must be 1-50 characters")
+        vlan_names.append(vlan_name)
+    return [
+        {'vlan_id': vlan_id, 'vlan_name': vlan_name}
+        for vlan_id, vlan_name in zip(vlan_ids, sanitize_many(vlan_names))
+    ]
+
+def parse_vlans(text):
+    """'10:Servers;20:Voice' -> [{'vlan_id': '10', 'vlan_name': 'Servers'}, ...], unvalidated"""
+    vlans = []
+    for entry in text.split(';'):
+        if not entry.strip():
+            continue
+        vlan_id, sep, name = entry.partition(':')
+        vlans.append({'vlan_id': vlan_id.strip(), 'vlan_name': name.strip() if sep else ''})
+    return vlans
+
+def validate_num_hosts(value):
+    """Return value as a host count between 1 and 4094, or raise SegmentCountError"""
+    try:
+        num_hosts = int(value)
+    except (ValueError, TypeError):
+        raise SegmentCountError("Number of hosts must be a valid integer")
+    if not 1 <= num_hosts <= 4094:
+        raise SegmentCountError("Number of hosts must be between 1 and 4094")
+    return num_hosts
+
+def calculation_owner():
+    """(user_id, auto_save) for recording the current user's calculations"""
+    if not current_user.is_authenticated:
+        return None, False
+    return current_user.id, current_user.auto_save_results == 'always'
+
+@bp.route('/calculate_subnets', methods=['POST'])
+# @limiter.limit("20 per minute")  # Temporarily disabled
+def calculate_subnets_route():
+    try:
+        network_ip, vlans, num_hosts = read_calculation_request()
+        user_id, auto_save = calculation_owner()
+        # Generate a unique task ID
+        task_id = secrets.token_hex(16)
+        calculation_progress[task_id] = {
+            'progress': 0,
+            'results': [],
+            'error': None
+        }
+        if vlans is not None:
+            start_calculation(calculate_vlan_subnet, task_id, network_ip, vlans,
+                              user_id=user_id, auto_save=auto_save)
         else:
-            # Host-based mode
-            try:
-                num_hosts = int(data.get('num_hosts', '1'))
-                if not 1 <= num_hosts <= 4094:
-                    raise SegmentCountError("Number of hosts must be between 1 and 4094")
-            except (ValueError, TypeError):
-                raise SegmentCountError("Number of hosts must be a valid integer")
-            # Generate a unique task ID
-            task_id = secrets.token_hex(16)
-            calculation_progress[task_id] = {
-                'progress': 0,
-                'results': [],
-                'error': None
-            }
-            import threading
-            thread = threading.Thread(
-                target=lambda: calculate_host_subnet(task_id, network_ip, num_hosts)
-            )
-            thread.start()
-            return jsonify({'status': 'started', 'task_id': task_id})
+            start_calculation(calculate_host_subnet, task_id, network_ip, num_hosts,
+                              user_id=user_id, auto_save=auto_save)
+        return jsonify({'status': 'started', 'task_id': task_id})
     except SubnetCalculationError as e:
-        app.logger.error(f"Subnet calculation error: {str(e)}")
+        current_app.logger.error(f"Subnet calculation error: {str(e)}")
         return jsonify({'status': 'error', 'message': str(e)}), 400
     except Exception as e:
-        app.logger.error(f"Unexpected error in calculate_subnets_route: {str(e)}")
+        current_app.logger.error(f"Unexpected error in calculate_subnets_route: {str(e)}")
         return jsonify({'status': 'error', 'message': f"An unexpected server error occurred: {str(e)}"}), 500
 
-@app.route('/get_progress/<task_id>')
+@bp.route('/calculations/record', methods=['POST'])
+def record_calculation_route():
+    """Record a calculation the browser ran itself (see static/js/subnet-engine.js).
+
+    The rows are recalculated here rather than taken from the client, then
+    queued like those of server-side calculations.
+    """
+    try:
+        network_ip, vlans, num_hosts = read_calculation_request()
+        if vlans is not None:
+            results = list(plan_vlan_subnets(network_ip, vlans))
+        else:
+            results = plan_host_subnet(network_ip, num_hosts)
+        user_id, auto_save = calculation_owner()
+        record_calculation(network_ip, vlans, num_hosts, results, user_id, auto_save)
+        return jsonify({'status': 'success', 'saved_note': auto_save})
+    except SubnetCalculationError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Unexpected error in record_calculation_route: {str(e)}")
+        return jsonify({'status': 'error', 'message': 'Failed to record calculation.'}), 500
+
+@bp.route('/get_progress/<task_id>')
 def get_progress(task_id):
-    progress_data = calculation_progress.get(task_id, {
-        'progress': 0,
-        'results': [],
-        'error': None
-    })
+    progress_data = calculation_progress.get(task_id)
+    if progress_data is None:
+        # Unknown, or lost when the worker that ran it restarted
+        return jsonify({'status': 'error',
+                        'message': 'This calculation is no longer available. Please run it again.'}), 404
     return jsonify(progress_data)
 
-@app.route('/landing')
+@bp.route('/landing')
+@page_cache.cached
 def landing():
     return render_template('landing.html')
 
-@app.route('/')
+@bp.route('/')
 def root():
-    return redirect(url_for('landing'))
+    return redirect(url_for('main.landing'))
 
-@app.route('/calculator', methods=['GET'])
+@bp.route('/calculator', methods=['GET'])
+@page_cache.cached
 def home():
     return render_template('index.html', 
                          network_ip='', 
                          num_segments='', 
                          vlan_start='1')
 
-@app.errorhandler(CSRFError)
+@bp.app_errorhandler(CSRFError)
 def handle_csrf_error(e):
     """Handle CSRF errors by returning a JSON response."""
-    app.logger.error(f"CSRF error: {e.description}")
+    current_app.logger.error(f"CSRF error: {e.description}")
     return jsonify({'status': 'error', 'message': 'CSRF token missing or incorrect.'}), 400
 
+@bp.app_errorhandler(RateLimitExceeded)
+def handle_rate_limit_exceeded(e):
+    """Handle rate limit rejections, which would otherwise be reported as a 500."""
+    current_app.logger.warning(f"Rate limit exceeded for {get_remote_address()}: {e.description}")
+    return jsonify({'status': 'error', 'message': f'Too many requests ({e.description}). Please try again later.'}), 429
+
 def validate_ip_cidr(ip_cidr):
     try:
         # Check if input is None or empty
@@ -737,123 +1021,151 @@ def validate_ip_cidr(ip_cidr):
     except Exception as e:
         return False, f"Validation error: {str(e)}"
 
-def calculate_vlan_subnet(task_id, network_ip, vlans):
+def subnet_details(subnet):
+    """Return the result fields shared by host and VLAN mode for one subnet"""
+    usable_hosts = subnet.num_addresses - 2 if subnet.num_addresses > 2 else 0
+    if usable_hosts > 0:
+        # First and last host addresses, without materializing subnet.hosts()
+        first_usable = str(subnet.network_address + 1)
+        last_usable = str(subnet.broadcast_address - 1)
+    else:
+        first_usable = last_usable = 'N/A'
+    return {
+        'network_id': str(subnet.network_address),
+        'subnet_mask': str(subnet.netmask),
+        'broadcast': str(subnet.broadcast_address),
+        'default_gateway': first_usable,
+        'usable_hosts': usable_hosts,
+        'first_usable': first_usable,
+        'last_usable': last_usable
+    }
+
+def plan_vlan_subnets(network_ip, vlans):
+    """Yield one result row per VLAN, splitting network_ip into equal subnets.
+
+    Raises a SubnetCalculationError subclass if the input is invalid.
+    """
+    is_valid, error_msg = validate_ip_cidr(network_ip)
+    if not is_valid:
+        raise NetworkValidationError(error_msg)
+    network = ipaddress.ip_network(network_ip, strict=True)
+    num_segments = len(vlans)
+    required_prefix = network.prefixlen + math.ceil(math.log2(num_segments))
+    if required_prefix > 32:
+        raise NetworkSizeError("Too many VLANs requested for the given network")
+    subnet_generator = network.subnets(new_prefix=required_prefix)
+    for count, vlan in enumerate(vlans):
+        try:
+            subnet = next(subnet_generator)
+        except StopIteration:
+            raise NetworkSizeError(f"Not enough subnets available. Maximum possible: {count}")
+        yield {
+            'vlan_id': int(vlan['vlan_id']),
+            'vlan_name': vlan['vlan_name'],
+            **subnet_details(subnet)
+        }
+
+def plan_host_subnet(network_ip, num_hosts):
+    """Return the result rows for a host-based calculation on network_ip.
+
+    Raises a SubnetCalculationError subclass if the input is invalid or the
+    network cannot hold num_hosts hosts.
+    """
+    is_valid, error_msg = validate_ip_cidr(network_ip)
+    if not is_valid:
+        raise NetworkValidationError(error_msg)
+    network = ipaddress.ip_network(network_ip, strict=True)
+    # Find the smallest prefix that can fit the number of hosts
+    needed = num_hosts + 2  # network + broadcast
+    for prefix in range(network.prefixlen, 33):
+        if 2 ** (32 - prefix) >= needed:
+            break
+    else:
+        raise NetworkSizeError(f"Network is too small for {num_hosts} hosts")
+    for subnet in network.subnets(new_prefix=prefix):
+        result = subnet_details(subnet)
+        if result['usable_hosts'] >= num_hosts:
+            return [result]  # Only need one subnet for the required hosts
+    raise NetworkSizeError(f"Network is too small for {num_hosts} hosts")
+
+def calculation_note(network_ip, vlans, num_hosts, results):
+    """Title and content of the note auto-saved for a calculation"""
+    if vlans is not None:
+        title = f"VLAN plan for {network_ip} ({len(vlans)} VLANs)"
+    else:
+        title = f"Subnet for {num_hosts} hosts in {network_ip}"
+    lines = [f"Network: {network_ip}", '']
+    for row in results:
+        prefix = ipaddress.IPv4Network(f"{row['network_id']}/{row['subnet_mask']}").prefixlen
+        line = (f"{row['network_id']}/{prefix}: gateway {row['default_gateway']}, "
+                f"hosts {row['first_usable']} - {row['last_usable']} ({row['usable_hosts']} usable), "
+                f"broadcast {row['broadcast']}")
+        if 'vlan_id' in row:
+            line = f"VLAN {row['vlan_id']} {row['vlan_name']}: {line}"
+        lines.append(line)
+    return title, '\n'.join(lines)
+
+def record_calculation(network_ip, vlans, num_hosts, results, user_id=None, auto_save=False):
+    """Queue a history row, and a note when the user auto-saves, for a finished calculation"""
+    now = get_local_time()
+    write_buffer.add(
+        CalculationHistory,
+        user_id=user_id,
+        mode='vlan' if vlans is not None else 'host',
+        network_ip=network_ip,
+        num_hosts=num_hosts,
+        num_vlans=len(vlans) if vlans is not None else None,
+        result_count=len(results),
+        results=json.dumps(results),
+        created_at=now,
+    )
+    if user_id and auto_save:
+        title, content = calculation_note(network_ip, vlans, num_hosts, results)
+        write_buffer.add(Note, title=sanitize_input(title), content=sanitize_input(content),
+                         user_id=user_id, created_at=now, updated_at=now)
+
+def calculate_vlan_subnet(task_id, network_ip, vlans, user_id=None, auto_save=False):
     try:
-        is_valid, error_msg = validate_ip_cidr(network_ip)
-        if not is_valid:
-            raise NetworkValidationError(error_msg)
-        network = ipaddress.ip_network(network_ip, strict=True)
         num_segments = len(vlans)
-        required_prefix = network.prefixlen + math.ceil(math.log2(num_segments))
-        if required_prefix > 32:
-            raise NetworkSizeError("Too many VLANs requested for the given network")
-        subnet_generator = network.subnets(new_prefix=required_prefix)
         results = []
-        for i, vlan in enumerate(vlans):
-            try:
-                subnet = next(subnet_generator)
-                vlan_id = int(vlan['vlan_id'])
-                vlan_name = vlan['vlan_name']
-                network_address = subnet.network_address
-                broadcast_address = subnet.broadcast_address
-                usable_hosts = subnet.num_addresses - 2 if subnet.num_addresses > 2 else 0
-                default_gateway = None
-                if subnet.num_addresses > 2:
-                    try:
-                        hosts = list(subnet.hosts())
-                        if hosts:
-                            default_gateway = str(hosts[0])
-                        else:
-                            default_gateway = 'N/A'
-                    except Exception:
-                        default_gateway = 'N/A'
-                result = {
-                    'vlan_id': vlan_id,
-                    'vlan_name': vlan_name,
-                    'network_id': str(network_address),
-                    'subnet_mask': str(subnet.netmask),
-                    'broadcast': str(broadcast_address),
-                    'default_gateway': default_gateway or 'N/A',
-                    'usable_hosts': usable_hosts,
-                    'first_usable': str(list(subnet.hosts())[0]) if usable_hosts > 0 else 'N/A',
-                    'last_usable': str(list(subnet.hosts())[-1]) if usable_hosts > 0 else 'N/A'
-                }
-                results.append(result)
-                progress = int((i + 1) / num_segments * 100)
-                calculation_progress[task_id] = {
-                    'progress': progress,
-                    'results': results,
-                    'error': None
-                }
-                time.sleep(0.15)
-            except StopIteration:
-                raise NetworkSizeError(f"Not enough subnets available. Maximum possible: {len(results)}")
+        for i, result in enumerate(plan_vlan_subnets(network_ip, vlans)):
+            results.append(result)
+            progress = int((i + 1) / num_segments * 100)
+            calculation_progress[task_id] = {
+                'progress': progress,
+                'results': results,
+                'error': None
+            }
+            time.sleep(0.15)
+        record_calculation(network_ip, vlans, None, results, user_id, auto_save)
         calculation_progress[task_id]['progress'] = 100
     except SubnetCalculationError as e:
-        app.logger.error(f"Subnet calculation error for task {task_id}: {str(e)}")
+        current_app.logger.error(f"Subnet calculation error for task {task_id}: {str(e)}")
         calculation_progress[task_id]['error'] = str(e)
     except Exception as e:
-        app.logger.error(f"Unexpected error in calculate_vlan_subnet for task {task_id}: {str(e)}")
+        current_app.logger.error(f"Unexpected error in calculate_vlan_subnet for task {task_id}: {str(e)}")
         calculation_progress[task_id]['error'] = "An unexpected error occurred during calculation. Please try again."
 
-def calculate_host_subnet(task_id, network_ip, num_hosts):
+def calculate_host_subnet(task_id, network_ip, num_hosts, user_id=None, auto_save=False):
     try:
-        is_valid, error_msg = validate_ip_cidr(network_ip)
-        if not is_valid:
-            raise NetworkValidationError(error_msg)
-        network = ipaddress.ip_network(network_ip, strict=True)
-        # Find the smallest prefix that can fit the number of hosts
-        needed = num_hosts + 2  # network + broadcast
-        prefix = 32
-        for p in range(network.prefixlen, 33):
-            if 2 ** (32 - p) >= needed:
-                prefix = p
-                break
-        subnet_generator = network.subnets(new_prefix=prefix)
-        results = []
-        for i, subnet in enumerate(subnet_generator):
-            usable_hosts = subnet.num_addresses - 2 if subnet.num_addresses > 2 else 0
-            if usable_hosts < num_hosts:
-                continue
-            network_address = subnet.network_address
-            broadcast_address = subnet.broadcast_address
-            default_gateway = None
-            if subnet.num_addresses > 2:
-                try:
-                    hosts = list(subnet.hosts())
-                    if hosts:
-                        default_gateway = str(hosts[0])
-                    else:
-                        default_gateway = 'N/A'
-                except Exception:
-                    default_gateway = 'N/A'
-            result = {
-                'network_id': str(network_address),
-                'subnet_mask': str(subnet.netmask),
-                'broadcast': str(broadcast_address),
-                'default_gateway': default_gateway or 'N/A',
-                'usable_hosts': usable_hosts,
-                'first_usable': str(list(subnet.hosts())[0]) if usable_hosts > 0 else 'N/A',
-                'last_usable': str(list(subnet.hosts())[-1]) if usable_hosts > 0 else 'N/A'
-            }
-            results.append(result)
-            calculation_progress[task_id] = {
-                'progress': 100,
-                'results': results,
-                'error': None
-            }
-            break  # Only need one subnet for the required hosts
+        results = plan_host_subnet(network_ip, num_hosts)
+        record_calculation(network_ip, None, num_hosts, results, user_id, auto_save)
+        calculation_progress[task_id] = {
+            'progress': 100,
+            'results': results,
+            'error': None
+        }
     except SubnetCalculationError as e:
-        app.logger.error(f"Subnet calculation error for task {task_id}: {str(e)}")
+        current_app.logger.error(f"Subnet calculation error for task {task_id}: {str(e)}")
         calculation_progress[task_id]['error'] = str(e)
     except Exception as e:
-        app.logger.error(f"Unexpected error in calculate_host_subnet for task {task_id}: {str(e)}")
+        current_app.logger.error(f"Unexpected error in calculate_host_subnet for task {task_id}: {str(e)}")
         calculation_progress[task_id]['error'] = "An unexpected error occurred during calculation. Please try again."
 
 # Catch-all error handler to ensure JSON responses for all exceptions
-@app.errorhandler(Exception)
+@bp.app_errorhandler(Exception)
 def handle_uncaught_exception(e):
-    app.logger.error(f"An unhandled server error occurred: {e}", exc_info=True)
+    current_app.logger.error(f"An unhandled server error occurred: {e}", exc_info=True)
     message = 'An unexpected server error occurred. Please try again later.'
     # Never expose internal error details in production
     if os.environ.get('FLASK_ENV') != 'production' and os.environ.get('FLASK_DEBUG', 'False').lower() == 'true':
@@ -864,7 +1176,7 @@ def handle_uncaught_exception(e):
 
 # Debug endpoint removed for security - was exposing all notes
 
-@app.route('/notes/from_calculator', methods=['POST'])
+@bp.route('/notes/from_calculator', methods=['POST'])
 @login_required
 def add_note_from_calculator():
     if not request.is_json:
@@ -879,10 +1191,10 @@ def add_note_from_calculator():
         note.save()
         return jsonify({'status': 'success', 'message': 'Note created successfully.'})
     except Exception as e:
-        app.logger.error(f"Error creating note from calculator: {str(e)}")
+        current_app.logger.error(f"Error creating note from calculator: {str(e)}")
         return jsonify({'status': 'error', 'message': 'Failed to create note.'}), 500
 
-@app.route('/update_theme', methods=['POST'])
+@bp.route('/update_theme', methods=['POST'])
 @login_required
 def update_theme():
     try:
@@ -900,20 +1212,67 @@ def update_theme():
         return jsonify({'success': True, 'theme': theme})
         
     except Exception as e:
-        app.logger.error(f"Error updating theme: {str(e)}")
+        current_app.logger.error(f"Error updating theme: {str(e)}")
         return jsonify({'error': 'Failed to update theme'}), 500
 
-@app.route('/profile')
+@bp.route('/profile')
 @login_required
 def profile():
-    return render_template('profile.html')
+    return render_template('profile.html', api_tokens=user_api_tokens())
+
+def user_api_tokens():
+    return ApiToken.query.filter_by(user_id=current_user.id).order_by(ApiToken.created_at).all()
+
+@bp.route('/profile/api_tokens', methods=['POST'])
+@login_required
+@limiter.limit("10 per minute")
+def create_api_token():
+    """Issue an API token and show it once"""
+    try:
+        name = sanitize_input(request.form.get('name', '').strip())
+        if not name or len(name) > 100:
+            flash('Token name must be 1-100 characters', 'error')
+            return redirect(url_for('main.profile'))
+        if ApiToken.query.filter_by(user_id=current_user.id).count() >= MAX_API_TOKENS:
+            flash(f'You can have at most {MAX_API_TOKENS} API tokens; revoke one first', 'error')
+            return redirect(url_for('main.profile'))
+        token, plain = ApiToken.issue(current_user.id, name)
+        db.session.add(token)
+        db.session.commit()
+        api_tokens_index.invalidate()
+        # Rendered rather than redirected so the token never goes into the session cookie
+        return render_template('profile.html', api_tokens=user_api_tokens(), new_api_token=plain)
+    except Exception as e:
+        current_app.logger.error(f"Error creating API token: {str(e)}")
+        db.session.rollback()
+        flash('An error occurred while creating the token', 'error')
+        return redirect(url_for('main.profile'))
+
+@bp.route('/profile/api_tokens/<int:token_id>/revoke', methods=['POST'])
+@login_required
+def revoke_api_token(token_id):
+    try:
+        token = db.session.get(ApiToken, token_id)
+        if not token or token.user_id != current_user.id:
+            flash('Token not found', 'error')
+            return redirect(url_for('main.profile'))
+        db.session.delete(token)
+        db.session.commit()
+        api_tokens_index.invalidate()
+        flash(f'Token "{token.name}" revoked', 'success')
+        return redirect(url_for('main.profile'))
+    except Exception as e:
+        current_app.logger.error(f"Error revoking API token: {str(e)}")
+        db.session.rollback()
+        flash('An error occurred while revoking the token', 'error')
+        return redirect(url_for('main.profile'))
 
-@app.route('/settings')
+@bp.route('/settings')
 @login_required
 def settings():
-    return redirect(url_for('profile'))
+    return redirect(url_for('main.profile'))
 
-@app.route('/update_profile', methods=['POST'])
+@bp.route('/update_profile', methods=['POST'])
 @login_required
 # @limiter.limit("10 per minute")  # Temporarily disabled
 def update_profile():
@@ -948,11 +1307,11 @@ def update_profile():
         return jsonify({'success': True, 'theme': theme})
         
     except Exception as e:
-        app.logger.error(f"Error updating profile: {str(e)}")
+        current_app.logger.error(f"Error updating profile: {str(e)}")
         db.session.rollback()
         return jsonify({'success': False, 'error': 'Failed to update profile'}), 500
 
-@app.route('/change_password', methods=['POST'])
+@bp.route('/change_password', methods=['POST'])
 @login_required
 # @limiter.limit("5 per minute")  # Temporarily disabled
 def change_password():
@@ -982,39 +1341,51 @@ def change_password():
         return jsonify({'success': True})
         
     except Exception as e:
-        app.logger.error(f"Error changing password: {str(e)}")
+        current_app.logger.error(f"Error changing password: {str(e)}")
         db.session.rollback()
         return jsonify({'success': False, 'error': 'Failed to change password'}), 500
 
-@app.route('/delete_account', methods=['POST'])
+@bp.route('/delete_account', methods=['POST'])
 @login_required
 # @limiter.limit("3 per hour")  # Temporarily disabled
 def delete_account():
+    user_id = None
     try:
         confirmation = request.form.get('delete_confirmation', '').strip()
         
         if confirmation != 'DELETE':
             flash('Please type "DELETE" to confirm account deletion', 'error')
-            return redirect(url_for('profile'))
+            return redirect(url_for('main.profile'))
         
-        # Delete all user's notes first
+        # History and auto-saved notes still waiting to be written, or from calculations
+        # still running, would outlive the account
+        user_id = current_user.id
+        write_buffer.discard(user_id=user_id)
+        # Delete all user's notes and their revisions first
+        note_ids = db.session.query(Note.id).filter_by(user_id=current_user.id)
+        NoteRevision.query.filter(NoteRevision.note_id.in_(note_ids)).delete(synchronize_session=False)
         Note.query.filter_by(user_id=current_user.id).delete()
+        CalculationHistory.query.filter_by(user_id=current_user.id).delete()
+        ApiToken.query.filter_by(user_id=current_user.id).delete()
         
         # Delete the user
         db.session.delete(current_user)
         db.session.commit()
+        api_tokens_index.invalidate()
         
         logout_user()
         flash('Your account has been permanently deleted', 'success')
-        return redirect(url_for('landing'))
+        return redirect(url_for('main.landing'))
         
     except Exception as e:
-        app.logger.error(f"Error deleting account: {str(e)}")
+        current_app.logger.error(f"Error deleting account: {str(e)}")
         db.session.rollback()
+        if user_id is not None:
+            write_buffer.stop_discarding(user_id=user_id)
         flash('An error occurred while deleting your account', 'error')
-        return redirect(url_for('profile'))
+        return redirect(url_for('main.profile'))
 
-@app.route('/export_data')
+@bp.route('/export_data')
 @login_required
 # @limiter.limit("5 per hour")  # Temporarily disabled
 def export_data():
@@ -1056,19 +1427,176 @@ def export_data():
         return response
         
     except Exception as e:
-        app.logger.error(f"Error exporting data: {str(e)}")
+        current_app.logger.error(f"Error exporting data: {str(e)}")
         flash('An error occurred while exporting your data', 'error')
-        return redirect(url_for('profile'))
+        return redirect(url_for('main.profile'))
 
-@app.route('/privacy')
+@bp.route('/privacy')
+@page_cache.cached
 def privacy():
     return render_template('terms.html')
 
-@app.context_processor
+@bp.app_context_processor
 def inject_now():
     return {'now': datetime.now}
 
+def create_app(test_config=None):
+    """Create and configure the NetMaster application.
+
+    Nothing here opens a database, Redis or limiter connection; extensions
+    connect lazily on first use and tables are created by `flask init-db`.
+    """
+    app = Flask(__name__, static_folder='static')
+    # Use environment variable for secret key, raise error if not set in production
+    if os.environ.get('FLASK_ENV') == 'production':
+        if not os.environ.get('FLASK_SECRET_KEY'):
+            raise RuntimeError('FLASK_SECRET_KEY environment variable must be set in production!')
+        app.secret_key = os.environ['FLASK_SECRET_KEY']
+    else:
+        app.secret_key = os.environ.get('FLASK_SECRET_KEY')
+        if not app.secret_key:
+            raise RuntimeError('FLASK_SECRET_KEY environment variable must be set!')
+
+    # Security configurations
+    app.config['SESSION_COOKIE_SECURE'] = os.environ.get('FLASK_ENV') == 'production'
+    app.config['SESSION_COOKIE_HTTPONLY'] = True
+    app.config['PERMANENT_SESSION_LIFETIME'] = 3600  # 1 hour
+    app.config['WTF_CSRF_ENABLED'] = True
+    app.config['WTF_CSRF_TIME_LIMIT'] = 3600  # 1 hour
+    app.config['SESSION_COOKIE_SAMESITE'] = "Lax"
+
+    # Rate limiting
+    app.config['RATELIMIT_ENABLED'] = os.environ.get('RATELIMIT_ENABLED', 'True').lower() == 'true'
+    app.config['RATELIMIT_STORAGE_URI'] = (
+        os.environ.get('RATELIMIT_STORAGE_URI')
+        or f"sqlite:///{os.path.join(app.instance_path, 'ratelimit.db')}"
+    )
+
+    # Database configuration
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///notes.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'connect_args': {
+            'timeout': 30  # SQLite connection timeout in seconds
+        }
+    }
+
+    # Rendered page cache for landing, calculator, privacy and login
+    app.config['PAGE_CACHE_ENABLED'] = os.environ.get('PAGE_CACHE_ENABLED', 'True').lower() == 'true'
+
+    # Prometheus metrics on /metrics
+    app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+    app.config['METRICS_DIR'] = os.environ.get('METRICS_DIR') or os.path.join(app.instance_path, 'metrics')
+    app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+    app.config['METRICS_FLUSH_INTERVAL'] = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+
+    # Per-request SQL counts, N+1 warnings and a Server-Timing header (opt-in)
+    app.config['QUERY_STATS_ENABLED'] = os.environ.get('QUERY_STATS_ENABLED', 'False').lower() == 'true'
+    app.config['QUERY_STATS_MAX_QUERIES'] = int(os.environ.get('QUERY_STATS_MAX_QUERIES', 20))
+    app.config['QUERY_STATS_REPEAT_THRESHOLD'] = int(os.environ.get('QUERY_STATS_REPEAT_THRESHOLD', 5))
+
+    # gzip/deflate for HTML, JSON and other text responses
+    app.config['COMPRESS_ENABLED'] = os.environ.get('COMPRESS_ENABLED', 'True').lower() == 'true'
+    app.config['COMPRESS_LEVEL'] = int(os.environ.get('COMPRESS_LEVEL', 6))
+    app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+
+    # Calculation history and auto-saved notes are written in batches
+    app.config['WRITE_BEHIND_ENABLED'] = os.environ.get('WRITE_BEHIND_ENABLED', 'True').lower() == 'true'
+    app.config['WRITE_BEHIND_MAX_ITEMS'] = int(os.environ.get('WRITE_BEHIND_MAX_ITEMS', 100))
+    app.config['WRITE_BEHIND_INTERVAL'] = float(os.environ.get('WRITE_BEHIND_INTERVAL', 2))
+    app.config['WRITE_BEHIND_MAX_PENDING'] = int(os.environ.get('WRITE_BEHIND_MAX_PENDING', 10000))
+
+    # Admin-only CPU and memory profiling under /admin/profiling
+    app.config['PROFILING_ENABLED'] = os.environ.get('PROFILING_ENABLED', 'False').lower() == 'true'
+    app.config['ADMIN_USERNAMES'] = [
+        name.strip() for name in os.environ.get('ADMIN_USERNAMES', '').split(',') if name.strip()
+    ]
+
+    # Admin bulk user creation at /admin/users/bulk
+    app.config['PROVISION_MAX_USERS'] = int(os.environ.get('PROVISION_MAX_USERS', 1000))
+
+    # JSON API at /api/v1: cacheable subnet results, and token-authenticated calculations and notes
+    app.config['API_CACHE_MAX_AGE'] = int(os.environ.get('API_CACHE_MAX_AGE', 31536000))
+    app.config['API_RATE_LIMIT'] = os.environ.get('API_RATE_LIMIT', '600 per minute')
+    app.config['API_TOKEN_RATE_LIMIT'] = os.environ.get('API_TOKEN_RATE_LIMIT', '1200 per minute')
+    app.config['API_TOKEN_CACHE_TTL'] = float(os.environ.get('API_TOKEN_CACHE_TTL', 30))
+
+    # /healthz and /readyz, answered from checks run in the background
+    app.config['HEALTH_PROBE_INTERVAL'] = float(os.environ.get('HEALTH_PROBE_INTERVAL', 5))
+    app.config['HEALTH_MAX_IN_FLIGHT'] = int(os.environ.get('HEALTH_MAX_IN_FLIGHT', os.environ.get('GUNICORN_THREADS', 16)))
+    app.config['HEALTH_MAX_CALCULATIONS'] = int(os.environ.get('HEALTH_MAX_CALCULATIONS', 32))
+    app.config['HEALTH_MIN_FREE_DISK_MB'] = int(os.environ.get('HEALTH_MIN_FREE_DISK_MB', 100))
+
+    # Compiled templates are cached on disk so new workers skip Jinja compilation
+    app.config['JINJA_CACHE_DIR'] = os.environ.get('JINJA_CACHE_DIR') or os.path.join(app.instance_path, 'jinja_cache')
+
+    if test_config:
+        app.config.update(test_config)
+
+    os.makedirs(app.config['JINJA_CACHE_DIR'], exist_ok=True)
+    app.jinja_options = {
+        **app.jinja_options,
+        'bytecode_cache': FileSystemBytecodeCache(app.config['JINJA_CACHE_DIR'])
+    }
+
+    # Initialize extensions
+    db.init_app(app)
+    # Alembic is slow to import and only the `flask db` commands use it
+    if os.environ.get('FLASK_RUN_FROM_CLI') == 'true':
+        from flask_migrate import Migrate
+        Migrate(app, db)
+    csrf.init_app(app)
+    login_manager.init_app(app)
+    limiter.init_app(app)
+    page_cache.init_app(app)
+    assets.init_app(app)
+    metrics.init_app(app)
+    # after_request hooks run in reverse order, so request timings include compression
+    compression.init_app(app)
+    query_stats.init_app(app)
+    write_buffer.init_app(app)
+    profiler.init_app(app)
+    health.init_app(app)
+    # Asset, scrape, probe and profiling requests must not use up the per-client default limits
+    limiter.exempt(assets.bp)
+    limiter.exempt(metrics_bp)
+    limiter.exempt(profiling_bp)
+    limiter.exempt(health_bp)
+
+    app.register_blueprint(bp)
+    app.register_blueprint(provisioning_bp)
+    # The API has its own limits in place of the page defaults: per token, or per address without one
+    limiter.limit(app.config['API_RATE_LIMIT'], exempt_when=has_api_token)(api_bp)
+    limiter.limit(app.config['API_TOKEN_RATE_LIMIT'], key_func=token_rate_limit_key,
+                  exempt_when=lambda: not has_api_token())(api_bp)
+    # Scripts authenticate with tokens: no CSRF tokens and no session cookie
+    csrf.exempt(api_bp)
+    app.session_interface = ApiSessionInterface()
+    app.register_blueprint(api_bp)
+    app.cli.add_command(init_db_command)
+    cli.init_app(app)
+
+    return app
+
+def warm_up(app):
+    """Compile every template and load lazily imported modules before serving.
+
+    Called in the gunicorn master after preloading so workers inherit the
+    compiled templates instead of each compiling them on first request.
+    """
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    # Builds a Cleaner, which imports bleach and html5lib
+    sanitize_input('<warm-up>')
+
+@click.command('init-db')
+def init_db_command():
+    """Create the database tables."""
+    db.create_all()
+    click.echo('Database tables created.')
+
 if __name__ == '__main__':
+    app = create_app()
     with app.app_context():
         db.create_all()
     # Only run in debug mode if explicitly set in environment
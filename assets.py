@@ -0,0 +1,262 @@
+"""
+Static asset pipeline for NetMaster.
+
+`flask --app app assets build` downloads the third-party CSS/JS the templates
+used to pull from jsdelivr/cdnjs into static/vendor/, concatenates and
+minifies them together with our own files into the bundles below, and
+writes each bundle to static/dist/ under a content-hashed name with a
+precompressed .gz sibling. static/dist/manifest.json maps bundle names to
+the hashed files.
+
+Templates reference bundles through asset_url()/asset_urls(). With a
+manifest they point at /assets/<hashed name>, served with a one-year
+immutable Cache-Control, so repeat page loads make no asset requests at
+all. Without one (a fresh checkout) they fall back to the CDN and
+unbundled static URLs.
+"""
+
+import os
+import re
+import json
+import gzip
+import hashlib
+import mimetypes
+import urllib.request
+import click
+from flask import Blueprint, current_app, request, send_from_directory, url_for
+from flask.cli import AppGroup
+
+# Third-party files, by path under static/
+VENDOR = {
+    'vendor/bootstrap.min.css': 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
+    'vendor/bootstrap.bundle.min.js': 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js',
+    'vendor/bootstrap-icons/bootstrap-icons.css': 'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.0/font/bootstrap-icons.css',
+    'vendor/bootstrap-icons/fonts/bootstrap-icons.woff2': 'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.0/font/fonts/bootstrap-icons.woff2',
+    'vendor/bootstrap-icons/fonts/bootstrap-icons.woff': 'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.0/font/fonts/bootstrap-icons.woff',
+    'vendor/animate.min.css': 'https://cdnjs.cloudflare.com/ajax/libs/animate.css/4.1.1/animate.min.css',
+}
+
+# Bundle name -> source files under static/, in load order
+BUNDLES = {
+    'app.css': [
+        'vendor/bootstrap.min.css',
+        'vendor/bootstrap-icons/bootstrap-icons.css',
+        'vendor/animate.min.css',
+        'css/style.css',
+        'css/alerts.css',
+    ],
+    'app.js': ['vendor/bootstrap.bundle.min.js'],
+    'calculator.js': ['js/animation-scheduler.js', 'js/canvas-network-animation.js', 'js/virtual-table.js', 'js/subnet-engine.js', 'js/calculator.js'],
+    'landing.js': ['js/animation-scheduler.js', 'js/dom-network-animation.js', 'js/network-bg.js', 'js/subnet-simulation.js'],
+    'background.js': ['js/animation-scheduler.js', 'js/dom-network-animation.js'],
+    'favicon.ico': ['favicon.ico'],
+}
+
+# Files that are already compressed get no .gz sibling
+PRECOMPRESSED = ('.woff2', '.woff', '.png', '.jpg', '.gif')
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+CSS_URL_RE = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+bp = Blueprint('assets', __name__)
+assets_cli = AppGroup('assets', help='Build fingerprinted static asset bundles.')
+
+
+def init_app(app):
+    """Load the asset manifest and register the asset helpers"""
+    app.config.setdefault('ASSETS_DIST_DIR', os.path.join(app.static_folder, 'dist'))
+    manifest_path = os.path.join(app.config['ASSETS_DIST_DIR'], 'manifest.json')
+    try:
+        with open(manifest_path) as f:
+            app.extensions['assets_manifest'] = json.load(f)
+    except (OSError, ValueError):
+        app.extensions['assets_manifest'] = {}
+    app.jinja_env.globals['asset_urls'] = asset_urls
+    app.jinja_env.globals['asset_url'] = asset_url
+    app.register_blueprint(bp)
+    app.cli.add_command(assets_cli)
+
+
+def asset_urls(name):
+    """URLs to include for a bundle: the hashed file, or its unbundled sources"""
+    hashed = current_app.extensions['assets_manifest'].get(name)
+    if hashed:
+        return [url_for('assets.asset', filename=hashed)]
+    return [VENDOR.get(src) or url_for('static', filename=src) for src in BUNDLES[name]]
+
+
+def asset_url(name):
+    """URL of a single-file bundle"""
+    return asset_urls(name)[0]
+
+
+@bp.route('/assets/<path:filename>')
+def asset(filename):
+    """Serve a fingerprinted file, precompressed when the client accepts gzip"""
+    directory = current_app.config['ASSETS_DIST_DIR']
+    if request.accept_encodings['gzip'] and os.path.isfile(os.path.join(directory, filename + '.gz')):
+        response = send_from_directory(directory, filename + '.gz',
+                                       mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = send_from_directory(directory, filename)
+    response.headers['Cache-Control'] = IMMUTABLE
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def minify_css(text):
+    """Strip comments and redundant whitespace from CSS"""
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{};,])\s*', r'\1', text)
+    return text.replace(';}', '}').strip()
+
+
+def minify_js(text):
+    """Conservative JS minification: drop comments at the start of a line, indentation and
+    blank lines.
+
+    Code after a closing */ on the same line is kept. Lines inside template literals are kept
+    verbatim.
+    """
+    out = []
+    in_template = False
+    in_comment = False
+    for line in text.splitlines():
+        if in_template:
+            out.append(line)
+            kept = line
+        else:
+            kept = line.strip()
+            if in_comment:
+                if '*/' not in kept:
+                    continue
+                kept = kept.split('*/', 1)[1].strip()
+                in_comment = False
+            while kept.startswith('/*'):
+                if '*/' not in kept[2:]:
+                    in_comment = True
+                    kept = ''
+                    break
+                kept = kept[2:].split('*/', 1)[1].strip()
+            if kept.startswith('//') or not kept:
+                continue
+            out.append(kept)
+        if kept.replace('\\`', '').count('`') % 2:
+            in_template = not in_template
+    return '\n'.join(out)
+
+
+def fingerprint(name, data):
+    """Return name with a content hash inserted before the extension"""
+    base, ext = os.path.splitext(name)
+    return f'{base}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+
+
+class AssetBuilder:
+    """Builds bundles from static/ into the dist directory"""
+
+    def __init__(self, static_dir, dist_dir, download=True):
+        self.static_dir = static_dir
+        self.dist_dir = dist_dir
+        self.download = download
+        self.written = set()
+
+    def source_path(self, src):
+        path = os.path.join(self.static_dir, src)
+        if not os.path.exists(path) and src in VENDOR:
+            if not self.download:
+                raise click.ClickException(f'{src} is missing and downloads are disabled')
+            url = VENDOR[src]
+            click.echo(f'Downloading {url}')
+            try:
+                with urllib.request.urlopen(url, timeout=30) as resp:
+                    data = resp.read()
+            except OSError as e:
+                raise click.ClickException(f'Could not download {url}: {e}. Place the file at {path} and retry.')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(data)
+        return path
+
+    def write(self, name, data):
+        """Write a fingerprinted file (and .gz sibling) and return its name"""
+        hashed = fingerprint(name, data)
+        path = os.path.join(self.dist_dir, hashed)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        self.written.add(hashed)
+        if not hashed.endswith(PRECOMPRESSED):
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(compressed) < len(data):
+                with open(path + '.gz', 'wb') as f:
+                    f.write(compressed)
+                self.written.add(hashed + '.gz')
+        return hashed
+
+    def rewrite_css_urls(self, css, src):
+        """Fingerprint files referenced by url() and point at the copies"""
+        def replace(match):
+            ref = match.group(2)
+            if ref.startswith(('data:', 'http:', 'https:', '/', '#')):
+                return match.group(0)
+            ref_path, _, fragment = ref.partition('#')
+            ref_path = ref_path.split('?', 1)[0]
+            target = os.path.normpath(os.path.join(os.path.dirname(src), ref_path))
+            with open(self.source_path(target), 'rb') as f:
+                hashed = self.write(os.path.basename(target), f.read())
+            return f'url("{hashed}{"#" + fragment if fragment else ""}")'
+        return CSS_URL_RE.sub(replace, css)
+
+    def build_bundle(self, name, sources):
+        ext = os.path.splitext(name)[1]
+        if ext not in ('.css', '.js'):
+            with open(self.source_path(sources[0]), 'rb') as f:
+                return self.write(name, f.read())
+        parts = []
+        for src in sources:
+            with open(self.source_path(src), encoding='utf-8') as f:
+                text = f.read()
+            minified = '.min.' in src
+            if ext == '.css':
+                text = self.rewrite_css_urls(text, src)
+                parts.append(text if minified else minify_css(text))
+            else:
+                parts.append(text if minified else minify_js(text))
+        separator = '\n' if ext == '.css' else ';\n'
+        return self.write(name, separator.join(parts).encode('utf-8'))
+
+    def build(self):
+        manifest = {name: self.build_bundle(name, sources) for name, sources in BUNDLES.items()}
+        with open(os.path.join(self.dist_dir, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        return manifest
+
+    def prune(self):
+        """Remove hashed files from earlier builds"""
+        removed = 0
+        for entry in os.listdir(self.dist_dir):
+            if entry != 'manifest.json' and entry not in self.written:
+                os.remove(os.path.join(self.dist_dir, entry))
+                removed += 1
+        return removed
+
+
+@assets_cli.command('build')
+@click.option('--download/--no-download', default=True, help='Fetch missing vendor files from their CDNs.')
+@click.option('--prune/--no-prune', default=True, help='Delete files left over from previous builds.')
+def build_command(download, prune):
+    """Vendor, bundle, minify, fingerprint and precompress static assets."""
+    builder = AssetBuilder(current_app.static_folder, current_app.config['ASSETS_DIST_DIR'], download=download)
+    manifest = builder.build()
+    for name, hashed in sorted(manifest.items()):
+        size = os.path.getsize(os.path.join(builder.dist_dir, hashed))
+        click.echo(f'{name:<16} -> {hashed} ({size} bytes)')
+    if prune:
+        removed = builder.prune()
+        if removed:
+            click.echo(f'Removed {removed} stale files.')
+    click.echo('Restart the application to pick up the new manifest.')
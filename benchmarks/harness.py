@@ -0,0 +1,107 @@
+"""
+Timing, result files and baseline comparison for the NetMaster benchmark suite.
+"""
+
+import os
+import gc
+import sys
+import json
+import time
+import platform
+import statistics
+import subprocess
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(func, min_time=0.2, repeat=5, max_iterations=1_000_000):
+    """Time func() and return per-call statistics in seconds.
+
+    The number of calls per round is calibrated so one round takes at least
+    min_time / repeat; the median over `repeat` rounds is the headline number.
+    """
+    func()  # warm up caches and lazy imports
+    target = min_time / repeat
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= target or iterations >= max_iterations:
+            break
+        iterations = min(max_iterations, iterations * 10 if elapsed < target / 10 else iterations * 2)
+
+    rounds = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                func()
+            rounds.append((time.perf_counter() - start) / iterations)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return {
+        'median_s': statistics.median(rounds),
+        'min_s': min(rounds),
+        'stdev_s': statistics.stdev(rounds) if len(rounds) > 1 else 0.0,
+        'iterations': iterations,
+        'rounds': repeat,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata():
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'git_revision': git_revision(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def save(path, results):
+    with open(path, 'w') as f:
+        json.dump({'meta': metadata(), 'results': results}, f, indent=2, sort_keys=True)
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)['results']
+
+
+def compare(results, baseline, threshold):
+    """Return rows comparing median times; 'regressed' is set beyond threshold (0.10 = 10%)"""
+    rows = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        ratio = current['median_s'] / base['median_s'] if base['median_s'] else float('inf')
+        rows.append({
+            'name': name,
+            'baseline_s': base['median_s'],
+            'current_s': current['median_s'],
+            'change': ratio - 1,
+            'regressed': ratio - 1 > threshold,
+        })
+    return rows
+
+
+def format_time(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:.2f} {unit}'
+    return f'{seconds / 1e-9:.0f} ns'
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Rate limit storage benchmark for NetMaster.
+
+Measures the cost of one rate limit check (FixedWindowRateLimiter.hit) with
+the in-memory storage and with the shared SQLite storage, first from one
+process and then from several processes hitting the same file, as gunicorn
+workers would.
+
+Usage:
+    python3 benchmarks/limiter_storage.py [--hits 20000] [--processes 4]
+"""
+
+import os
+import sys
+import time
+import json
+import argparse
+import tempfile
+import statistics
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+import limiter_storage  # noqa: F401  registers the sqlite:// scheme
+
+
+def time_hits(uri, hits, keys=50):
+    """Return per-hit latencies in microseconds"""
+    limiter = FixedWindowRateLimiter(storage_from_string(uri))
+    item = parse('1000000 per hour')
+    samples = []
+    for i in range(hits):
+        start = time.perf_counter()
+        limiter.hit(item, f'127.0.0.{i % keys}', 'login')
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+def _worker(args):
+    uri, hits = args
+    return time_hits(uri, hits)
+
+
+def summarize(name, samples, wall):
+    samples = sorted(samples)
+    return {
+        'storage': name,
+        'hits': len(samples),
+        'p50_us': round(statistics.median(samples), 1),
+        'p99_us': round(samples[int(len(samples) * 0.99) - 1], 1),
+        'hits_per_sec': round(len(samples) / wall),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hits', type=int, default=20000, help='hits per process')
+    parser.add_argument('--processes', type=int, default=4, help='concurrent processes for the shared run')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite_uri = f"sqlite:///{os.path.join(tmp, 'ratelimit.db')}"
+        for name, uri in (('memory', 'memory://'), ('sqlite', sqlite_uri)):
+            start = time.perf_counter()
+            samples = time_hits(uri, args.hits)
+            results.append(summarize(name, samples, time.perf_counter() - start))
+
+        start = time.perf_counter()
+        with multiprocessing.Pool(args.processes) as pool:
+            per_process = pool.map(_worker, [(sqlite_uri, args.hits)] * args.processes)
+        samples = [s for chunk in per_process for s in chunk]
+        results.append(summarize(f'sqlite x{args.processes} processes', samples, time.perf_counter() - start))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'storage':<24} {'hits':>8} {'p50 us':>8} {'p99 us':>8} {'hits/s':>10}")
+    for r in results:
+        print(f"{r['storage']:<24} {r['hits']:>8} {r['p50_us']:>8} {r['p99_us']:>8} {r['hits_per_sec']:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Login load benchmark for NetMaster.
+
+Starts the app under gunicorn against a throwaway SQLite database, hammers
+/login from several client threads and, at the same time, measures the
+latency of GET /calculator. Each scenario is run once with hashing in the
+request thread (PASSWORD_HASH_WORKERS=0) and once with the process pool.
+
+Usage:
+    python3 benchmarks/login_load.py [--duration 10] [--clients 16]
+"""
+
+import os
+import re
+import sys
+import time
+import json
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import statistics
+import http.cookiejar
+import urllib.error
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSRF_RE = re.compile(r'name="csrf_token" value="([^"]+)"')
+USERNAME = 'benchuser'
+PASSWORD = 'BenchPass123'
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def seed_database(env):
+    """Create the schema and the benchmark user in a separate interpreter"""
+    code = (
+        "from app import create_app, db, User\n"
+        "app = create_app()\n"
+        "with app.app_context():\n"
+        "    db.create_all()\n"
+        f"    u = User(username={USERNAME!r}, email='bench@example.com')\n"
+        f"    u.set_password({PASSWORD!r})\n"
+        "    db.session.add(u)\n"
+        "    db.session.commit()\n"
+    )
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, check=True)
+
+
+def start_server(env, port, workers, threads):
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'wsgi:app',
+         '--bind', f'127.0.0.1:{port}',
+         '--worker-class', 'gthread',
+         '--workers', str(workers),
+         '--threads', str(threads),
+         '--log-level', 'warning'],
+        cwd=ROOT, env=env
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/landing', timeout=1).read()
+            return proc
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError('gunicorn did not come up within 30 seconds')
+
+
+def login_once(base):
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar), NoRedirect)
+    page = opener.open(f'{base}/login', timeout=30).read().decode()
+    token = CSRF_RE.search(page).group(1)
+    body = urllib.parse.urlencode({
+        'csrf_token': token, 'username': USERNAME, 'password': PASSWORD
+    }).encode()
+    try:
+        opener.open(f'{base}/login', data=body, timeout=30)
+    except urllib.error.HTTPError as e:
+        return e.code
+    return 200
+
+
+def run_scenario(env, hash_workers, duration, clients, workers, threads):
+    env = dict(env, PASSWORD_HASH_WORKERS=str(hash_workers))
+    port = free_port()
+    base = f'http://127.0.0.1:{port}'
+    proc = start_server(env, port, workers, threads)
+    stop = threading.Event()
+    outcomes = {}
+    calc_latencies = []
+    lock = threading.Lock()
+
+    def login_client():
+        while not stop.is_set():
+            try:
+                code = login_once(base)
+            except Exception:
+                code = 'error'
+            with lock:
+                outcomes[code] = outcomes.get(code, 0) + 1
+
+    def calculator_probe():
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                urllib.request.urlopen(f'{base}/calculator', timeout=30).read()
+                calc_latencies.append(time.perf_counter() - start)
+            except Exception:
+                pass
+            time.sleep(0.05)
+
+    try:
+        pool = [threading.Thread(target=login_client) for _ in range(clients)]
+        pool.append(threading.Thread(target=calculator_probe))
+        for t in pool:
+            t.start()
+        time.sleep(duration)
+        stop.set()
+        for t in pool:
+            t.join()
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    ok = outcomes.get(302, 0)
+    calc_ms = sorted(x * 1000 for x in calc_latencies) or [0.0]
+    return {
+        'hash_workers': hash_workers,
+        'logins_per_sec': round(ok / duration, 2),
+        'login_outcomes': {str(k): v for k, v in outcomes.items()},
+        'calculator_p50_ms': round(statistics.median(calc_ms), 2),
+        'calculator_p95_ms': round(calc_ms[int(len(calc_ms) * 0.95) - 1 if len(calc_ms) > 1 else 0], 2),
+        'calculator_samples': len(calc_latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=10, help='seconds per scenario')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent login clients')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--threads', type=int, default=4, help='gunicorn threads per worker')
+    parser.add_argument('--pool-size', type=int, default=2, help='hash pool processes for the pooled run')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.setdefault('FLASK_SECRET_KEY', 'benchmark-secret')
+        env['DATABASE_URL'] = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        env['RATELIMIT_ENABLED'] = 'False'
+        seed_database(dict(env, PASSWORD_HASH_WORKERS='0'))
+
+        results = [
+            run_scenario(env, n, args.duration, args.clients, args.workers, args.threads)
+            for n in (0, args.pool_size)
+        ]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'hash workers':>12} {'logins/s':>10} {'calc p50 ms':>12} {'calc p95 ms':>12}  outcomes")
+    for r in results:
+        print(f"{r['hash_workers']:>12} {r['logins_per_sec']:>10} {r['calculator_p50_ms']:>12} "
+              f"{r['calculator_p95_ms']:>12}  {r['login_outcomes']}")
+
+
+if __name__ == '__main__':
+    main()
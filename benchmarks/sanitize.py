@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Input sanitization benchmark for NetMaster.
+
+Compares bleach.clean(text, strip=True), which the app used to call for
+every field, with sanitize.sanitize_input() on small form fields and on
+multi-megabyte notes with and without markup. Every output is checked to
+be identical to bleach's before timings are reported.
+
+Usage:
+    python3 benchmarks/sanitize.py [--json]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bleach
+from sanitize import sanitize_input, sanitize_many
+
+
+def calculation_note(size):
+    """A note body like the ones saved from the calculator"""
+    rng = random.Random(42)
+    lines = []
+    total = 0
+    while total < size:
+        a, b = rng.randrange(256), rng.randrange(256)
+        line = (f'VLAN {rng.randrange(1, 4095)} Sales-{a}: network 10.{a}.{b}.0 '
+                f'mask 255.255.255.0 gateway 10.{a}.{b}.1 hosts 254')
+        lines.append(line)
+        total += len(line) + 1
+    return '\n'.join(lines)
+
+
+def cases():
+    note_1mb = calculation_note(1 << 20)
+    note_4mb = calculation_note(4 << 20)
+    return [
+        ('username', ['network_admin_42'] * 2000),
+        ('title', ['Office subnet plan 10.20.0.0/16'] * 2000),
+        ('title with markup', ['Plan <b>v2</b> & notes'] * 2000),
+        ('vlan names x100', [[f'Department {i}' for i in range(100)]] * 50),
+        ('note 1 MB', [note_1mb] * 3),
+        ('note 4 MB', [note_4mb]),
+        ('note 1 MB with markup', [note_1mb + '\n<script>alert(1)</script>']),
+    ]
+
+
+def measure(func, inputs):
+    start = time.perf_counter()
+    outputs = [func(x) for x in inputs]
+    return (time.perf_counter() - start) / len(inputs), outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    results = []
+    for name, inputs in cases():
+        if isinstance(inputs[0], list):
+            def baseline(batch):
+                return [bleach.clean(t, strip=True) for t in batch]
+            candidate = sanitize_many
+        else:
+            def baseline(text):
+                return bleach.clean(text, strip=True)
+            candidate = sanitize_input
+        base_time, expected = measure(baseline, inputs)
+        new_time, actual = measure(candidate, inputs)
+        if actual != expected:
+            raise SystemExit(f'{name}: output differs from bleach.clean')
+        results.append({
+            'case': name,
+            'bleach_us': round(base_time * 1e6, 1),
+            'sanitize_us': round(new_time * 1e6, 1),
+            'speedup': round(base_time / new_time, 1) if new_time else None,
+        })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'case':<24} {'bleach us':>14} {'sanitize us':>14} {'speedup':>9}")
+    for r in results:
+        print(f"{r['case']:<24} {r['bleach_us']:>14} {r['sanitize_us']:>14} {r['speedup']:>8}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Startup time benchmark for NetMaster.
+
+Each run uses a fresh interpreter (as a new gunicorn worker or CLI call
+would) and measures:
+    import_ms          import app
+    create_app_ms      create_app()
+    first_request_ms   first GET /landing (template compile or bytecode cache load)
+    second_request_ms  second GET /landing
+
+Runs alternate between a cold Jinja bytecode cache and a warm one.
+
+Usage:
+    python3 benchmarks/startup.py [--runs 5] [--json]
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r'''
+import json, time
+t0 = time.perf_counter()
+import app as netmaster
+t1 = time.perf_counter()
+application = netmaster.create_app()
+t2 = time.perf_counter()
+client = application.test_client()
+client.get('/landing')
+t3 = time.perf_counter()
+client.get('/landing')
+t4 = time.perf_counter()
+print(json.dumps({
+    'import_ms': (t1 - t0) * 1000,
+    'create_app_ms': (t2 - t1) * 1000,
+    'first_request_ms': (t3 - t2) * 1000,
+    'second_request_ms': (t4 - t3) * 1000,
+}))
+'''
+
+
+def probe(env):
+    out = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                         check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='interpreter launches per scenario')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = os.path.join(tmp, 'jinja_cache')
+        env = dict(os.environ)
+        env.setdefault('FLASK_SECRET_KEY', 'benchmark-secret')
+        env['DATABASE_URL'] = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        env['RATELIMIT_STORAGE_URI'] = f'sqlite:///{os.path.join(tmp, "ratelimit.db")}'
+        env['JINJA_CACHE_DIR'] = cache_dir
+
+        for scenario in ('cold_cache', 'warm_cache'):
+            samples = []
+            for _ in range(args.runs):
+                if scenario == 'cold_cache':
+                    shutil.rmtree(cache_dir, ignore_errors=True)
+                samples.append(probe(env))
+            results[scenario] = {
+                key: round(statistics.median(s[key] for s in samples), 2)
+                for key in samples[0]
+            }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    keys = list(next(iter(results.values())))
+    print(f"{'scenario':<12}" + ''.join(f'{k:>20}' for k in keys))
+    for scenario, values in results.items():
+        print(f'{scenario:<12}' + ''.join(f'{values[k]:>20}' for k in keys))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Checks and times the browser subnet engine against the server's.
+
+Builds a set of test vectors (valid and invalid networks, host counts and
+VLAN lists, including edge cases), runs them through validate_ip_cidr,
+plan_host_subnet and plan_vlan_subnets in app.py and through
+static/js/subnet-engine.js under node, and fails if any result or error
+message differs. Then reports the time per calculation on each side.
+
+Usage:
+    python3 benchmarks/subnet_engine.py [--cases 2000] [--seed 1] [--json]
+    python3 benchmarks/subnet_engine.py --dump vectors.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('FLASK_SECRET_KEY', 'benchmark-secret')
+
+from app import validate_ip_cidr, plan_host_subnet, plan_vlan_subnets, SubnetCalculationError
+
+ENGINE = os.path.join(ROOT, 'static', 'js', 'subnet-engine.js')
+
+FIXED_NETWORKS = [
+    '', '   ', '10.0.0.0', '10.0.0.0/', '10.0.0.0/33', '10.0.0.0/0', '10.0.0.0/08', ' 10.0.0.0/8 ',
+    '010.0.0.0/8', '10.00.0.0/16', '256.0.0.0/8', '10.0.0.1/24', '10.0.0.0/32', '10.0.0.0/31',
+    '10.0.0.0/7', '127.0.0.0/8', '169.254.0.0/16', '224.0.0.0/8', '240.0.0.0/8', '8.8.8.0/24',
+    '0.0.0.0/8', '192.0.2.0/24', '198.18.0.0/15', '255.255.255.254/31', '172.16.0.0/12',
+    '172.15.0.0/16', '192.168.1.0/24', '192.168.1.0/30', '1.2.3.4/32', 'a.b.c.d/8', '10.0.0.0/8/8',
+]
+PRIVATE_BASES = ['10.0.0.0', '172.16.0.0', '192.168.0.0', '198.18.0.0', '203.0.113.0', '8.0.0.0', '100.64.0.0']
+
+
+def random_network(rng):
+    base = rng.choice(PRIVATE_BASES).split('.')
+    prefix = rng.randint(1, 32)
+    address = 0
+    for octet in base:
+        address = address * 256 + int(octet)
+    if rng.random() < 0.8:
+        address &= (0xFFFFFFFF << (32 - prefix)) & 0xFFFFFFFF
+    if rng.random() < 0.1:
+        address |= rng.getrandbits(32 - prefix)
+    ip = '.'.join(str((address >> shift) & 255) for shift in (24, 16, 8, 0))
+    return f'{ip}/{prefix}'
+
+
+def build_vectors(count, seed):
+    rng = random.Random(seed)
+    networks = FIXED_NETWORKS + [random_network(rng) for _ in range(count)]
+    host_counts = [0, 1, 2, 3, 254, 255, 4094]
+    vectors = {'validate': [], 'host': [], 'vlan': []}
+    for network in networks:
+        valid, message = validate_ip_cidr(network)
+        vectors['validate'].append({'input': network, 'error': None if valid else message})
+        # /calculate_subnets strips the input before planning
+        network = network.strip()
+        for num_hosts in rng.sample(host_counts, 2) + [rng.randint(1, 4094)]:
+            vectors['host'].append(expected(network, num_hosts, plan_host_subnet))
+        num_vlans = rng.choice([1, 2, 3, 7, 16, 64, 100, rng.randint(1, 300)])
+        vlans = [{'vlan_id': rng.randint(1, 4094), 'vlan_name': f'VLAN {i}'} for i in range(num_vlans)]
+        vectors['vlan'].append(expected(network, vlans, lambda n, v: list(plan_vlan_subnets(n, v))))
+    return vectors
+
+
+def expected(network, argument, plan):
+    try:
+        return {'network': network, 'argument': argument, 'rows': plan(network, argument), 'error': None}
+    except SubnetCalculationError as e:
+        return {'network': network, 'argument': argument, 'rows': None, 'error': str(e)}
+
+
+NODE_RUNNER = r"""
+const engine = require(process.argv[1]);
+const vectors = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+function run(plan, v) {
+    try { return { rows: plan(v.network, v.argument), error: null }; }
+    catch (e) { if (e instanceof engine.SubnetError) return { rows: null, error: e.message }; throw e; }
+}
+const out = {
+    validate: vectors.validate.map(v => ({ error: engine.validateIpCidr(v.input) })),
+    host: vectors.host.map(v => run(engine.planHostSubnet, v)),
+    vlan: vectors.vlan.map(v => run(engine.planVlanSubnets, v)),
+    timing: {},
+};
+for (const [name, plan] of [['host', engine.planHostSubnet], ['vlan', engine.planVlanSubnets]]) {
+    let calls = 0;
+    const start = process.hrtime.bigint();
+    while (Number(process.hrtime.bigint() - start) < 5e8) {
+        for (const v of vectors[name]) { try { plan(v.network, v.argument); } catch (e) {} calls++; }
+    }
+    out.timing[name] = Number(process.hrtime.bigint() - start) / 1e9 / calls;
+}
+process.stdout.write(JSON.stringify(out));
+"""
+
+
+def python_time(vectors, name, plan):
+    calls = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < 0.5:
+        for v in vectors[name]:
+            try:
+                plan(v['network'], v['argument'])
+            except SubnetCalculationError:
+                pass
+            calls += 1
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', type=int, default=2000, help='random networks on top of the fixed edge cases')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for the vectors')
+    parser.add_argument('--dump', help='write the vectors to this file and exit')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    vectors = build_vectors(args.cases, args.seed)
+    if args.dump:
+        with open(args.dump, 'w') as f:
+            json.dump(vectors, f, indent=1)
+        return
+    if not shutil.which('node'):
+        raise SystemExit('node is required to run the browser engine')
+
+    proc = subprocess.run(['node', '-e', NODE_RUNNER, ENGINE], input=json.dumps(vectors),
+                          capture_output=True, text=True, check=True)
+    actual = json.loads(proc.stdout)
+
+    mismatches = []
+    for name in ('validate', 'host', 'vlan'):
+        for want, got in zip(vectors[name], actual[name]):
+            if want.get('error') != got['error'] or want.get('rows') != got.get('rows'):
+                mismatches.append((name, want.get('input', want.get('network')), want.get('error'), got['error']))
+    if mismatches:
+        for name, network, want, got in mismatches[:20]:
+            print(f'{name} {network!r}: server={want!r} browser={got!r}')
+        raise SystemExit(f'{len(mismatches)} mismatches between app.py and subnet-engine.js')
+
+    results = {
+        'vectors': {name: len(vectors[name]) for name in ('validate', 'host', 'vlan')},
+        'python_us': {
+            'host': round(python_time(vectors, 'host', plan_host_subnet) * 1e6, 2),
+            'vlan': round(python_time(vectors, 'vlan', lambda n, v: list(plan_vlan_subnets(n, v))) * 1e6, 2),
+        },
+        'node_us': {name: round(value * 1e6, 2) for name, value in actual['timing'].items()},
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"All {sum(results['vectors'].values())} vectors match.")
+    print(f"{'calculation':<12} {'python us':>10} {'node us':>10}")
+    for name in ('host', 'vlan'):
+        print(f"{name:<12} {results['python_us'][name]:>10} {results['node_us'][name]:>10}")
+
+
+if __name__ == '__main__':
+    main()
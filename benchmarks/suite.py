@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark suite for NetMaster's hot paths.
+
+Covers validate_ip_cidr, the subnet calculations (plan_host_subnet and
+plan_vlan_subnets, the computation behind calculate_host_subnet and
+calculate_vlan_subnet without the progress pacing), sanitize_input,
+Note.get_all_paginated and /export_data. Everything runs offline against
+a temporary SQLite database.
+
+Usage:
+    python3 benchmarks/suite.py                          run everything
+    python3 benchmarks/suite.py --quick -k vlan          smaller datasets, filtered
+    python3 benchmarks/suite.py --output current.json
+    python3 benchmarks/suite.py --baseline baseline.json --threshold 0.10
+
+With --baseline the run exits with status 1 if any benchmark's median is
+more than --threshold slower than in the baseline file.
+"""
+
+import os
+import sys
+import argparse
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('FLASK_SECRET_KEY', 'benchmark-secret')
+
+import harness
+
+NETWORKS = {'/8': '10.0.0.0/8', '/16': '10.1.0.0/16', '/24': '192.168.1.0/24', '/30': '192.168.1.0/30'}
+VLAN_COUNTS = [1, 16, 256, 4094]
+NOTE_COUNTS = {'quick': [10, 1_000, 10_000], 'full': [10, 1_000, 100_000, 1_000_000]}
+EXPORT_COUNTS = {'quick': [10, 1_000, 10_000], 'full': [10, 1_000, 10_000, 100_000]}
+
+NOTE_BODY = '\n'.join(
+    f'VLAN {i}: network 10.0.{i}.0 mask 255.255.255.0 gateway 10.0.{i}.1 usable 254'
+    for i in range(1, 11)
+)
+
+
+def seed_notes(db_path, user_id, count):
+    """Insert a user with `count` notes straight into SQLite"""
+    conn = sqlite3.connect(db_path)
+    now = datetime(2025, 1, 1)
+    conn.execute(
+        'INSERT INTO user (id, username, email, password_hash, theme, language, '
+        'default_calculation_mode, auto_save_results, created_at, updated_at) '
+        "VALUES (?, ?, ?, '', 'auto', 'en', 'host', 'ask', ?, ?)",
+        (user_id, f'bench_{user_id}', f'{user_id}@example.com', str(now), str(now))
+    )
+    rows = (
+        (f'Plan {i}', NOTE_BODY, str(now + timedelta(seconds=i)), str(now + timedelta(seconds=i)), user_id)
+        for i in range(count)
+    )
+    conn.executemany('INSERT INTO note (title, content, created_at, updated_at, user_id) VALUES (?, ?, ?, ?, ?)', rows)
+    conn.commit()
+    conn.close()
+
+
+def build_cases(app, db_path, size):
+    import app as netmaster
+    from sanitize import sanitize_input, sanitize_many
+
+    cases = {}
+    for label, network in NETWORKS.items():
+        cases[f'validate_ip_cidr[{label}]'] = lambda n=network: netmaster.validate_ip_cidr(n)
+        hosts = 2 if label == '/30' else 50
+        cases[f'plan_host_subnet[{label},hosts={hosts}]'] = (
+            lambda n=network, h=hosts: netmaster.plan_host_subnet(n, h))
+    for count in VLAN_COUNTS:
+        vlans = [{'vlan_id': i % 4094 + 1, 'vlan_name': f'VLAN {i}'} for i in range(count)]
+        cases[f'plan_vlan_subnets[/8,vlans={count}]'] = (
+            lambda v=vlans: list(netmaster.plan_vlan_subnets('10.0.0.0/8', v)))
+
+    cases['sanitize_input[field]'] = lambda: sanitize_input('Office subnet plan 10.20.0.0/16')
+    cases['sanitize_input[markup field]'] = lambda: sanitize_input('Plan <b>v2</b> & notes')
+    big_note = NOTE_BODY * (1_000_000 // len(NOTE_BODY))
+    cases['sanitize_input[note 1MB]'] = lambda: sanitize_input(big_note)
+    names = [f'Department {i}' for i in range(100)]
+    cases['sanitize_many[100 vlan names]'] = lambda: sanitize_many(names)
+
+    note_counts = sorted(set(NOTE_COUNTS[size]) | set(EXPORT_COUNTS[size]))
+    for count in note_counts:
+        seed_notes(db_path, f'U{count:07d}', count)
+
+    for count in NOTE_COUNTS[size]:
+        user_id = f'U{count:07d}'
+        last_page = max(1, (count + 9) // 10)
+
+        def first_page(u=user_id):
+            with app.app_context():
+                netmaster.Note.get_all_paginated(1, 10, u).items
+        cases[f'notes_first_page[rows={count}]'] = first_page
+
+        def deep_page(u=user_id, p=last_page):
+            with app.app_context():
+                netmaster.Note.get_all_paginated(p, 10, u).items
+        cases[f'notes_last_page[rows={count}]'] = deep_page
+
+    for count in EXPORT_COUNTS[size]:
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = f'U{count:07d}'
+            sess['_fresh'] = True
+
+        def export(c=client):
+            response = c.get('/export_data')
+            assert response.status_code == 200, response.status_code
+        cases[f'export_data[rows={count}]'] = export
+
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quick', action='store_true', help='smaller datasets and shorter timing')
+    parser.add_argument('-k', '--filter', default='', help='only run benchmarks whose name contains this')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='compare against a results file from an earlier run')
+    parser.add_argument('--threshold', type=float, default=0.10, help='allowed slowdown before failing (default 0.10)')
+    args = parser.parse_args()
+    size = 'quick' if args.quick else 'full'
+
+    from app import create_app, db
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+            'RATELIMIT_ENABLED': False,
+            'JINJA_CACHE_DIR': os.path.join(tmp, 'jinja_cache'),
+        })
+        with app.app_context():
+            db.create_all()
+
+        results = {}
+        for name, func in build_cases(app, db_path, size).items():
+            if args.filter not in name:
+                continue
+            results[name] = harness.measure(func, min_time=0.1 if args.quick else 0.5)
+            print(f"{name:<44} {harness.format_time(results[name]['median_s']):>12}", flush=True)
+
+    if args.output:
+        harness.save(args.output, results)
+
+    if args.baseline:
+        rows = harness.compare(results, harness.load(args.baseline), args.threshold)
+        regressions = [r for r in rows if r['regressed']]
+        print()
+        for r in rows:
+            flag = 'REGRESSION' if r['regressed'] else ''
+            print(f"{r['name']:<44} {harness.format_time(r['baseline_s']):>12} -> "
+                  f"{harness.format_time(r['current_s']):>12} {r['change']:+8.1%} {flag}")
+        if regressions:
+            print(f'\n{len(regressions)} benchmark(s) slower than baseline by more than {args.threshold:.0%}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
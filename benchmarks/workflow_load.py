@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test replaying the calculator workflow.
+
+Starts the app under gunicorn against a throwaway SQLite database and runs
+a number of virtual users, each with its own cookie jar, through the same
+sequence the browser follows:
+
+    GET  /calculator                 read the CSRF token
+    POST /calculate_subnets          host or VLAN mode
+    GET  /get_progress/<task_id>     polled until 100% or an error
+    POST /notes/from_calculator      logged-in users only, sometimes
+
+A share of the users log in first with seeded accounts; the rest stay
+anonymous. Throughput, p50/p95/p99 latency and error rate are reported per
+route, along with the time for a whole workflow.
+
+Calculation progress is kept in the memory of the worker that started the
+calculation, so with more than one gunicorn worker some polls land on a
+worker that has never heard of the task. Workflows then take longer, and
+those that exceed --poll-timeout show up as "poll timeout" errors.
+
+Usage:
+    python3 benchmarks/workflow_load.py [--users 20] [--logged-in 0.5] [--duration 30]
+    python3 benchmarks/workflow_load.py --workers 1 --threads 16 --vlan-ratio 0.5 --json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.cookiejar
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from login_load import CSRF_RE, ROOT, NoRedirect, free_port, start_server
+
+PASSWORD = 'LoadTest123'
+VLAN_NETWORKS = ['10.0.0.0/8', '172.16.0.0/12', '10.20.0.0/16']
+# (network, largest host count that fits) so host-mode requests succeed like real ones
+HOST_NETWORKS = [('192.168.1.0/24', 254), ('172.20.4.0/22', 1022), ('10.10.0.0/16', 4094), ('10.0.0.0/8', 4094)]
+
+
+def seed_users(env, count):
+    """Create the schema and `count` accounts in a separate interpreter"""
+    code = (
+        "import sys\n"
+        "from app import create_app, db, User\n"
+        "app = create_app()\n"
+        "with app.app_context():\n"
+        "    db.create_all()\n"
+        "    for i in range(int(sys.argv[1])):\n"
+        "        u = User(username=f'loaduser{i}', email=f'loaduser{i}@example.com')\n"
+        f"        u.set_password({PASSWORD!r})\n"
+        "        db.session.add(u)\n"
+        "    db.session.commit()\n"
+    )
+    subprocess.run([sys.executable, '-c', code, str(count)], cwd=ROOT, env=env, check=True)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Stats:
+    """Latency samples and outcomes per route, shared by all virtual users"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, route, elapsed, ok, reason=None):
+        with self.lock:
+            self.latencies.setdefault(route, []).append(elapsed)
+            if not ok:
+                errors = self.errors.setdefault(route, {})
+                errors[reason] = errors.get(reason, 0) + 1
+
+    def summary(self, duration):
+        rows = []
+        for route, samples in sorted(self.latencies.items()):
+            ms = sorted(x * 1000 for x in samples)
+            errors = self.errors.get(route, {})
+            failed = sum(errors.values())
+            rows.append({
+                'route': route,
+                'requests': len(ms),
+                'per_sec': round(len(ms) / duration, 2),
+                'p50_ms': round(percentile(ms, 50), 2),
+                'p95_ms': round(percentile(ms, 95), 2),
+                'p99_ms': round(percentile(ms, 99), 2),
+                'max_ms': round(ms[-1], 2),
+                'error_rate': round(failed / len(ms), 4),
+                'errors': {str(k): v for k, v in errors.items()},
+            })
+        return rows
+
+
+class VirtualUser:
+    def __init__(self, base, stats, args, rng, username=None):
+        self.base = base
+        self.stats = stats
+        self.args = args
+        self.rng = rng
+        self.username = username
+        jar = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar), NoRedirect)
+
+    def request(self, route, path, data=None, headers=None, json_body=None):
+        """Send one request and record it; returns (status, body) or (None, None)"""
+        headers = dict(headers or {})
+        if json_body is not None:
+            data = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+            headers['X-Requested-With'] = 'XMLHttpRequest'
+        req = urllib.request.Request(self.base + path, data=data, headers=headers)
+        start = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=self.args.timeout) as resp:
+                status, body = resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            status, body = e.code, e.read()
+        except Exception as e:
+            self.stats.record(route, time.perf_counter() - start, False, type(e).__name__)
+            return None, None
+        # A successful login answers with a redirect, which NoRedirect surfaces as an HTTPError
+        ok = status == 302 if route == 'POST /login' else status < 400
+        self.stats.record(route, time.perf_counter() - start, ok, None if ok else status)
+        return status, body
+
+    def login(self):
+        status, body = self.request('GET /login', '/login')
+        if status != 200:
+            return False
+        token = CSRF_RE.search(body.decode()).group(1)
+        form = urllib.parse.urlencode({'csrf_token': token, 'username': self.username, 'password': PASSWORD})
+        status, _ = self.request('POST /login', '/login', data=form.encode())
+        return status == 302
+
+    def payload(self):
+        if self.rng.random() < self.args.vlan_ratio:
+            count = self.rng.randint(1, self.args.max_vlans)
+            return {
+                'network_ip': self.rng.choice(VLAN_NETWORKS),
+                'vlan_mode': True,
+                'vlans': [{'vlan_id': i + 10, 'vlan_name': f'Segment {i}'} for i in range(count)],
+            }
+        network, max_hosts = self.rng.choice(HOST_NETWORKS)
+        return {
+            'network_ip': network,
+            'vlan_mode': False,
+            'num_hosts': self.rng.randint(1, max_hosts),
+        }
+
+    def workflow(self):
+        """Run one calculator workflow; returns None on success or an error label"""
+        status, body = self.request('GET /calculator', '/calculator')
+        if status != 200:
+            return 'calculator page'
+        match = CSRF_RE.search(body.decode())
+        if not match:
+            return 'csrf token'
+        token = match.group(1)
+
+        status, body = self.request('POST /calculate_subnets', '/calculate_subnets',
+                                    headers={'X-CSRFToken': token}, json_body=self.payload())
+        if status != 200:
+            return 'calculate'
+        task_id = json.loads(body)['task_id']
+
+        deadline = time.monotonic() + self.args.poll_timeout
+        while True:
+            time.sleep(self.args.poll_interval)
+            status, body = self.request('GET /get_progress/<task_id>', f'/get_progress/{task_id}')
+            if status != 200:
+                return 'progress'
+            progress = json.loads(body)
+            if progress.get('error'):
+                return 'calculation error'
+            if progress.get('progress') == 100:
+                break
+            if time.monotonic() > deadline:
+                return 'poll timeout'
+
+        if self.username and progress.get('results') and self.rng.random() < self.args.save_ratio:
+            content = '\n'.join(f"{r['network_id']} {r['subnet_mask']}" for r in progress['results'])
+            status, _ = self.request('POST /notes/from_calculator', '/notes/from_calculator',
+                                     headers={'X-CSRFToken': token},
+                                     json_body={'title': 'Load test plan', 'content': content})
+            if status != 200:
+                return 'save note'
+        return None
+
+    def run(self, stop):
+        if self.username and not self.login():
+            self.stats.record('workflow', 0.0, False, 'login')
+            return
+        while not stop.is_set():
+            start = time.perf_counter()
+            error = self.workflow()
+            self.stats.record('workflow', time.perf_counter() - start, error is None, error)
+            if self.args.think:
+                stop.wait(self.rng.uniform(0, 2 * self.args.think))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=20, help='concurrent virtual users')
+    parser.add_argument('--logged-in', type=float, default=0.5, help='share of users that log in (0-1)')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to run')
+    parser.add_argument('--workers', type=int, default=1, help='gunicorn workers')
+    parser.add_argument('--threads', type=int, default=8, help='gunicorn threads per worker')
+    parser.add_argument('--vlan-ratio', type=float, default=0.3, help='share of calculations in VLAN mode')
+    parser.add_argument('--max-vlans', type=int, default=16, help='largest VLAN count per calculation')
+    parser.add_argument('--save-ratio', type=float, default=0.3, help='share of logged-in results saved as notes')
+    parser.add_argument('--poll-interval', type=float, default=0.5, help='seconds between progress polls')
+    parser.add_argument('--poll-timeout', type=float, default=30, help='give up on a calculation after this')
+    parser.add_argument('--think', type=float, default=1.0, help='mean pause between workflows in seconds')
+    parser.add_argument('--timeout', type=float, default=30, help='per-request timeout in seconds')
+    parser.add_argument('--rate-limits', action='store_true', help='keep rate limiting enabled')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for the request mix')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    logged_in = round(args.users * args.logged_in)
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.setdefault('FLASK_SECRET_KEY', 'benchmark-secret')
+        env['DATABASE_URL'] = f'sqlite:///{os.path.join(tmp, "load.db")}'
+        env['RATELIMIT_STORAGE_URI'] = f'sqlite:///{os.path.join(tmp, "ratelimit.db")}'
+        env['JINJA_CACHE_DIR'] = os.path.join(tmp, 'jinja_cache')
+        env['RATELIMIT_ENABLED'] = 'True' if args.rate_limits else 'False'
+        seed_users(dict(env, PASSWORD_HASH_WORKERS='0'), logged_in)
+
+        port = free_port()
+        base = f'http://127.0.0.1:{port}'
+        proc = start_server(env, port, args.workers, args.threads)
+        stats = Stats()
+        stop = threading.Event()
+        users = [
+            VirtualUser(base, stats, args, random.Random(args.seed * 1000 + i),
+                        f'loaduser{i}' if i < logged_in else None)
+            for i in range(args.users)
+        ]
+        try:
+            threads = [threading.Thread(target=u.run, args=(stop,), daemon=True) for u in users]
+            started = time.perf_counter()
+            for t in threads:
+                t.start()
+            stop.wait(args.duration)
+            stop.set()
+            for t in threads:
+                t.join(args.timeout + args.poll_interval)
+            elapsed = time.perf_counter() - started
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    rows = stats.summary(elapsed)
+    if args.json:
+        print(json.dumps({
+            'users': args.users, 'logged_in': logged_in, 'workers': args.workers,
+            'threads': args.threads, 'duration_s': round(elapsed, 2), 'routes': rows,
+        }, indent=2))
+        return
+    print(f"{args.users} users ({logged_in} logged in), {args.workers} worker(s) x {args.threads} threads, "
+          f"{elapsed:.1f}s")
+    print(f"{'route':<32} {'reqs':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'errors':>7}")
+    for r in rows:
+        print(f"{r['route']:<32} {r['requests']:>7} {r['per_sec']:>8} {r['p50_ms']:>9} {r['p95_ms']:>9} "
+              f"{r['p99_ms']:>9} {r['max_ms']:>9} {r['error_rate']:>7.1%}")
+        for reason, count in r['errors'].items():
+            print(f"{'':<34}{reason}: {count}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,364 @@
+"""
+`flask netmaster ...` maintenance and planning commands.
+
+    flask --app app netmaster seed --users 10000 --notes-per-user 100 --seed 1
+    flask --app app netmaster plan sites.csv -o plan.csv --workers 4
+    flask --app app netmaster provision users.csv -o created.csv
+
+seed fills the database with synthetic users and notes for performance
+work on notes, export, search and pagination. Users get 8-character IDs in
+the same format as User.generate_user_id() and all share one password hash
+(of --password), so the accounts can log in during load tests. Note bodies
+are real calculation results, built with the app's planning functions from
+a pool of random private networks. Rows are written with executemany in
+large transactions straight to SQLite, with the note indexes dropped
+during the load and rebuilt at the end, and the same --seed always
+produces the same data.
+
+plan runs the calculator over a CSV of sites, for network teams planning
+thousands of sites at once. Each input row has a network and either a host
+count or a VLAN list:
+
+    site,network,hosts,vlans
+    HQ,10.1.0.0/16,,10:Servers;20:Voice;30:Guests
+    Branch 12,192.168.12.0/24,50,
+
+Rows are validated and planned with the same functions as the web
+calculator (validate_ip_cidr, plan_host_subnet, plan_vlan_subnets) in a
+process pool, a chunk of rows per task. The input is read as it is
+consumed and only a few chunks per worker are in flight, so memory stays
+flat however large the file is, and output is written in input order as
+CSV (one line per subnet) or NDJSON (one object per site). A row that
+fails gets an error in the output and the run carries on.
+
+provision creates the accounts in a CSV or JSON file with the same batched
+checks, parallel hashing and chunked inserts as /admin/users/bulk (see
+provisioning.py), without the endpoint's row limit.
+"""
+
+import os
+import csv
+import json
+import time
+import random
+import string
+import sqlite3
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+ID_CHARS = string.ascii_uppercase + string.digits
+PRIVATE_BLOCKS = [('10.0.0.0', 8), ('172.16.0.0', 12), ('192.168.0.0', 16)]
+VLAN_NAMES = ['Management', 'Servers', 'Voice', 'Guests', 'Printers', 'Cameras', 'Finance', 'Engineering',
+              'Marketing', 'Sales', 'Storage', 'Backup', 'DMZ', 'Lab', 'Wireless', 'IoT']
+# Rows per executemany/commit
+BATCH_SIZE = 50000
+RESULT_FIELDS = ['network_id', 'subnet_mask', 'broadcast', 'default_gateway', 'usable_hosts',
+                 'first_usable', 'last_usable']
+PLAN_CSV_FIELDS = ['line', 'site', 'network', 'vlan_id', 'vlan_name', *RESULT_FIELDS, 'error']
+
+netmaster_cli = AppGroup('netmaster', help='NetMaster data and planning tools.')
+
+
+def init_app(app):
+    app.cli.add_command(netmaster_cli)
+
+
+def random_network(rng):
+    """A random private network between /16 and /28"""
+    base, prefix = rng.choice(PRIVATE_BLOCKS)
+    new_prefix = rng.randint(max(prefix, 16), 28)
+    first = int.from_bytes(bytes(int(octet) for octet in base.split('.')), 'big')
+    offset = rng.getrandbits(new_prefix - prefix) << (32 - new_prefix)
+    address = (first + offset).to_bytes(4, 'big')
+    return f"{'.'.join(str(octet) for octet in address)}/{new_prefix}"
+
+
+def note_pool(rng, size):
+    """(title, content) pairs from real host and VLAN calculations"""
+    from app import plan_host_subnet, plan_vlan_subnets, calculation_note, SubnetCalculationError
+
+    pool = []
+    while len(pool) < size:
+        network = random_network(rng)
+        prefix = int(network.split('/')[1])
+        try:
+            if rng.random() < 0.6:
+                count = rng.randint(2, min(16, 2 ** (30 - prefix)))
+                names = rng.sample(VLAN_NAMES, count)
+                vlans = [{'vlan_id': 10 * (i + 1), 'vlan_name': name} for i, name in enumerate(names)]
+                results = list(plan_vlan_subnets(network, vlans))
+                pool.append(calculation_note(network, vlans, None, results))
+            else:
+                num_hosts = rng.randint(1, 2 ** (32 - prefix) - 2)
+                pool.append(calculation_note(network, None, num_hosts, plan_host_subnet(network, num_hosts)))
+        except SubnetCalculationError:
+            continue
+    return pool
+
+
+def notes_for_user(rng, mean, distribution):
+    if distribution == 'fixed':
+        return mean
+    if distribution == 'uniform':
+        return rng.randint(0, 2 * mean)
+    # Pareto with alpha 1.5 has mean 3, so (x - 1) / 2 has mean 1: a few heavy users, many light ones
+    return min(int(mean * (rng.paretovariate(1.5) - 1) / 2), 100 * mean)
+
+
+def timestamp_formatter(start, days):
+    """Format second offsets from start like str(datetime), several times faster.
+
+    str() on millions of datetimes is otherwise the slowest part of seeding.
+    """
+    day_strings = [f'{start + timedelta(days=d):%Y-%m-%d} ' for d in range(days + 2)]
+    second_strings = [f'{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}' for s in range(86400)]
+
+    def fmt(offset, microsecond=None):
+        text = day_strings[offset // 86400] + second_strings[offset % 86400]
+        return text if microsecond is None else f'{text}.{microsecond:06d}'
+    return fmt
+
+
+def sqlite_path():
+    """Path of the app's SQLite database, or None for other databases"""
+    from app import db
+    url = db.engine.url
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+        return None
+    return url.database if os.path.isabs(url.database) else os.path.join(current_app.instance_path, url.database)
+
+
+@netmaster_cli.command('seed')
+@click.option('--users', default=1000, show_default=True, help='Users to create.')
+@click.option('--notes-per-user', default=50, show_default=True, help='Mean notes per user.')
+@click.option('--distribution', type=click.Choice(['fixed', 'uniform', 'pareto']), default='pareto',
+              show_default=True, help='How note counts vary between users.')
+@click.option('--days', default=365, show_default=True, help='Spread timestamps over this many days.')
+@click.option('--end', type=click.DateTime(['%Y-%m-%d']), default='2026-01-01', show_default=True,
+              help='Latest timestamp; fixed so the same seed gives identical rows.')
+@click.option('--seed', 'seed', default=1, show_default=True, help='Random seed; the same seed gives the same data.')
+@click.option('--prefix', default='seed', show_default=True, help='Username prefix for the generated users.')
+@click.option('--password', default='password123', show_default=True, help='Password of every generated user.')
+@click.option('--pool-size', default=2000, show_default=True, help='Distinct note bodies to generate.')
+def seed_command(users, notes_per_user, distribution, days, end, seed, prefix, password, pool_size):
+    """Fill the database with synthetic users and notes."""
+    from app import db, hasher
+
+    path = sqlite_path()
+    if path is None:
+        raise click.ClickException('seed writes straight to SQLite; DATABASE_URL is not a SQLite file.')
+    db.create_all()
+
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    pool = note_pool(rng, pool_size)
+    password_hash = hasher.hash(password)
+    span = days * 86400
+    fmt = timestamp_formatter(end - timedelta(days=days), days)
+
+    conn = sqlite3.connect(path)
+    # A crash mid-seed only loses generated data, so skip the fsyncs
+    conn.execute('PRAGMA synchronous = OFF')
+    existing_ids = {row[0] for row in conn.execute('SELECT id FROM user')}
+    taken = conn.execute('SELECT COUNT(*) FROM user WHERE username LIKE ?', (f'{prefix}%',)).fetchone()[0]
+    if taken:
+        conn.close()
+        raise click.ClickException(f'{taken} users named {prefix}... already exist; choose another --prefix.')
+
+    # Building the note indexes once at the end is about three times faster than updating them per row
+    note_indexes = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'note' AND sql IS NOT NULL"
+    ).fetchall()
+    with conn:
+        for name, _ in note_indexes:
+            conn.execute(f'DROP INDEX "{name}"')
+
+    user_rows = []
+    note_rows = []
+    user_total = note_total = 0
+
+    def write():
+        nonlocal user_rows, note_rows
+        with conn:
+            conn.executemany(
+                'INSERT INTO user (id, username, email, password_hash, theme, language, '
+                'default_calculation_mode, auto_save_results, created_at, updated_at) '
+                "VALUES (?, ?, ?, ?, 'auto', 'en', 'host', 'ask', ?, ?)", user_rows)
+            conn.executemany(
+                'INSERT INTO note (title, content, created_at, updated_at, user_id) VALUES (?, ?, ?, ?, ?)',
+                note_rows)
+        user_rows, note_rows = [], []
+
+    try:
+        random_ = rng.random
+        for i in range(users):
+            while True:
+                user_id = ''.join(rng.choices(ID_CHARS, k=8))
+                if user_id not in existing_ids:
+                    existing_ids.add(user_id)
+                    break
+            username = f'{prefix}{i:07d}'
+            joined = int(random_() * span)
+            user_rows.append((user_id, username, f'{username}@example.com', password_hash, fmt(joined), fmt(joined)))
+
+            count = notes_for_user(rng, notes_per_user, distribution)
+            for _ in range(count):
+                title, content = pool[int(random_() * pool_size)]
+                offset = joined + int(random_() * (span - joined))
+                created = fmt(offset, int(random_() * 1e6))
+                if random_() < 0.7:
+                    updated = created
+                else:
+                    updated = fmt(offset + int(random_() * 86400), int(random_() * 1e6))
+                note_rows.append((title, content, created, updated, user_id))
+            user_total += 1
+            note_total += count
+            if len(note_rows) >= BATCH_SIZE:
+                write()
+        write()
+    finally:
+        click.echo(f'Rebuilding {len(note_indexes)} note indexes...')
+        with conn:
+            for _, sql in note_indexes:
+                conn.execute(sql)
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    click.echo(f'Created {user_total} users and {note_total} notes in {elapsed:.1f}s '
+               f'({(user_total + note_total) / elapsed:,.0f} rows/s).')
+
+
+def plan_rows(rows):
+    """Plan one chunk of (line, site, network, hosts, vlans) rows in a pool worker.
+
+    Returns (line, site, network, results, error) per row, in order; a
+    failure affects only its own row.
+    """
+    from app import (plan_host_subnet, plan_vlan_subnets, parse_vlans, validate_vlans, validate_num_hosts,
+                     SubnetCalculationError)
+
+    planned = []
+    for line, site, network, hosts, vlans in rows:
+        try:
+            if vlans:
+                results = list(plan_vlan_subnets(network, validate_vlans(parse_vlans(vlans), max_vlans=4094)))
+            elif hosts:
+                results = plan_host_subnet(network, validate_num_hosts(hosts))
+            else:
+                raise SubnetCalculationError("Either hosts or vlans is required")
+            planned.append((line, site, network, results, None))
+        except SubnetCalculationError as e:
+            planned.append((line, site, network, None, str(e)))
+        except Exception as e:
+            planned.append((line, site, network, None, f"Unexpected error: {e}"))
+    return planned
+
+
+def read_chunks(reader, size):
+    """Group CSV rows into lists of (line, site, network, hosts, vlans)"""
+    chunk = []
+    for row in reader:
+        chunk.append((
+            reader.line_num,
+            (row.get('site') or '').strip(),
+            (row.get('network') or '').strip(),
+            (row.get('hosts') or '').strip(),
+            (row.get('vlans') or '').strip(),
+        ))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def planned_chunks(chunks, workers):
+    """plan_rows() over chunks, in order, with at most 2 chunks per worker in flight"""
+    if workers == 0:
+        for chunk in chunks:
+            yield plan_rows(chunk)
+        return
+    # spawn, as for password hashing: children import only what plan_rows needs
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(plan_rows, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+@netmaster_cli.command('plan')
+@click.argument('input_file', type=click.File('r', encoding='utf-8-sig'))
+@click.option('-o', '--output', type=click.File('w'), default='-', help='Output file (default: stdout).')
+@click.option('--format', 'output_format', type=click.Choice(['csv', 'ndjson']), default='csv', show_default=True)
+@click.option('--workers', default=os.cpu_count() or 1, show_default=True,
+              help='Planning processes; 0 plans in this process.')
+@click.option('--chunk-size', default=500, show_default=True, help='Input rows per task.')
+def plan_command(input_file, output, output_format, workers, chunk_size):
+    """Plan every site in a CSV with columns site, network, hosts, vlans."""
+    reader = csv.DictReader(input_file)
+    if not reader.fieldnames or 'network' not in reader.fieldnames:
+        raise click.ClickException('The input needs a header row with a "network" column.')
+    writer = csv.DictWriter(output, PLAN_CSV_FIELDS, lineterminator='\n') if output_format == 'csv' else None
+    if writer:
+        writer.writeheader()
+
+    started = time.perf_counter()
+    sites = subnets = errors = 0
+    for planned in planned_chunks(read_chunks(reader, max(1, chunk_size)), max(0, workers)):
+        for line, site, network, results, error in planned:
+            sites += 1
+            if error:
+                errors += 1
+                click.echo(f'Line {line} ({site or network}): {error}', err=True)
+            else:
+                subnets += len(results)
+            if writer is None:
+                record = {'line': line, 'site': site, 'network': network}
+                record.update({'error': error} if error else {'results': results})
+                output.write(json.dumps(record) + '\n')
+            elif error:
+                writer.writerow({'line': line, 'site': site, 'network': network, 'error': error})
+            else:
+                writer.writerows({'line': line, 'site': site, 'network': network, **row} for row in results)
+        output.flush()
+
+    elapsed = time.perf_counter() - started
+    click.echo(f'Planned {sites} sites ({subnets} subnets, {errors} errors) in {elapsed:.1f}s.', err=True)
+
+
+@netmaster_cli.command('provision')
+@click.argument('input_file', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--format', 'input_format', type=click.Choice(['csv', 'json']),
+              help='Input format (default: from the file extension, else csv).')
+@click.option('-o', '--output', type=click.File('w'), help='Write the created users (row, id, username, email) as CSV.')
+@click.option('--workers', type=int, help='Password hashing processes (default: one per CPU).')
+@click.option('--chunk-size', default=1000, show_default=True, help='Users inserted per transaction.')
+def provision_command(input_file, input_format, output, workers, chunk_size):
+    """Create the users listed in a CSV (username,email,password) or JSON file."""
+    from provisioning import ProvisioningError, parse_users, provision_users
+
+    if input_format is None:
+        input_format = 'json' if input_file.name.lower().endswith('.json') else 'csv'
+    try:
+        users = parse_users(input_file.read(), input_format)
+    except ProvisioningError as e:
+        raise click.ClickException(str(e))
+
+    started = time.perf_counter()
+    created, errors = provision_users(users, workers=workers, chunk_size=max(1, chunk_size))
+    elapsed = time.perf_counter() - started
+    for error in errors:
+        click.echo(f"Row {error['row']} ({error['username'] or 'no username'}): {error['message']}", err=True)
+    if output is not None:
+        writer = csv.DictWriter(output, ['row', 'id', 'username', 'email'], lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(created)
+    click.echo(f'Created {len(created)} users ({len(errors)} rejected) in {elapsed:.1f}s.', err=True)
@@ -0,0 +1,119 @@
+"""
+Response compression for NetMaster.
+
+HTML pages, JSON (calculation progress and results, /export_data) and
+other text responses are compressed with gzip or deflate, whichever the
+client prefers in Accept-Encoding. Repetitive JSON such as subnet result
+rows shrinks 10-20x.
+
+Responses are left alone when they are smaller than COMPRESS_MIN_SIZE,
+already have a Content-Encoding (the precompressed bundles from
+assets.py), are files served by send_file, or carry
+"Cache-Control: no-transform". Streamed responses are compressed chunk by
+chunk and flushed after every chunk, so the client still receives each
+part as soon as it is produced. Every response of a compressible type gets
+"Vary: Accept-Encoding" so caches keep the variants apart.
+
+zlib output is deterministic for the same body and level, so a strong ETag
+stays strong: the compressed variant gets the encoding appended
+('"abc"' becomes '"abc-gzip"'). A request whose If-None-Match names that
+variant is answered with a 304 here, before anything is compressed.
+
+Configuration:
+    COMPRESS_ENABLED   Compress responses (default: True)
+    COMPRESS_LEVEL     zlib level from 1 (fastest) to 9 (smallest) (default: 6)
+    COMPRESS_MIN_SIZE  Smallest body in bytes worth compressing (default: 500)
+"""
+
+import zlib
+from flask import current_app, request
+
+COMPRESSIBLE_TYPES = {
+    'text/html', 'text/plain', 'text/css', 'text/csv', 'text/xml', 'text/javascript',
+    'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+}
+# zlib window bits for each Content-Encoding; HTTP "deflate" is the zlib format
+WBITS = {'gzip': 31, 'deflate': 15}
+
+
+def init_app(app):
+    """Compress responses when COMPRESS_ENABLED is set"""
+    app.config.setdefault('COMPRESS_ENABLED', True)
+    app.config.setdefault('COMPRESS_LEVEL', 6)
+    app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+    if not app.config['COMPRESS_ENABLED']:
+        return
+    app.after_request(compress_response)
+
+
+def choose_encoding():
+    """The encoding the client prefers, or None if it accepts neither"""
+    return request.accept_encodings.best_match(list(WBITS))
+
+
+def compress_response(response):
+    if (response.mimetype not in COMPRESSIBLE_TYPES
+            or request.method == 'HEAD'
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers
+            or 'no-transform' in response.headers.get('Cache-Control', '')):
+        return response
+
+    # The body depends on Accept-Encoding even when this client gets it uncompressed
+    response.vary.add('Accept-Encoding')
+    if response.direct_passthrough:
+        return response
+    encoding = choose_encoding()
+    if encoding is None:
+        return response
+
+    level = current_app.config['COMPRESS_LEVEL']
+    etag, weak = response.get_etag()
+    if response.is_streamed:
+        if _not_modified(response, etag, weak, encoding):
+            return response
+        response.response = _compress_stream(response.response, encoding, level)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < current_app.config['COMPRESS_MIN_SIZE']:
+            return response
+        if _not_modified(response, etag, weak, encoding):
+            return response
+        compressor = zlib.compressobj(level, zlib.DEFLATED, WBITS[encoding])
+        compressed = compressor.compress(data) + compressor.flush()
+        if len(compressed) >= len(data):
+            return response
+        response.set_data(compressed)
+
+    response.headers['Content-Encoding'] = encoding
+    if etag and not weak:
+        response.set_etag(f'{etag}-{encoding}')
+    return response
+
+
+def _not_modified(response, etag, weak, encoding):
+    """Turn response into a 304 if the client already has its compressed variant"""
+    if (not etag or weak or response.status_code != 200 or request.method != 'GET'
+            or not request.if_none_match.contains(f'{etag}-{encoding}')):
+        return False
+    response.status_code = 304
+    response.set_etag(f'{etag}-{encoding}')
+    response.headers.pop('Content-Length', None)
+    return True
+
+
+def _compress_stream(chunks, encoding, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, WBITS[encoding])
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            if chunk:
+                # A sync flush after each chunk keeps streamed output flowing
+                yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
@@ -0,0 +1,92 @@
+"""
+gunicorn configuration for NetMaster.
+
+gunicorn reads this file automatically when started from the project
+directory:
+
+    gunicorn
+
+Every setting can be overridden on the command line or through the
+environment variables below.
+
+Worker model: calculation progress lives in the memory of the worker that
+started the calculation, and the browser polls /get_progress for it, so
+all polls must reach that worker. The default is therefore one process
+with a pool of threads (gthread). Requests are short and mostly wait on
+SQLite or on the password hashing processes, and calculations run in
+their own threads, so threads rather than processes carry the concurrency.
+
+benchmarks/workflow_load.py on one CPU with 25 users (20 s runs):
+
+    workers x threads   workflows/s   workflow p50   calculate_subnets p99
+    1 x 4               15.8          517 ms         2019 ms
+    1 x 8               16.6          516 ms         1402 ms
+    1 x 16              17.0          529 ms          155 ms
+    2 x 8               10.6          1028 ms        1820 ms
+
+With two workers, roughly half the polls reach a worker that has no record
+of the task. The browser keeps polling, so workflows take about twice as
+long and throughput drops. Within one worker, 16 threads stop logins
+(which wait on the hashing pool) from holding up other requests.
+
+For the same reason workers are not recycled by default. Restarting the
+only worker drops every calculation still in progress, and the browsers
+polling for them get a 404. Set GUNICORN_MAX_REQUESTS only if memory
+growth is a bigger problem than the occasional interrupted calculation.
+
+Configuration:
+    GUNICORN_BIND                  Address to listen on (default: 0.0.0.0:$PORT, PORT defaults to 5000)
+    GUNICORN_WORKERS               Worker processes (default: 1, see above)
+    GUNICORN_THREADS               Threads per worker (default: 16)
+    GUNICORN_TIMEOUT               Seconds before a silent worker is restarted (default: 30)
+    GUNICORN_MAX_REQUESTS          Requests before a worker is recycled, 0 to disable (default: 0, see above)
+    GUNICORN_MAX_REQUESTS_JITTER   Random extra requests so workers do not recycle together (default: 200)
+"""
+
+import os
+
+wsgi_app = 'wsgi:app'
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', 5000)}")
+worker_class = 'gthread'
+workers = int(os.environ.get('GUNICORN_WORKERS', 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Opt-in worker recycling to cap memory growth; off by default because a restart
+# loses the progress of running calculations. The jitter spreads restarts out
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+# Import the app once in the master so workers share its memory copy-on-write
+preload_app = True
+
+
+def on_starting(server):
+    """Warm the preloaded app in the master and reset metrics from the last run"""
+    if not server.cfg.preload_app:
+        return
+    from wsgi import app
+    from app import warm_up
+    from metrics import metrics
+    warm_up(app)
+    metrics.clear()
+
+
+def post_fork(server, worker):
+    """Drop database connections inherited from the master"""
+    from wsgi import app
+    from app import db
+    with app.app_context():
+        # close=False leaves the master's sockets alone and only forgets them here
+        db.engine.dispose(close=False)
+
+
+def worker_exit(server, worker):
+    """Write any buffered calculation history, then fold the worker's metrics into the
+    exited total, before the worker goes away"""
+    from write_behind import write_buffer
+    from metrics import metrics
+    write_buffer.flush()
+    metrics.retire()
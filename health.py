@@ -0,0 +1,177 @@
+"""
+Liveness and readiness endpoints for NetMaster.
+
+/healthz answers 200 whenever the worker can serve a request at all, for
+restarting hung processes. /readyz answers 200 only when the checks below
+pass, and 503 otherwise so the load balancer stops sending traffic to the
+worker until it recovers.
+
+The checks (database, rate limit storage, disk space, and how saturated
+the worker's request threads, calculation threads and password hashing pool
+are) run in a background thread every HEALTH_PROBE_INTERVAL seconds. The
+endpoints only read the last results, so a probe costs microseconds and
+never touches the database. Readiness also fails if the results are older
+than three intervals, which means the prober itself is stuck.
+
+Request saturation is the peak number of requests in flight since the last
+probe, compared with HEALTH_MAX_IN_FLIGHT, which should match the gunicorn
+thread count.
+
+The checks themselves are registered by app.py with health.check().
+
+Configuration:
+    HEALTH_PROBE_INTERVAL    Seconds between background checks (default: 5)
+    HEALTH_MAX_IN_FLIGHT     Concurrent requests at which the worker counts as saturated
+                             (default: GUNICORN_THREADS, or 16)
+    HEALTH_MAX_CALCULATIONS  Running calculation threads at which the worker counts as saturated (default: 32)
+    HEALTH_MIN_FREE_DISK_MB  Free space required next to the database and instance files (default: 100)
+"""
+
+import os
+import time
+import shutil
+import threading
+from flask import Blueprint, Response, current_app, jsonify, g
+
+bp = Blueprint('health', __name__)
+
+
+class HealthMonitor:
+    """Runs registered checks in the background and keeps the latest results"""
+
+    def __init__(self):
+        self.app = None
+        self.interval = 5.0
+        self.max_in_flight = 16
+        self._checks = {}
+        self._reset()
+        # A forked worker needs its own prober and its own request counts
+        os.register_at_fork(after_in_child=self._reset)
+
+    def init_app(self, app):
+        app.config.setdefault('HEALTH_PROBE_INTERVAL', 5.0)
+        app.config.setdefault('HEALTH_MAX_IN_FLIGHT', int(os.environ.get('GUNICORN_THREADS', 16)))
+        app.config.setdefault('HEALTH_MIN_FREE_DISK_MB', 100)
+        self.app = app
+        self.interval = float(app.config['HEALTH_PROBE_INTERVAL'])
+        self.max_in_flight = int(app.config['HEALTH_MAX_IN_FLIGHT'])
+        app.register_blueprint(bp)
+        app.before_request(self._start_request)
+        app.teardown_request(self._finish_request)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._prober = None
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self.results = None
+        self.checked_at = None
+
+    def check(self, name, func):
+        """Register func as a readiness check; it returns a dict with an 'ok' key"""
+        self._checks[name] = func
+
+    def _start_request(self):
+        g.health_counted = True
+        with self._lock:
+            self._in_flight += 1
+            if self._in_flight > self._peak_in_flight:
+                self._peak_in_flight = self._in_flight
+        if self._prober is None:
+            self._start_prober()
+
+    def _finish_request(self, exc=None):
+        # Requests rejected by an earlier before_request hook were never counted
+        if g.pop('health_counted', False):
+            with self._lock:
+                self._in_flight -= 1
+
+    def _start_prober(self):
+        with self._lock:
+            if self._prober is not None:
+                return
+            self._prober = threading.Thread(target=self._probe_periodically, name='health-probe', daemon=True)
+        self._prober.start()
+
+    def _probe_periodically(self):
+        while True:
+            self.probe()
+            time.sleep(self.interval)
+
+    def probe(self):
+        """Run every check now and store the results"""
+        with self._lock:
+            # The current requests count towards the next interval's peak
+            peak, self._peak_in_flight = self._peak_in_flight, self._in_flight
+        results = {'requests': {
+            'ok': peak < self.max_in_flight,
+            'peak_in_flight': peak,
+            'limit': self.max_in_flight,
+        }}
+        with self.app.app_context():
+            for name, func in self._checks.items():
+                try:
+                    results[name] = func()
+                except Exception as e:
+                    current_app.logger.error(f"Health check {name} failed: {str(e)}")
+                    results[name] = {'ok': False}
+        self.results = results
+        self.checked_at = time.monotonic()
+        return results
+
+    def is_healthy(self, name):
+        """Last result of one check, or None if it has not run recently"""
+        results = self.results
+        if results is None or name not in results or self.age() > 3 * self.interval:
+            return None
+        return results[name]['ok']
+
+    def age(self):
+        return time.monotonic() - self.checked_at if self.checked_at is not None else None
+
+    def readiness(self):
+        """(ready, report) from the last probe"""
+        results, age = self.results, self.age()
+        if results is None:
+            return False, {'status': 'starting'}
+        stale = age > 3 * self.interval
+        ready = not stale and all(result['ok'] for result in results.values())
+        return ready, {
+            'status': 'ready' if ready else 'not_ready',
+            'age_seconds': round(age, 3),
+            'stale': stale,
+            'checks': results,
+        }
+
+
+health = HealthMonitor()
+
+
+def disk_space_check(paths, min_free_bytes):
+    """A check that every existing path has at least min_free_bytes free"""
+    def check():
+        free = {}
+        for path in paths:
+            if os.path.exists(path):
+                free[path] = shutil.disk_usage(path).free
+        return {
+            'ok': all(value >= min_free_bytes for value in free.values()),
+            'free_mb': min(free.values()) // (1024 * 1024) if free else None,
+        }
+    return check
+
+
+@bp.route('/healthz')
+def healthz():
+    """Liveness: the worker is serving requests"""
+    return Response('ok\n', mimetype='text/plain', headers={'Cache-Control': 'no-store'})
+
+
+@bp.route('/readyz')
+def readyz():
+    """Readiness: the last background checks passed"""
+    ready, report = health.readiness()
+    response = jsonify(report)
+    response.status_code = 200 if ready else 503
+    response.headers['Cache-Control'] = 'no-store'
+    return response
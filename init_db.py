@@ -14,10 +14,11 @@ load_dotenv()
 # Add the current directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from app import app, db
+from app import create_app, db
 
 def init_database():
     """Initialize the database with all required tables"""
+    app = create_app()
     with app.app_context():
         try:
             # Create all tables
@@ -0,0 +1,108 @@
+"""
+SQLite rate limit storage for NetMaster.
+
+Registers a ``sqlite://`` storage scheme with the ``limits`` library so
+Flask-Limiter can keep its counters in a single SQLite file. Every gunicorn
+worker on the host opens the same file, so a "50 per hour" limit is enforced
+once per host rather than once per worker, without running Redis.
+
+URIs follow the SQLAlchemy convention:
+    sqlite:///ratelimit.db          relative to the current directory
+    sqlite:////var/lib/netmaster/ratelimit.db   absolute path
+
+Nothing is opened until the first counter is touched, and each thread (and
+each forked process) gets its own connection.
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from limits.storage import Storage
+
+# Expired rows are swept every this many increments
+PURGE_INTERVAL = 1000
+
+
+class SQLiteStorage(Storage):
+    """Fixed-window rate limit counters in a SQLite file shared across workers"""
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri=None, wrap_exceptions=False, timeout=5, **options):
+        path = uri.split('://', 1)[1] if uri else ''
+        # sqlite:///relative.db -> relative.db, sqlite:////abs.db -> /abs.db
+        self.path = path[1:] if path.startswith('/') else path
+        if not self.path:
+            raise ValueError("SQLite rate limit storage requires a file path")
+        self.timeout = float(timeout)
+        self._local = threading.local()
+        self._incr_count = 0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connect(self):
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit: every statement below is a transaction on its own
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS rate_limit ('
+            'key TEXT PRIMARY KEY, count INTEGER NOT NULL, expiry REAL NOT NULL'
+            ') WITHOUT ROWID'
+        )
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def incr(self, key, expiry, amount=1):
+        """Increment key, starting a new window if the previous one expired"""
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            'INSERT INTO rate_limit (key, count, expiry) VALUES (:key, :amount, :expiry) '
+            'ON CONFLICT(key) DO UPDATE SET '
+            'count = CASE WHEN expiry <= :now THEN :amount ELSE count + :amount END, '
+            'expiry = CASE WHEN expiry <= :now THEN :expiry ELSE expiry END '
+            'RETURNING count',
+            {'key': key, 'amount': amount, 'expiry': now + expiry, 'now': now}
+        ).fetchone()
+        self._incr_count += 1
+        if self._incr_count % PURGE_INTERVAL == 0:
+            conn.execute('DELETE FROM rate_limit WHERE expiry <= ?', (now,))
+        return row[0]
+
+    def get(self, key):
+        row = self._connect().execute(
+            'SELECT count FROM rate_limit WHERE key = ? AND expiry > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        row = self._connect().execute(
+            'SELECT expiry FROM rate_limit WHERE key = ? AND expiry > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else time.time()
+
+    def check(self):
+        try:
+            self._connect().execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        return self._connect().execute('DELETE FROM rate_limit').rowcount
+
+    def clear(self, key):
+        self._connect().execute('DELETE FROM rate_limit WHERE key = ?', (key,))
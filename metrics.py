@@ -0,0 +1,401 @@
+"""
+Prometheus metrics for NetMaster.
+
+Request latency and counts per endpoint, database query time, rate limit
+rejections and gauges registered by the app (calculation tasks held in
+memory, live calculation threads) are exposed in the Prometheus text format
+on /metrics.
+
+Each process records into plain dicts under one lock, and a background
+thread writes them every METRICS_FLUSH_INTERVAL seconds to the process's
+own file, metrics-<pid>.json, in METRICS_DIR. A scrape
+can land on any gunicorn worker, so /metrics merges every file in the
+directory: counters and histograms are summed across all processes, and
+gauges are summed over processes that are still alive. When a worker exits
+(gunicorn's worker_exit hook calls retire()) its counters and histograms
+are added to a single metrics-exited.json and its own file is deleted, so
+recycled workers neither pile up files nor lose their totals when a new
+worker reuses the pid. Files left by workers that were killed outright
+are folded in the same way at the next scrape. Clear METRICS_DIR when the
+server (re)starts.
+
+When METRICS_TOKEN is set, every scrape must send "Authorization: Bearer
+<METRICS_TOKEN>", including scrapes from localhost: behind a local reverse
+proxy every outside request arrives from 127.0.0.1. Without a token only
+localhost may scrape.
+
+Configuration:
+    METRICS_ENABLED         Record and expose metrics (default: True)
+    METRICS_DIR             Directory for per-process files (default: instance/metrics)
+    METRICS_TOKEN           Bearer token required from every scraper
+    METRICS_FLUSH_INTERVAL  Seconds between writes of a process's file (default: 5)
+"""
+
+import os
+import glob
+import json
+import time
+import atexit
+import bisect
+import fcntl
+import hmac
+import threading
+from contextlib import contextmanager
+from flask import Blueprint, Response, current_app, has_app_context, request, g
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+LOCAL_ADDRESSES = {'127.0.0.1', '::1'}
+# Totals of processes that have exited, and the lock that guards folding into it
+EXITED_FILE = 'metrics-exited.json'
+LOCK_FILE = 'metrics.lock'
+
+bp = Blueprint('metrics', __name__)
+
+
+class Metrics:
+    """Per-process metric store that is merged across processes at scrape time"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Serializes writing this process's file with retire(), so no write lands after the fold
+        self._write_lock = threading.Lock()
+        self._definitions = {}
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self._flusher = None
+        self._retired = False
+        self._listening = False
+        self.directory = None
+        self.flush_interval = 5.0
+        # A forked worker starts with a copy of its parent's values; drop them
+        # so nothing the parent recorded is counted twice
+        os.register_at_fork(after_in_child=self._reset)
+
+        self.define('netmaster_http_requests_total', 'counter', 'HTTP requests by endpoint and status')
+        self.define('netmaster_http_request_duration_seconds', 'histogram',
+                    'HTTP request latency by endpoint', LATENCY_BUCKETS)
+        self.define('netmaster_db_queries_total', 'counter', 'SQL statements executed by operation')
+        self.define('netmaster_db_query_duration_seconds', 'histogram',
+                    'SQL statement execution time by operation', QUERY_BUCKETS)
+        self.define('netmaster_rate_limit_rejections_total', 'counter', 'Requests rejected by the rate limiter')
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', True)
+        app.config.setdefault('METRICS_DIR', os.path.join(app.instance_path, 'metrics'))
+        app.config.setdefault('METRICS_TOKEN', None)
+        app.config.setdefault('METRICS_FLUSH_INTERVAL', 5.0)
+        app.register_blueprint(bp)
+        if not app.config['METRICS_ENABLED']:
+            return
+
+        self.directory = app.config['METRICS_DIR']
+        self.flush_interval = float(app.config['METRICS_FLUSH_INTERVAL'])
+        os.makedirs(self.directory, exist_ok=True)
+        # Runs ahead of CSRF and rate limit checks so rejected requests are timed too
+        app.before_request_funcs.setdefault(None, []).insert(0, self._start_timer)
+        app.after_request(self._record_request)
+        if not self._listening:
+            self._listening = True
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            atexit.register(self.flush)
+
+    def define(self, name, kind, help_text, buckets=None):
+        self._definitions[name] = (kind, help_text, buckets)
+
+    def gauge(self, name, help_text, func):
+        """Register a gauge whose value is read from func() when the process flushes"""
+        self.define(name, 'gauge', help_text)
+        self._gauges[name] = func
+
+    def inc(self, name, labels=(), amount=1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, labels=()):
+        buckets = self._definitions[name][2]
+        key = (name, labels)
+        with self._lock:
+            series = self._histograms.get(key)
+            if series is None:
+                # One slot per bucket plus +Inf, then the sum
+                series = self._histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+            series[bisect.bisect_left(buckets, value)] += 1
+            series[-1] += value
+
+    def _start_timer(self):
+        g.metrics_start = time.perf_counter()
+
+    def _record_request(self, response):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        self.observe('netmaster_http_request_duration_seconds', time.perf_counter() - start,
+                     (('endpoint', endpoint), ('method', request.method)))
+        self.inc('netmaster_http_requests_total',
+                 (('endpoint', endpoint), ('method', request.method), ('status', str(response.status_code))))
+        if response.status_code == 429:
+            self.inc('netmaster_rate_limit_rejections_total', (('endpoint', endpoint),))
+        if self._flusher is None:
+            self._start_flusher()
+        return response
+
+    def _start_flusher(self):
+        # One daemon thread per process, so an idle worker's last requests still reach its file
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._flush_periodically, name='metrics-flush', daemon=True)
+        self._flusher.start()
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def snapshot(self):
+        """This process's values in the JSON form written to its file"""
+        gauges = []
+        for name, func in self._gauges.items():
+            try:
+                gauges.append([name, [], func()])
+            except Exception:
+                pass
+        with self._lock:
+            return {
+                'counters': [[n, list(l), v] for (n, l), v in self._counters.items()],
+                'histograms': [[n, list(l), list(v)] for (n, l), v in self._histograms.items()],
+                'gauges': gauges,
+            }
+
+    def flush(self):
+        """Write this process's values to METRICS_DIR/metrics-<pid>.json"""
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, f'metrics-{os.getpid()}.json')
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with self._write_lock:
+            if self._retired:
+                return
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump(self.snapshot(), f)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                if has_app_context():
+                    current_app.logger.error(f"Failed to write metrics file {path}: {str(e)}")
+
+    def retire(self):
+        """Add this process's counters and histograms to the exited total and delete its
+        file; called as a worker exits, after which the process writes nothing more"""
+        if not self.directory:
+            return
+        with self._write_lock:
+            if self._retired:
+                return
+            self._retired = True
+            with self._locked(exclusive=True):
+                self._fold([self.snapshot()], [os.path.join(self.directory, f'metrics-{os.getpid()}.json')])
+
+    def collect(self):
+        """Merge the files of every process into {(name, labels): value}"""
+        counters, histograms, gauges = {}, {}, {}
+        self._fold_dead_processes()
+        with self._locked(exclusive=False):
+            exited = _read_file(os.path.join(self.directory, EXITED_FILE))
+            if exited is not None:
+                _merge(exited, counters, histograms)
+            for pid, path in self._process_files():
+                data = _read_file(path)
+                if data is None:
+                    continue
+                _merge(data, counters, histograms)
+                if _process_alive(pid):
+                    for name, labels, value in data['gauges']:
+                        key = (name, tuple(map(tuple, labels)))
+                        gauges[key] = gauges.get(key, 0) + value
+        return counters, histograms, gauges
+
+    def _process_files(self):
+        """(pid, path) of every per-process file"""
+        files = []
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+            try:
+                files.append((int(os.path.basename(path)[len('metrics-'):-len('.json')]), path))
+            except ValueError:
+                continue
+        return files
+
+    def _fold_dead_processes(self):
+        """Fold the files of processes that died without retire() into the exited total"""
+        if all(_process_alive(pid) for pid, _ in self._process_files()):
+            return
+        with self._locked(exclusive=True):
+            snapshots, paths = [], []
+            # Checked again under the lock: another scrape may have folded them already
+            for pid, path in self._process_files():
+                if _process_alive(pid):
+                    continue
+                data = _read_file(path)
+                if data is not None:
+                    snapshots.append(data)
+                    paths.append(path)
+            if snapshots:
+                self._fold(snapshots, paths)
+
+    def _fold(self, snapshots, paths):
+        """Add snapshots to the exited total, then delete paths; the caller holds the exclusive lock"""
+        counters, histograms = {}, {}
+        for data in [_read_file(os.path.join(self.directory, EXITED_FILE))] + snapshots:
+            if data is not None:
+                _merge(data, counters, histograms)
+        path = os.path.join(self.directory, EXITED_FILE)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({
+                    'counters': [[n, list(l), v] for (n, l), v in counters.items()],
+                    'histograms': [[n, list(l), v] for (n, l), v in histograms.items()],
+                    'gauges': [],
+                }, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            if has_app_context():
+                current_app.logger.error(f"Failed to write metrics file {path}: {str(e)}")
+            return
+        for process_path in paths:
+            try:
+                os.remove(process_path)
+            except OSError:
+                pass
+
+    @contextmanager
+    def _locked(self, exclusive):
+        # flock is released when the file is closed
+        with open(os.path.join(self.directory, LOCK_FILE), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        self.flush()
+        counters, histograms, gauges = self.collect()
+        series = {}
+        for (name, labels), value in sorted({**counters, **gauges}.items()):
+            series.setdefault(name, []).append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        for (name, labels), values in sorted(histograms.items()):
+            lines = series.setdefault(name, [])
+            cumulative = 0
+            for bound, count in zip(self._definitions[name][2] + (float('inf'),), values):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{name}_bucket{_format_labels(labels + (("le", le),))} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(values[-1])}')
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+
+        output = []
+        for name, (kind, help_text, _) in self._definitions.items():
+            output.append(f'# HELP {name} {help_text}')
+            output.append(f'# TYPE {name} {kind}')
+            output.extend(series.get(name, []))
+        return '\n'.join(output) + '\n'
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._flusher = None
+        self._retired = False
+
+    def clear(self):
+        """Forget this process's values and delete every process file"""
+        self._reset()
+        if self.directory:
+            for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+metrics = Metrics()
+
+
+def _read_file(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _merge(data, counters, histograms):
+    """Add a file's counters and histograms to the running totals"""
+    for name, labels, value in data['counters']:
+        key = (name, tuple(map(tuple, labels)))
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, values in data['histograms']:
+        key = (name, tuple(map(tuple, labels)))
+        merged = histograms.get(key)
+        histograms[key] = values if merged is None else [a + b for a, b in zip(merged, values)]
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in labels)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('metrics_query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'OTHER'
+    if operation not in ('SELECT', 'INSERT', 'UPDATE', 'DELETE'):
+        operation = 'OTHER'
+    labels = (('operation', operation),)
+    metrics.inc('netmaster_db_queries_total', labels)
+    metrics.observe('netmaster_db_query_duration_seconds', elapsed, labels)
+
+
+@bp.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint"""
+    if not current_app.config['METRICS_ENABLED']:
+        return Response('Metrics are disabled\n', status=404, mimetype='text/plain')
+    token = current_app.config['METRICS_TOKEN']
+    if token:
+        supplied = request.headers.get('Authorization', '')
+        authorized = hmac.compare_digest(supplied.encode(), f'Bearer {token}'.encode())
+    else:
+        authorized = request.remote_addr in LOCAL_ADDRESSES
+    if not authorized:
+        return Response('Forbidden\n', status=403, mimetype='text/plain')
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
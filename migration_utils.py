@@ -0,0 +1,216 @@
+"""
+Helpers for Alembic revisions that rewrite data in large tables.
+
+A data migration written as one UPDATE per row inside the revision's
+transaction holds the SQLite write lock for as long as it runs, and has to
+start over if it is interrupted. backfill() walks a table in primary key
+order instead, a chunk of rows at a time (keyset pagination, so every chunk
+is an index range scan however far along it is), and commits each chunk
+together with a checkpoint of the last key it reached. Running the upgrade
+again after a failure or Ctrl-C picks up after the last committed chunk.
+
+    from migration_utils import backfill, update_from_mapping, clear_checkpoints
+
+    def assign_codes(connection, rows):
+        update_from_mapping(connection, 'user', 'code', 'id',
+                            [(row.id, make_code(row.username)) for row in rows])
+
+    def copy_codes(connection, rows):
+        connection.execute(
+            sa.text('UPDATE note SET user_code = "user".code FROM "user" '
+                    'WHERE "user".id = note.user_id AND note.id BETWEEN :first AND :last'),
+            {'first': rows[0].id, 'last': rows[-1].id}
+        )
+
+    def upgrade():
+        ...  # add the columns
+        backfill('user_code', 'user', 'id', assign_codes, columns=['username'])
+        backfill('note_user_code', 'note', 'id', copy_codes)
+        ...  # constraints, dropped columns
+        clear_checkpoints('user_code', 'note_user_code')
+
+Inside a chunk, apply the changes with set-based statements:
+update_from_mapping() for a computed old -> new mapping, or an
+UPDATE ... FROM (SQLite 3.33+) over the chunk's key range, as above.
+A revision that can be re-run after an interruption must also skip
+schema changes it has already made, such as a column it added.
+Progress, throughput and an estimate of the time left are logged every few
+seconds under the alembic logger.
+
+Checkpoints live in a migration_checkpoint table, which clear_checkpoints()
+drops again once it is empty. A finished backfill is skipped when the
+revision is re-run, so call clear_checkpoints() only at the end of upgrade().
+These helpers commit as they go and cannot run in offline (--sql) mode.
+"""
+
+import json
+import time
+import logging
+from datetime import datetime, timezone
+from alembic import op
+import sqlalchemy as sa
+
+logger = logging.getLogger('alembic.backfill')
+
+DEFAULT_CHUNK_SIZE = 5000
+# Seconds between progress messages
+PROGRESS_INTERVAL = 5.0
+CHECKPOINT_TABLE = 'migration_checkpoint'
+
+checkpoints = sa.table(
+    CHECKPOINT_TABLE,
+    sa.column('name'),
+    sa.column('last_key'),
+    sa.column('rows_done'),
+    sa.column('finished'),
+    sa.column('updated_at'),
+)
+
+
+def backfill(name, table, key, apply, columns=(), chunk_size=DEFAULT_CHUNK_SIZE):
+    """Call apply(connection, rows) for every row of table, one committed chunk at a time.
+
+    Rows are selected in order of the unique column key, with the extra
+    columns, and apply() runs in the chunk's transaction. name identifies
+    the checkpoint, so it must be unique among the revision's backfills.
+    Returns the number of rows processed, including earlier runs.
+    """
+    context = op.get_context()
+    if context.as_sql:
+        raise RuntimeError(f"Backfill {name} cannot run in offline mode")
+
+    source = sa.table(table, *[sa.column(c) for c in (key, *columns)])
+    key_column = source.c[key]
+    # Commit what the revision has done so far; each chunk gets its own transaction
+    with context.autocommit_block():
+        engine = context.bind.engine
+        with engine.begin() as connection:
+            _create_checkpoint_table(connection)
+            checkpoint = connection.execute(
+                sa.select(checkpoints.c.last_key, checkpoints.c.rows_done, checkpoints.c.finished)
+                .where(checkpoints.c.name == name)
+            ).first()
+            if checkpoint is None:
+                connection.execute(sa.insert(checkpoints).values(
+                    name=name, last_key=None, rows_done=0, finished=False, updated_at=_now()))
+                last_key, rows_done = None, 0
+            elif checkpoint.finished:
+                logger.info(f"Backfill {name}: already finished ({checkpoint.rows_done} rows)")
+                return checkpoint.rows_done
+            else:
+                last_key, rows_done = _load_key(checkpoint.last_key), checkpoint.rows_done
+                logger.info(f"Backfill {name}: resuming after {rows_done} rows")
+
+            remaining = sa.select(sa.func.count()).select_from(source)
+            if last_key is not None:
+                remaining = remaining.where(key_column > last_key)
+            progress = Progress(name, rows_done, rows_done + connection.execute(remaining).scalar())
+
+        query = sa.select(*source.c).order_by(key_column).limit(chunk_size)
+        while True:
+            with engine.begin() as connection:
+                chunk_query = query if last_key is None else query.where(key_column > last_key)
+                rows = connection.execute(chunk_query).fetchall()
+                if rows:
+                    apply(connection, rows)
+                    last_key = getattr(rows[-1], key)
+                    rows_done += len(rows)
+                connection.execute(
+                    sa.update(checkpoints).where(checkpoints.c.name == name).values(
+                        last_key=_dump_key(last_key), rows_done=rows_done,
+                        finished=len(rows) < chunk_size, updated_at=_now())
+                )
+            progress.update(rows_done)
+            if len(rows) < chunk_size:
+                break
+    progress.finish()
+    return rows_done
+
+
+def update_from_mapping(connection, table, column, key, mapping):
+    """Set table.column to new where table.key is old, for each (old, new) in mapping.
+
+    The pairs go into a temporary table with one executemany and are applied
+    with a single UPDATE ... FROM.
+    """
+    if not mapping:
+        return 0
+    connection.execute(sa.text(
+        'CREATE TEMPORARY TABLE IF NOT EXISTS backfill_mapping (old_value PRIMARY KEY, new_value)'))
+    connection.execute(sa.text('DELETE FROM backfill_mapping'))
+    connection.execute(
+        sa.text('INSERT INTO backfill_mapping (old_value, new_value) VALUES (:old, :new)'),
+        [{'old': old, 'new': new} for old, new in mapping]
+    )
+    preparer = connection.dialect.identifier_preparer
+    target, column, key = preparer.quote(table), preparer.quote(column), preparer.quote(key)
+    result = connection.execute(sa.text(
+        f'UPDATE {target} SET {column} = backfill_mapping.new_value '
+        f'FROM backfill_mapping WHERE {target}.{key} = backfill_mapping.old_value'
+    ))
+    return result.rowcount
+
+
+def clear_checkpoints(*names):
+    """Forget the named backfills, and drop the checkpoint table once it is empty"""
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table(CHECKPOINT_TABLE):
+        return
+    bind.execute(sa.delete(checkpoints).where(checkpoints.c.name.in_(names)))
+    if not bind.execute(sa.select(sa.func.count()).select_from(checkpoints)).scalar():
+        op.drop_table(CHECKPOINT_TABLE)
+
+
+class Progress:
+    """Logs rows done, throughput and time left for one backfill"""
+
+    def __init__(self, name, done, total):
+        self.name = name
+        self.start_done = self.done = done
+        self.total = total
+        self.started = self.reported = time.monotonic()
+        logger.info(f"Backfill {name}: {total - done} of {total} rows to go")
+
+    def rate(self, done):
+        elapsed = time.monotonic() - self.started
+        return (done - self.start_done) / elapsed if elapsed > 0 else 0.0
+
+    def update(self, done):
+        self.done = done
+        now = time.monotonic()
+        if now - self.reported < PROGRESS_INTERVAL:
+            return
+        self.reported = now
+        rate = self.rate(done)
+        percent = 100.0 * done / self.total if self.total else 100.0
+        left = f", about {(self.total - done) / rate:.0f}s left" if rate and done < self.total else ''
+        logger.info(f"Backfill {self.name}: {done}/{self.total} rows ({percent:.1f}%), {rate:.0f} rows/s{left}")
+
+    def finish(self):
+        elapsed = time.monotonic() - self.started
+        logger.info(f"Backfill {self.name}: finished {self.done} rows in {elapsed:.1f}s "
+                    f"({self.rate(self.done):.0f} rows/s)")
+
+
+def _create_checkpoint_table(connection):
+    sa.Table(
+        CHECKPOINT_TABLE, sa.MetaData(),
+        sa.Column('name', sa.String(100), primary_key=True),
+        sa.Column('last_key', sa.Text()),
+        sa.Column('rows_done', sa.Integer(), nullable=False),
+        sa.Column('finished', sa.Boolean(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True)),
+    ).create(connection, checkfirst=True)
+
+
+def _dump_key(key):
+    # JSON keeps integer and string keys apart across runs
+    return json.dumps(key)
+
+
+def _load_key(value):
+    return json.loads(value) if value is not None else None
+
+
+def _now():
+    return datetime.now(timezone.utc)
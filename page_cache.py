@@ -0,0 +1,137 @@
+"""
+Rendered page cache for NetMaster.
+
+Pages such as /landing, /calculator, /privacy and the login form only vary
+with the logged-in user's navbar details and preferences, the year in the
+footer and the CSRF token. The @page_cache.cached decorator
+(PageCache.cached) renders each variant once with a placeholder in place of
+the CSRF token, keeps the rendered HTML split around the placeholder, and
+on later requests only joins in the current token.
+
+Responses carry a strong ETag and "Cache-Control: private, no-cache", so
+browsers revalidate and get a 304 when nothing has changed. The ETag covers
+the rendered variant, the session's CSRF secret and a time bucket of half
+the CSRF lifetime, so a page revived by a 304 never holds an expired token.
+
+Requests with pending flash messages bypass the cache.
+
+Configuration:
+    PAGE_CACHE_ENABLED      Turn the cache on or off (default: True)
+    PAGE_CACHE_MAX_ENTRIES  Variants kept per worker (default: 512)
+"""
+
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+from flask import current_app, request, session, g
+from flask_login import current_user
+from flask_wtf.csrf import generate_csrf
+
+CSRF_PLACEHOLDER = '__PAGE_CACHE_CSRF_TOKEN__'
+
+
+class PageCache:
+    """LRU cache of rendered pages, keyed by endpoint and variant"""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('PAGE_CACHE_ENABLED', True)
+        app.config.setdefault('PAGE_CACHE_MAX_ENTRIES', self.max_entries)
+        self.max_entries = app.config['PAGE_CACHE_MAX_ENTRIES']
+        app.context_processor(self._inject_placeholder)
+
+    @staticmethod
+    def _inject_placeholder():
+        # Shadows Flask-WTF's csrf_token() global while a cacheable page renders
+        if g.get('page_cache_rendering'):
+            return {'csrf_token': lambda: CSRF_PLACEHOLDER}
+        return {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def variant_key():
+        """Everything the cached templates read that differs between requests"""
+        if current_user.is_authenticated:
+            user = (
+                current_user.id,
+                current_user.username,
+                current_user.theme,
+                current_user.language,
+                current_user.default_calculation_mode,
+                current_user.auto_save_results,
+            )
+        else:
+            user = None
+        return (request.endpoint, request.query_string, user, datetime.now().year)
+
+    def cached(self, view):
+        """Serve a GET view from the cache, with ETag revalidation"""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if (request.method != 'GET'
+                    or not current_app.config['PAGE_CACHE_ENABLED']
+                    or session.get('_flashes')):
+                return view(*args, **kwargs)
+
+            key = self.variant_key()
+            entry = self.get(key)
+            if entry is None:
+                g.page_cache_rendering = True
+                try:
+                    response = current_app.make_response(view(*args, **kwargs))
+                finally:
+                    g.page_cache_rendering = False
+                body = response.get_data(as_text=True)
+                if response.status_code != 200 or response.mimetype != 'text/html':
+                    if CSRF_PLACEHOLDER in body:
+                        response.set_data(body.replace(CSRF_PLACEHOLDER, generate_csrf()))
+                    return response
+                entry = (body.split(CSRF_PLACEHOLDER), hashlib.sha256(body.encode()).hexdigest())
+                self.set(key, entry)
+
+            parts, digest = entry
+            token = generate_csrf()
+            raw_token = session.get(current_app.config.get('WTF_CSRF_FIELD_NAME', 'csrf_token'), '')
+            bucket = int(time.time() // max(1, (current_app.config.get('WTF_CSRF_TIME_LIMIT') or 3600) // 2))
+            etag = hashlib.sha256(f'{digest}:{raw_token}:{bucket}'.encode()).hexdigest()[:32]
+
+            # A client holding the compressed variant ("<etag>-gzip") gets its 304 from compression.py
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.response_class(token.join(parts), mimetype='text/html')
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.add('Cookie')
+            return response
+        return wrapper
+
+
+page_cache = PageCache()
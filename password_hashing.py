@@ -0,0 +1,169 @@
+"""
+Password hashing for NetMaster.
+
+Hashing and verification are CPU-bound (scrypt/pbkdf2), so they are run in a
+small dedicated process pool instead of the request thread. The number of
+in-flight operations is capped; once the cap is reached callers get a
+PasswordHashingBusyError instead of queueing behind a login storm.
+
+Configuration (environment variables):
+    PASSWORD_HASH_METHOD       Werkzeug method string, e.g. "scrypt:32768:8:1"
+                               or "pbkdf2:sha256:600000" (default: "scrypt")
+    PASSWORD_HASH_SALT_LENGTH  Salt length in characters (default: 16)
+    PASSWORD_HASH_WORKERS      Pool processes; 0 hashes in the calling thread
+                               (default: 2)
+    PASSWORD_HASH_MAX_PENDING  Maximum concurrent hash/verify operations per
+                               worker process (default: 4 * workers, min 1)
+    PASSWORD_HASH_TIMEOUT      Seconds to wait for a free slot (default: 5)
+"""
+
+import os
+import threading
+from itertools import repeat
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+
+class PasswordHashingBusyError(Exception):
+    """Raised when no hashing slot becomes free within the timeout"""
+    pass
+
+
+def normalize_method(method):
+    """Expand a Werkzeug method string to the form stored in hashes.
+
+    "scrypt" becomes "scrypt:32768:8:1" and "pbkdf2" becomes
+    "pbkdf2:sha256:<default iterations>", matching what
+    generate_password_hash writes in front of the first '$'.
+    """
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        if not args:
+            args = [str(2 ** 15), '8', '1']
+        if len(args) != 3:
+            raise ValueError("'scrypt' takes 3 arguments.")
+        return 'scrypt:' + ':'.join(str(int(a)) for a in args)
+    if name == 'pbkdf2':
+        if len(args) == 0:
+            args = ['sha256', str(DEFAULT_PBKDF2_ITERATIONS)]
+        elif len(args) == 1:
+            args = [args[0], str(DEFAULT_PBKDF2_ITERATIONS)]
+        elif len(args) != 2:
+            raise ValueError("'pbkdf2' takes 2 arguments.")
+        return f'pbkdf2:{args[0]}:{int(args[1])}'
+    raise ValueError(f"Invalid hash method '{method}'.")
+
+
+def _hash(password, method, salt_length):
+    return generate_password_hash(password, method=method, salt_length=salt_length)
+
+
+def _verify(password_hash, password):
+    return check_password_hash(password_hash, password)
+
+
+class PasswordHasher:
+    """Runs password hashing in a bounded process pool"""
+
+    def __init__(self, method='scrypt', salt_length=16, workers=2, max_pending=None, timeout=5.0):
+        self.method = normalize_method(method)
+        self.salt_length = salt_length
+        self.workers = max(0, workers)
+        if max_pending is None:
+            max_pending = 4 * self.workers
+        self.max_pending = max(1, max_pending)
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        # Hashes running or waiting for a pool process, for health checks
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+
+    @classmethod
+    def from_env(cls):
+        """Build a hasher from PASSWORD_HASH_* environment variables"""
+        workers = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+        max_pending = os.environ.get('PASSWORD_HASH_MAX_PENDING')
+        return cls(
+            method=os.environ.get('PASSWORD_HASH_METHOD', 'scrypt'),
+            salt_length=int(os.environ.get('PASSWORD_HASH_SALT_LENGTH', 16)),
+            workers=workers,
+            max_pending=int(max_pending) if max_pending else None,
+            timeout=float(os.environ.get('PASSWORD_HASH_TIMEOUT', 5)),
+        )
+
+    def _get_executor(self):
+        """Create the pool on first use, and again after a fork"""
+        pid = os.getpid()
+        if self._executor is None or self._executor_pid != pid:
+            with self._lock:
+                if self._executor is None or self._executor_pid != pid:
+                    # Spawned children only import this module, never the app,
+                    # and do not inherit the request threads of the parent.
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn')
+                    )
+                    self._executor_pid = pid
+        return self._executor
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PasswordHashingBusyError("Password hashing capacity exhausted")
+        with self._lock:
+            self.in_flight += 1
+        try:
+            if self.workers == 0:
+                return func(*args)
+            return self._get_executor().submit(func, *args).result()
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    def hash(self, password):
+        """Return a new hash of password using the configured method"""
+        return self._run(_hash, password, self.method, self.salt_length)
+
+    def hash_many(self, passwords, workers=None):
+        """Hash a batch of passwords across workers processes (default: one per CPU).
+
+        Used for bulk provisioning. The batch gets a pool of its own, so it
+        does not take the shared pool's slots away from logins.
+        """
+        passwords = list(passwords)
+        if workers is None:
+            workers = (os.cpu_count() or 1) if self.workers else 0
+        workers = min(workers, len(passwords))
+        if workers <= 1:
+            return [_hash(password, self.method, self.salt_length) for password in passwords]
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            # A few chunks per process keeps them all busy until the end
+            chunksize = max(1, len(passwords) // (4 * workers))
+            return list(pool.map(_hash, passwords, repeat(self.method), repeat(self.salt_length),
+                                 chunksize=chunksize))
+
+    def verify(self, password_hash, password):
+        """Check password against a stored hash"""
+        if not password_hash:
+            return False
+        return self._run(_verify, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True if password_hash was made with different parameters"""
+        if not password_hash or '$' not in password_hash:
+            return True
+        return password_hash.split('$', 1)[0] != self.method
+
+    def shutdown(self):
+        """Stop the pool, if one was started in this process"""
+        with self._lock:
+            if self._executor is not None and self._executor_pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._executor_pid = None
+
+
+hasher = PasswordHasher.from_env()
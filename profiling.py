@@ -0,0 +1,359 @@
+"""
+On-demand CPU and memory profiling of a live worker.
+
+Admins (users named in ADMIN_USERNAMES) can arm a capture that profiles
+the next N requests, optionally only those for one endpoint or route, or
+the next N calculation tasks, and then download the result:
+
+    POST   /admin/profiling/capture   {"target": "requests" | "calculations",
+                                       "count": 20, "endpoint": "main.calculate_subnets",
+                                       "mode": "cprofile" | "sample", "interval_ms": 5}
+    GET    /admin/profiling/capture   progress of the current capture
+    DELETE /admin/profiling/capture   cancel it
+    GET    /admin/profiling/capture/download?format=prof|text|collapsed
+
+"cprofile" records every call with cProfile; the .prof download opens in
+snakeviz or pstats, and "text" is the pstats report sorted by cumulative
+time. "sample" has a background thread record the profiled threads'
+stacks every interval_ms, which costs far less on hot code; the download
+is in the collapsed format read by flamegraph.pl and speedscope.
+
+Memory is inspected with tracemalloc snapshots of the same process:
+
+    POST /admin/profiling/memory/start   {"frames": 10}
+    POST /admin/profiling/memory/snapshots
+    GET  /admin/profiling/memory/snapshots/<id>?compare_to=<id>&group_by=lineno&limit=25
+    POST /admin/profiling/memory/stop
+
+GET /admin/profiling shows the capture, the snapshots and the worker's
+RSS. Each gunicorn worker keeps its own state, so run a single worker (the
+default) or expect requests to reach different workers.
+
+Nothing is registered unless PROFILING_ENABLED is set, and tracemalloc
+only runs between start and stop, so profiling costs nothing when off.
+
+Configuration:
+    PROFILING_ENABLED  Enable the profiling endpoints and hooks (default: False)
+    ADMIN_USERNAMES    Comma-separated usernames allowed to use them
+"""
+
+import io
+import os
+import sys
+import time
+import marshal
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from flask import Blueprint, Response, current_app, jsonify, request, g
+from flask_login import current_user
+
+MAX_SNAPSHOTS = 10
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+)
+
+bp = Blueprint('profiling', __name__, url_prefix='/admin/profiling')
+
+
+class Capture:
+    """Profiles collected for one armed capture"""
+
+    def __init__(self, target, count, endpoint=None, mode='cprofile', interval=0.005):
+        self.target = target
+        self.count = count
+        self.endpoint = endpoint
+        self.mode = mode
+        self.interval = interval
+        self.remaining = count
+        self.completed = 0
+        self.started = time.time()
+        self.finished = None
+        self.stats = None
+        self.samples = Counter()
+        self._lock = threading.Lock()
+        self._threads = set()
+        self._sampler = None
+
+    def claim(self):
+        """Take one of the remaining slots; False once the capture is full"""
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+    def begin(self):
+        """Start profiling the current thread; returns the token for end()"""
+        if self.mode == 'sample':
+            ident = threading.get_ident()
+            with self._lock:
+                self._threads.add(ident)
+                if self._sampler is None:
+                    self._sampler = threading.Thread(target=self._sample, name='profiling-sampler', daemon=True)
+                    self._sampler.start()
+            return ident
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def end(self, token):
+        if self.mode == 'sample':
+            with self._lock:
+                self._threads.discard(token)
+        else:
+            token.disable()
+            with self._lock:
+                if self.stats is None:
+                    self.stats = pstats.Stats(token)
+                else:
+                    self.stats.add(token)
+        with self._lock:
+            self.completed += 1
+            if self.completed >= self.count:
+                self.finished = time.time()
+
+    def _sample(self):
+        while True:
+            with self._lock:
+                threads = list(self._threads)
+                # begin() starts a new sampler when the next thread arrives
+                if not threads:
+                    self._sampler = None
+                    return
+            frames = sys._current_frames()
+            for ident in threads:
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                    frame = frame.f_back
+                if stack:
+                    self.samples[';'.join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+    def status(self):
+        return {
+            'target': self.target,
+            'mode': self.mode,
+            'endpoint': self.endpoint,
+            'count': self.count,
+            'completed': self.completed,
+            'finished': self.finished is not None,
+            'elapsed': round((self.finished or time.time()) - self.started, 3),
+            'samples': sum(self.samples.values()) if self.mode == 'sample' else None,
+        }
+
+
+class Profiler:
+    """Holds the armed capture and tracemalloc snapshots for this process"""
+
+    def __init__(self):
+        self.capture = None
+        self.snapshots = {}
+        self._next_snapshot = 1
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('PROFILING_ENABLED', False)
+        app.config.setdefault('ADMIN_USERNAMES', [])
+        app.register_blueprint(bp)
+        if not app.config['PROFILING_ENABLED']:
+            return
+        app.before_request(self._start_request)
+        app.teardown_request(self._finish_request)
+
+    def _start_request(self):
+        capture = self.capture
+        if capture is None or capture.target != 'requests' or capture.remaining <= 0:
+            return
+        if capture.endpoint and capture.endpoint not in (
+                request.endpoint, request.url_rule.rule if request.url_rule else None):
+            return
+        # Never profile the requests that manage or download the capture
+        if request.blueprint == bp.name or not capture.claim():
+            return
+        g.profiling = (capture, capture.begin())
+
+    def _finish_request(self, exc=None):
+        profiling = g.pop('profiling', None)
+        if profiling is not None:
+            capture, token = profiling
+            capture.end(token)
+
+    def wrap_calculation(self, func):
+        """Profile func if a calculation capture is armed, otherwise return it unchanged"""
+        capture = self.capture
+        if capture is None or capture.target != 'calculations' or not capture.claim():
+            return func
+
+        def profiled(*args, **kwargs):
+            token = capture.begin()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                capture.end(token)
+        return profiled
+
+    def take_snapshot(self):
+        snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        with self._lock:
+            snapshot_id = self._next_snapshot
+            self._next_snapshot += 1
+            self.snapshots[snapshot_id] = (time.time(), snapshot)
+            while len(self.snapshots) > MAX_SNAPSHOTS:
+                del self.snapshots[min(self.snapshots)]
+        return snapshot_id
+
+
+profiler = Profiler()
+
+
+def resident_memory():
+    """Current RSS of this process in bytes, or None if it cannot be read"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+@bp.before_request
+def require_admin():
+    if not current_app.config['PROFILING_ENABLED']:
+        return Response('Profiling is disabled\n', status=404, mimetype='text/plain')
+    if not current_user.is_authenticated or current_user.username not in current_app.config['ADMIN_USERNAMES']:
+        return jsonify({'status': 'error', 'message': 'Admin access required.'}), 403
+
+
+@bp.route('')
+def status():
+    traced, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (None, None)
+    return jsonify({
+        'pid': os.getpid(),
+        'rss_bytes': resident_memory(),
+        'capture': profiler.capture.status() if profiler.capture else None,
+        'tracemalloc': {'tracing': tracemalloc.is_tracing(), 'traced_bytes': traced, 'peak_bytes': peak},
+        'snapshots': [{'id': i, 'taken_at': taken} for i, (taken, _) in sorted(profiler.snapshots.items())],
+    })
+
+
+@bp.route('/capture', methods=['POST'])
+def start_capture():
+    data = request.get_json(silent=True) or {}
+    target = data.get('target', 'requests')
+    mode = data.get('mode', 'cprofile')
+    try:
+        count = int(data.get('count', 10))
+        interval = float(data.get('interval_ms', 5)) / 1000
+    except (ValueError, TypeError):
+        return jsonify({'status': 'error', 'message': 'count and interval_ms must be numbers.'}), 400
+    if target not in ('requests', 'calculations'):
+        return jsonify({'status': 'error', 'message': 'target must be "requests" or "calculations".'}), 400
+    if mode not in ('cprofile', 'sample'):
+        return jsonify({'status': 'error', 'message': 'mode must be "cprofile" or "sample".'}), 400
+    if not 1 <= count <= 10000 or not 0.001 <= interval <= 1:
+        return jsonify({'status': 'error', 'message': 'count must be 1-10000 and interval_ms 1-1000.'}), 400
+    profiler.capture = Capture(target, count, data.get('endpoint') or None, mode, interval)
+    current_app.logger.info(f"{current_user.username} started profiling {count} {target} ({mode})")
+    return jsonify({'status': 'started', 'capture': profiler.capture.status()})
+
+
+@bp.route('/capture', methods=['GET'])
+def capture_status():
+    if profiler.capture is None:
+        return jsonify({'status': 'error', 'message': 'No capture has been started.'}), 404
+    return jsonify({'status': 'success', 'capture': profiler.capture.status()})
+
+
+@bp.route('/capture', methods=['DELETE'])
+def cancel_capture():
+    capture = profiler.capture
+    if capture is not None:
+        with capture._lock:
+            capture.remaining = 0
+    return jsonify({'status': 'success'})
+
+
+@bp.route('/capture/download')
+def download_capture():
+    capture = profiler.capture
+    if capture is None or capture.completed == 0:
+        return jsonify({'status': 'error', 'message': 'Nothing has been profiled yet.'}), 404
+    name = f'profile-{os.getpid()}-{int(capture.started)}'
+    if capture.mode == 'sample':
+        lines = [f'{stack} {count}' for stack, count in capture.samples.most_common()]
+        return Response('\n'.join(lines) + '\n', mimetype='text/plain',
+                        headers={'Content-Disposition': f'attachment; filename={name}.collapsed'})
+    if request.args.get('format') == 'text':
+        out = io.StringIO()
+        stats = pstats.Stats(stream=out)
+        with capture._lock:
+            stats.add(capture.stats)
+        stats.sort_stats('cumulative').print_stats(int(request.args.get('limit', 60)))
+        return Response(out.getvalue(), mimetype='text/plain')
+    with capture._lock:
+        # Same bytes pstats.Stats.dump_stats() writes
+        data = marshal.dumps(capture.stats.stats)
+    return Response(data, mimetype='application/octet-stream',
+                    headers={'Content-Disposition': f'attachment; filename={name}.prof'})
+
+
+@bp.route('/memory/start', methods=['POST'])
+def start_tracemalloc():
+    data = request.get_json(silent=True) or {}
+    try:
+        frames = max(1, min(int(data.get('frames', 10)), 100))
+    except (ValueError, TypeError):
+        return jsonify({'status': 'error', 'message': 'frames must be a number.'}), 400
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    return jsonify({'status': 'success', 'frames': tracemalloc.get_traceback_limit()})
+
+
+@bp.route('/memory/stop', methods=['POST'])
+def stop_tracemalloc():
+    tracemalloc.stop()
+    profiler.snapshots.clear()
+    return jsonify({'status': 'success'})
+
+
+@bp.route('/memory/snapshots', methods=['POST'])
+def take_snapshot():
+    if not tracemalloc.is_tracing():
+        return jsonify({'status': 'error', 'message': 'Start tracemalloc first.'}), 409
+    snapshot_id = profiler.take_snapshot()
+    traced, peak = tracemalloc.get_traced_memory()
+    return jsonify({'status': 'success', 'id': snapshot_id, 'traced_bytes': traced,
+                    'peak_bytes': peak, 'rss_bytes': resident_memory()})
+
+
+@bp.route('/memory/snapshots/<int:snapshot_id>')
+def show_snapshot(snapshot_id):
+    """Top allocations in a snapshot, or the growth since compare_to"""
+    group_by = request.args.get('group_by', 'lineno')
+    if group_by not in ('lineno', 'filename', 'traceback'):
+        return jsonify({'status': 'error', 'message': 'group_by must be lineno, filename or traceback.'}), 400
+    limit = request.args.get('limit', 25, type=int)
+    compare_to = request.args.get('compare_to', type=int)
+    if snapshot_id not in profiler.snapshots or (compare_to and compare_to not in profiler.snapshots):
+        return jsonify({'status': 'error', 'message': 'Unknown snapshot.'}), 404
+
+    snapshot = profiler.snapshots[snapshot_id][1]
+    if compare_to:
+        stats = snapshot.compare_to(profiler.snapshots[compare_to][1], group_by)
+        title = f'Snapshot {snapshot_id} compared to {compare_to}, by {group_by}'
+    else:
+        stats = snapshot.statistics(group_by)
+        title = f'Snapshot {snapshot_id}, by {group_by}'
+    lines = [title, '']
+    for stat in stats[:limit]:
+        lines.append(str(stat))
+        if group_by == 'traceback':
+            lines.extend(f'    {line}' for line in stat.traceback.format())
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain')
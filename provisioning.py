@@ -0,0 +1,219 @@
+"""
+Bulk user provisioning.
+
+Creates many accounts at once from a CSV (username,email,password header)
+or a JSON list of {"username", "email", "password"} objects, for
+onboarding a whole organization:
+
+    POST /admin/users/bulk          JSON body, or a "file" upload (.csv or .json)
+    flask --app app netmaster provision users.csv
+
+Each row is checked like a /register submission, but the database work is
+done per batch rather than per user. Existing usernames and emails are
+found with one IN query per QUERY_CHUNK rows, user IDs are generated for
+the whole batch and checked for collisions with one IN query, passwords
+are hashed in parallel across processes (PasswordHasher.hash_many), and
+the users are inserted CHUNK_SIZE rows per transaction with executemany.
+
+Hashing dominates: everything else for 10,000 users takes about half a
+second, while each scrypt hash costs around 100ms of CPU, divided by the
+number of hashing processes.
+
+A row that fails validation or collides with an existing account is
+reported with its row number and skipped; the other rows are still
+created. The endpoint is limited to ADMIN_USERNAMES and to
+PROVISION_MAX_USERS rows per request; larger imports should use the
+command, which has no limit.
+
+Configuration:
+    PROVISION_MAX_USERS  Rows accepted per request to the endpoint (default: 1000)
+"""
+
+import io
+import csv
+import json
+import string
+import secrets
+from flask import Blueprint, current_app, jsonify, request
+from flask_login import current_user
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+# Rows per users-exist query, below SQLite's bound parameter limit
+QUERY_CHUNK = 5000
+# Rows inserted per transaction
+CHUNK_SIZE = 1000
+ID_CHARS = string.ascii_uppercase + string.digits
+
+bp = Blueprint('provisioning', __name__, url_prefix='/admin/users')
+
+
+class ProvisioningError(Exception):
+    """Raised when the input cannot be read at all"""
+    pass
+
+
+def parse_users(text, file_format):
+    """List of {'row', 'username', 'email', 'password'} from CSV or JSON text"""
+    if file_format == 'json':
+        try:
+            data = json.loads(text)
+        except ValueError as e:
+            raise ProvisioningError(f"Invalid JSON: {e}")
+        if isinstance(data, dict):
+            data = data.get('users')
+        if not isinstance(data, list) or not all(isinstance(user, dict) for user in data):
+            raise ProvisioningError('Expected a list of user objects')
+        return [dict(user, row=i) for i, user in enumerate(data, 1)]
+    if file_format == 'csv':
+        reader = csv.DictReader(io.StringIO(text))
+        if not reader.fieldnames or not {'username', 'email', 'password'} <= set(reader.fieldnames):
+            raise ProvisioningError('The CSV needs a header with username, email and password columns')
+        # The row number is the data row's position, counting from 1 below the header
+        return [dict(user, row=i) for i, user in enumerate(reader, 1)]
+    raise ProvisioningError(f"Unknown format {file_format!r}")
+
+
+def existing_values(column, values):
+    """The subset of values already present in column"""
+    from app import db
+
+    values = list(values)
+    found = set()
+    for start in range(0, len(values), QUERY_CHUNK):
+        found.update(value for (value,) in
+                     db.session.query(column).filter(column.in_(values[start:start + QUERY_CHUNK])))
+    return found
+
+
+def random_user_id():
+    """A random 8-character ID, drawn uniformly like User.generate_user_id()"""
+    value = secrets.randbelow(len(ID_CHARS) ** 8)
+    chars = []
+    for _ in range(8):
+        value, index = divmod(value, len(ID_CHARS))
+        chars.append(ID_CHARS[index])
+    return ''.join(chars)
+
+
+def reserve_user_ids(count):
+    """count new unique 8-character user IDs, checked against the user table in bulk"""
+    from app import User
+
+    reserved = set()
+    while len(reserved) < count:
+        candidates = {random_user_id() for _ in range(count - len(reserved))}
+        candidates -= reserved
+        reserved |= candidates - existing_values(User.id, candidates)
+    return list(reserved)
+
+
+def provision_users(users, workers=None, chunk_size=CHUNK_SIZE):
+    """Create accounts for users (as returned by parse_users).
+
+    Returns (created, errors): created is a list of {'row', 'id',
+    'username', 'email'} and errors a list of {'row', 'username', 'message'}.
+    """
+    from app import db, User, hasher, sanitize_many, validate_username, validate_email, PASSWORD_REGEX
+
+    errors = []
+    usernames = sanitize_many([str(user.get('username') or '').strip() for user in users])
+    emails = sanitize_many([str(user.get('email') or '').strip() for user in users])
+    valid = []
+    seen_usernames, seen_emails = set(), set()
+    for user, username, email in zip(users, usernames, emails):
+        password = str(user.get('password') or '').strip()
+        is_valid, message = validate_username(username)
+        if is_valid:
+            is_valid, message = validate_email(email)
+        if is_valid and not PASSWORD_REGEX.match(password):
+            is_valid, message = False, ('Password must be at least 8 characters long and include at least one '
+                                        'uppercase letter, one lowercase letter, and one number.')
+        if is_valid and username in seen_usernames:
+            is_valid, message = False, 'Username appears more than once'
+        if is_valid and email in seen_emails:
+            is_valid, message = False, 'Email appears more than once'
+        if not is_valid:
+            errors.append({'row': user['row'], 'username': username, 'message': message})
+            continue
+        seen_usernames.add(username)
+        seen_emails.add(email)
+        valid.append({'row': user['row'], 'username': username, 'email': email, 'password': password})
+
+    taken_usernames = existing_values(User.username, seen_usernames)
+    taken_emails = existing_values(User.email, seen_emails)
+    accepted = []
+    for user in valid:
+        if user['username'] in taken_usernames:
+            errors.append({'row': user['row'], 'username': user['username'], 'message': 'Username already exists'})
+        elif user['email'] in taken_emails:
+            errors.append({'row': user['row'], 'username': user['username'], 'message': 'Email already registered'})
+        else:
+            accepted.append(user)
+
+    hashes = hasher.hash_many([user['password'] for user in accepted], workers=workers)
+    for user, user_id, password_hash in zip(accepted, reserve_user_ids(len(accepted)), hashes):
+        user['id'] = user_id
+        user['password_hash'] = password_hash
+
+    created = []
+    for start in range(0, len(accepted), chunk_size):
+        chunk = accepted[start:start + chunk_size]
+        try:
+            db.session.execute(insert(User.__table__), [user_row(user) for user in chunk])
+            db.session.commit()
+            created.extend(chunk)
+        except IntegrityError:
+            # Someone registered one of these names since the check; find which, one row at a time
+            db.session.rollback()
+            for user in chunk:
+                try:
+                    db.session.execute(insert(User.__table__), [user_row(user)])
+                    db.session.commit()
+                    created.append(user)
+                except IntegrityError:
+                    db.session.rollback()
+                    errors.append({'row': user['row'], 'username': user['username'],
+                                   'message': 'Username or email already exists'})
+
+    errors.sort(key=lambda error: error['row'])
+    return ([{key: user[key] for key in ('row', 'id', 'username', 'email')} for user in created], errors)
+
+
+def user_row(user):
+    return {'id': user['id'], 'username': user['username'], 'email': user['email'],
+            'password_hash': user['password_hash']}
+
+
+@bp.before_request
+def require_admin():
+    if not current_user.is_authenticated or current_user.username not in current_app.config['ADMIN_USERNAMES']:
+        return jsonify({'status': 'error', 'message': 'Admin access required.'}), 403
+
+
+@bp.route('/bulk', methods=['POST'])
+def bulk_create():
+    """Create the users in the JSON body or an uploaded .csv/.json file"""
+    try:
+        upload = request.files.get('file')
+        if upload is not None:
+            file_format = 'json' if upload.filename.lower().endswith('.json') else 'csv'
+            users = parse_users(upload.read().decode('utf-8-sig'), file_format)
+        elif request.is_json:
+            users = parse_users(request.get_data(as_text=True), 'json')
+        else:
+            return jsonify({'status': 'error', 'message': 'Send JSON or upload a CSV/JSON file as "file".'}), 400
+    except (ProvisioningError, UnicodeDecodeError) as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    limit = current_app.config['PROVISION_MAX_USERS']
+    if len(users) > limit:
+        return jsonify({'status': 'error',
+                        'message': f'At most {limit} users per request; use "flask netmaster provision" for more.'}), 400
+    try:
+        created, errors = provision_users(users)
+    except Exception as e:
+        current_app.logger.error(f"Error provisioning users: {str(e)}", exc_info=True)
+        return jsonify({'status': 'error', 'message': 'Failed to provision users.'}), 500
+    current_app.logger.info(f"{current_user.username} provisioned {len(created)} users ({len(errors)} rejected)")
+    return jsonify({'status': 'success', 'created': created, 'errors': errors})
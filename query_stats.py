@@ -0,0 +1,104 @@
+"""
+Per-request SQL query accounting for NetMaster.
+
+When enabled, every SQL statement a request runs is counted and timed via
+SQLAlchemy cursor events. Each response gets a Server-Timing header with
+the database time, query count and total time, which browser dev tools
+show under the request's timing tab:
+
+    Server-Timing: db;dur=4.1;desc="7 queries", total;dur=18.6
+
+A warning is logged for requests that run more than QUERY_STATS_MAX_QUERIES
+statements, or that run the same statement QUERY_STATS_REPEAT_THRESHOLD
+times or more, which is the usual sign of an N+1 pattern such as loading a
+relationship inside a loop. Statements are grouped by their SQL text with
+bound parameters left as placeholders, so "SELECT ... WHERE id = ?" run for
+ten different ids is one shape repeated ten times.
+
+Nothing is registered while disabled, so it costs nothing by default.
+
+Configuration:
+    QUERY_STATS_ENABLED           Turn query accounting on (default: False)
+    QUERY_STATS_MAX_QUERIES       Statements per request before a warning (default: 20)
+    QUERY_STATS_REPEAT_THRESHOLD  Repeats of one statement before a warning (default: 5)
+"""
+
+import re
+import time
+from collections import Counter
+from flask import current_app, request, g
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# "IN (?, ?, ?)" lists of different lengths are the same shape
+IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+WHITESPACE_RE = re.compile(r'\s+')
+
+_listening = False
+
+
+def init_app(app):
+    """Count and time each request's SQL when QUERY_STATS_ENABLED is set"""
+    global _listening
+    app.config.setdefault('QUERY_STATS_ENABLED', False)
+    app.config.setdefault('QUERY_STATS_MAX_QUERIES', 20)
+    app.config.setdefault('QUERY_STATS_REPEAT_THRESHOLD', 5)
+    if not app.config['QUERY_STATS_ENABLED']:
+        return
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    if not _listening:
+        _listening = True
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def statement_shape(statement):
+    return IN_LIST_RE.sub('(?)', WHITESPACE_RE.sub(' ', statement.strip()))
+
+
+def _start_request():
+    g.query_stats = {'start': time.perf_counter(), 'count': 0, 'db_time': 0.0, 'shapes': Counter()}
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_stats_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('query_stats_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    # g belongs to the current app context, so calculation threads are not counted
+    stats = g.get('query_stats') if g else None
+    if stats is None:
+        return
+    stats['count'] += 1
+    stats['db_time'] += elapsed
+    stats['shapes'][statement_shape(statement)] += 1
+
+
+def _finish_request(response):
+    stats = g.pop('query_stats', None)
+    if stats is None:
+        return response
+    total_ms = (time.perf_counter() - stats['start']) * 1000
+    db_ms = stats['db_time'] * 1000
+    queries = f"{stats['count']} {'query' if stats['count'] == 1 else 'queries'}"
+    response.headers.add('Server-Timing', f'db;dur={db_ms:.1f};desc="{queries}", total;dur={total_ms:.1f}')
+
+    max_queries = current_app.config['QUERY_STATS_MAX_QUERIES']
+    if stats['count'] > max_queries:
+        current_app.logger.warning(
+            f"{request.method} {request.path} ran {stats['count']} queries "
+            f"({db_ms:.1f} ms of {total_ms:.1f} ms), more than {max_queries}"
+        )
+    threshold = current_app.config['QUERY_STATS_REPEAT_THRESHOLD']
+    for shape, count in stats['shapes'].most_common():
+        if count < threshold:
+            break
+        current_app.logger.warning(
+            f"Possible N+1 in {request.method} {request.path}: statement ran {count} times: {shape[:200]}"
+        )
+    return response
@@ -0,0 +1,76 @@
+"""
+Compact storage for note revisions.
+
+Each revision of a note is stored either as a snapshot (the whole content,
+zlib-compressed) or as a delta from the revision before it. A delta is a
+line diff: a list whose items are either [start, end], copying those lines
+of the previous version, or a string of new text. It is stored as
+compressed JSON, so a one-line edit of a long VLAN plan takes a few dozen
+bytes instead of another copy of the plan.
+
+Reading a revision means starting at the nearest snapshot at or before it
+and applying the deltas after that in order. A snapshot is written every
+SNAPSHOT_INTERVAL revisions, and whenever a delta would be no smaller than
+a snapshot, so at most SNAPSHOT_INTERVAL - 1 deltas are ever applied.
+"""
+
+import json
+import zlib
+from difflib import SequenceMatcher
+
+SNAPSHOT_INTERVAL = 20
+
+
+def snapshot(content):
+    """Compressed snapshot of content"""
+    return zlib.compress(content.encode('utf-8'), 9)
+
+
+def delta(old, new):
+    """Compressed delta that turns old into new"""
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    ops = []
+    matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif j1 < j2:
+            # 'replace' and 'insert'; a 'delete' is just a gap between copies
+            ops.append(''.join(new_lines[j1:j2]))
+    return zlib.compress(json.dumps(ops, separators=(',', ':')).encode('utf-8'), 9)
+
+
+def encode(previous, content, since_snapshot):
+    """(is_snapshot, data) for a revision with content following previous.
+
+    previous is the previous revision's content, or None for the first one,
+    and since_snapshot is the number of revisions since the last snapshot.
+    """
+    full = snapshot(content)
+    if previous is None or since_snapshot + 1 >= SNAPSHOT_INTERVAL:
+        return True, full
+    diff = delta(previous, content)
+    if len(diff) >= len(full):
+        return True, full
+    return False, diff
+
+
+def decode(revisions):
+    """Content of the last of revisions: (is_snapshot, data) pairs in order,
+    starting with a snapshot"""
+    content = None
+    for is_snapshot, data in revisions:
+        raw = zlib.decompress(data).decode('utf-8')
+        if is_snapshot:
+            content = raw
+            continue
+        old_lines = content.splitlines(keepends=True)
+        parts = []
+        for op in json.loads(raw):
+            if isinstance(op, str):
+                parts.append(op)
+            else:
+                parts.extend(old_lines[op[0]:op[1]])
+        content = ''.join(parts)
+    return content
@@ -0,0 +1,123 @@
+// Shared animation scheduler for the background animations.
+//
+// All animations run from one requestAnimationFrame loop instead of each
+// keeping its own loop or interval. The loop stops while the tab is hidden,
+// skips animations whose element is scrolled out of view, and does not run
+// at all when the user prefers reduced motion (each animation then draws a
+// single still frame). Animations that accept a quality level are scaled
+// down when the frame work takes longer than the budget and back up when
+// there is time to spare.
+class AnimationScheduler {
+    constructor() {
+        this.tasks = new Set();
+        this.running = false;
+        // Identifies the current loop so a stop and restart never leaves two running
+        this.loopId = 0;
+        this.lastTime = 0;
+        this.quality = 1;
+        // Milliseconds per frame the background animations may use together
+        this.budget = 4;
+        this.averageCost = 0;
+        this.framesSinceAdjust = 0;
+
+        this.reducedMotionQuery = window.matchMedia('(prefers-reduced-motion: reduce)');
+        this.reducedMotion = this.reducedMotionQuery.matches;
+        this.reducedMotionQuery.addEventListener('change', (e) => {
+            this.reducedMotion = e.matches;
+            if (this.reducedMotion) this.drawStill();
+            this.update();
+        });
+        document.addEventListener('visibilitychange', () => this.update());
+
+        this.observer = 'IntersectionObserver' in window
+            ? new IntersectionObserver((entries) => {
+                for (const entry of entries) {
+                    for (const task of this.tasks) {
+                        if (task.element === entry.target) task.visible = entry.isIntersecting;
+                    }
+                }
+                this.update();
+            })
+            : null;
+    }
+
+    // task: { frame(dt, now), element?, setQuality?(quality) }
+    // Returns a function that removes the task again.
+    add(task) {
+        task.visible = true;
+        this.tasks.add(task);
+        if (task.element && this.observer) this.observer.observe(task.element);
+        if (task.setQuality && this.quality < 1) task.setQuality(this.quality);
+        if (this.reducedMotion) task.frame(0, performance.now());
+        this.update();
+        return () => this.remove(task);
+    }
+
+    remove(task) {
+        this.tasks.delete(task);
+        if (task.element && this.observer) this.observer.unobserve(task.element);
+        this.update();
+    }
+
+    drawStill() {
+        const now = performance.now();
+        for (const task of this.tasks) task.frame(0, now);
+    }
+
+    hasActiveTasks() {
+        for (const task of this.tasks) {
+            if (task.visible) return true;
+        }
+        return false;
+    }
+
+    // Start or stop the loop to match visibility, motion preference and tasks
+    update() {
+        const shouldRun = !document.hidden && !this.reducedMotion && this.hasActiveTasks();
+        if (shouldRun && !this.running) {
+            this.running = true;
+            this.lastTime = 0;
+            const loopId = ++this.loopId;
+            requestAnimationFrame((now) => this.tick(now, loopId));
+        } else if (!shouldRun) {
+            this.running = false;
+        }
+    }
+
+    tick(now, loopId) {
+        if (!this.running || loopId !== this.loopId) return;
+        // Cap the step after a pause so nothing jumps across the screen
+        const dt = this.lastTime ? Math.min(now - this.lastTime, 100) : 16.7;
+        this.lastTime = now;
+
+        const start = performance.now();
+        for (const task of this.tasks) {
+            if (task.visible) task.frame(dt, now);
+        }
+        this.adapt(performance.now() - start);
+
+        requestAnimationFrame((next) => this.tick(next, loopId));
+    }
+
+    adapt(cost) {
+        this.averageCost = this.averageCost * 0.9 + cost * 0.1;
+        this.framesSinceAdjust++;
+        if (this.framesSinceAdjust < 60) return;
+
+        let quality = this.quality;
+        if (this.averageCost > this.budget) {
+            quality = Math.max(0.25, quality * 0.75);
+        } else if (this.averageCost < this.budget / 2) {
+            quality = Math.min(1, quality * 1.1);
+        }
+        if (quality !== this.quality) {
+            this.quality = quality;
+            this.framesSinceAdjust = 0;
+            for (const task of this.tasks) {
+                if (task.setQuality) task.setQuality(quality);
+            }
+        }
+    }
+}
+
+const animationScheduler = new AnimationScheduler();
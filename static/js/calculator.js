@@ -0,0 +1,385 @@
+// Helper function to validate IP/CIDR format; uses the server's rules when SubnetEngine is loaded
+function validateIpCidr(ipCidr) {
+    if (typeof SubnetEngine !== 'undefined') {
+        return SubnetEngine.validateIpCidr(ipCidr);
+    }
+    const regex = /^(\d{1,3}\.){3}\d{1,3}\/\d{1,2}$/;
+    if (!regex.test(ipCidr)) {
+        return "Invalid IP/CIDR format. Expected format: xxx.xxx.xxx.xxx/xx";
+    }
+    return null; // Valid
+}
+
+function createVlanInputs(num) {
+    let html = '';
+    for (let i = 0; i < num; i++) {
+        html += `<div class=\"row mb-3 align-items-end vlan-row\">\n            <div class=\"col-md-4\">\n                <label class=\"form-label\">VLAN ID<\/label>\n                <input type=\"number\" class=\"form-control vlan-id\" min=\"1\" max=\"4094\" required placeholder=\"e.g., 10\">\n            <\/div>\n            <div class=\"col-md-8\">\n                <label class=\"form-label\">VLAN Name<\/label>\n                <input type=\"text\" class=\"form-control vlan-name\" maxlength=\"50\" required placeholder=\"e.g., Marketing Department\">\n            <\/div>\n        <\/div>`;
+    }
+    return html;
+}
+
+// Smooth scrolling functions
+function scrollToCalculator() {
+    document.getElementById('calculator').scrollIntoView({ 
+        behavior: 'smooth',
+        block: 'start'
+    });
+}
+
+function scrollToFeatures() {
+    document.getElementById('features').scrollIntoView({ 
+        behavior: 'smooth',
+        block: 'start'
+    });
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    // VLAN/Host section toggle
+    document.getElementsByName('vlan_choice').forEach(radio => {
+        radio.addEventListener('change', function() {
+            if (this.value === 'yes') {
+                document.getElementById('vlan_section').style.display = 'block';
+                document.getElementById('host_section').style.display = 'none';
+            } else {
+                document.getElementById('vlan_section').style.display = 'none';
+                document.getElementById('host_section').style.display = 'block';
+            }
+        });
+    });
+
+    // Dynamic VLAN details
+    document.getElementById('num_vlans').addEventListener('input', function() {
+        const num = parseInt(this.value);
+        const detailsDiv = document.getElementById('vlan_details');
+        if (!isNaN(num) && num > 0 && num <= 64) {
+            detailsDiv.innerHTML = createVlanInputs(num);
+        } else {
+            detailsDiv.innerHTML = '';
+        }
+    });
+
+    // Read and check the form. Problems are passed to report(); returns null if the form is incomplete.
+    function readForm(report) {
+        const networkIp = document.getElementById('network_ip').value.trim();
+        const vlanChoice = document.querySelector('input[name="vlan_choice"]:checked').value;
+        const request = { network_ip: networkIp };
+
+        let errorMsg = validateIpCidr(networkIp);
+        if (errorMsg) {
+            report(errorMsg);
+            return null;
+        }
+
+        if (vlanChoice === 'yes') {
+            const numVlans = parseInt(document.getElementById('num_vlans').value);
+            if (isNaN(numVlans) || numVlans < 1 || numVlans > 64) {
+                report('Number of VLANs must be between 1 and 64.');
+                return null;
+            }
+            const vlanRows = document.querySelectorAll('.vlan-row');
+            let vlans = [];
+            for (let row of vlanRows) {
+                const id = row.querySelector('.vlan-id').value;
+                const name = row.querySelector('.vlan-name').value.trim();
+                if (!id || !name) {
+                    report('Please enter both VLAN ID and name for each VLAN.');
+                    return null;
+                }
+                if (!(Number(id) >= 1 && Number(id) <= 4094)) {
+                    report(`VLAN ID ${id} is out of range (1-4094)`);
+                    return null;
+                }
+                vlans.push({ vlan_id: id, vlan_name: name });
+            }
+            request['vlan_mode'] = true;
+            request['vlans'] = vlans;
+        } else {
+            const numHosts = parseInt(document.getElementById('num_hosts').value);
+            if (isNaN(numHosts) || numHosts < 1 || numHosts > 4094) {
+                report('Number of hosts must be between 1 and 4094.');
+                return null;
+            }
+            request['vlan_mode'] = false;
+            request['num_hosts'] = numHosts;
+        }
+        return request;
+    }
+
+    // Calculations of up to this many rows run in the browser; bigger ones go to the server
+    const LOCAL_MAX_ROWS = 4096;
+
+    function canCalculateLocally(request) {
+        if (typeof SubnetEngine === 'undefined') return false;
+        return (request.vlan_mode ? request.vlans.length : 1) <= LOCAL_MAX_ROWS;
+    }
+
+    // Run the calculation with SubnetEngine and show the rows straight away.
+    // Returns the error message if the calculation fails.
+    function calculateLocally(request) {
+        let rows;
+        try {
+            rows = request.vlan_mode
+                ? SubnetEngine.planVlanSubnets(request.network_ip, request.vlans)
+                : SubnetEngine.planHostSubnet(request.network_ip, request.num_hosts);
+        } catch (e) {
+            if (e instanceof SubnetEngine.SubnetError) return e.message;
+            throw e;
+        }
+        document.getElementById('resultsSection').style.display = 'block';
+        document.querySelector('#resultsSection .progress').style.display = 'none';
+        resetResultsTable(request.vlan_mode);
+        resultsTable.append(rows);
+        showExplanation(request.vlan_mode);
+        return null;
+    }
+
+    // Add a submitted browser calculation to the history (and auto-saved notes).
+    // The server queues the write, so this returns quickly and never blocks the results.
+    function recordCalculation(request, csrfToken) {
+        fetch('/calculations/record', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': csrfToken,
+                'X-Requested-With': 'XMLHttpRequest',
+            },
+            body: JSON.stringify(request)
+        }).catch(() => {});
+    }
+
+    // Results follow the form as the user types once the input is complete and valid
+    let liveTimer = null;
+    document.getElementById('subnetForm').addEventListener('input', function() {
+        clearTimeout(liveTimer);
+        liveTimer = setTimeout(() => {
+            const request = readForm(() => {});
+            if (request && !canCalculateLocally(request)) return;
+            // Hide results that no longer match the form
+            if (!request || calculateLocally(request)) {
+                document.getElementById('resultsSection').style.display = 'none';
+            }
+        }, 200);
+    });
+
+    // Form submission
+    document.getElementById('subnetForm').addEventListener('submit', function(e) {
+        e.preventDefault();
+        clearTimeout(liveTimer);
+        // Always get the CSRF token from the hidden input
+        const csrfToken = document.querySelector('input[name="csrf_token"]').value;
+        const payload = readForm(message => alert(message));
+        if (!payload) return;
+
+        const resultsSection = document.getElementById('resultsSection');
+        if (canCalculateLocally(payload)) {
+            const error = calculateLocally(payload);
+            if (error) {
+                alert(`Calculation error: ${error}`);
+                resultsSection.style.display = 'none';
+            } else {
+                resultsSection.scrollIntoView({ behavior: 'smooth', block: 'start' });
+                recordCalculation(payload, csrfToken);
+            }
+            return;
+        }
+
+        // Show results section and reset progress bar
+        resultsSection.style.display = 'block';
+        resultsSection.scrollIntoView({ behavior: 'smooth', block: 'start' });
+        
+        const progressBarContainer = document.querySelector('#resultsSection .progress');
+        progressBarContainer.style.display = 'block';
+        const progressBar = document.getElementById('calculationProgress');
+        progressBar.style.width = '0%';
+        progressBar.setAttribute('aria-valuenow', '0');
+        progressBar.textContent = '0%';
+        document.getElementById('calculationExplanation').style.display = 'none';
+        resetResultsTable(payload.vlan_mode);
+
+        // AJAX request
+        fetch('/calculate_subnets', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': csrfToken,
+                'X-Requested-With': 'XMLHttpRequest',
+            },
+            body: JSON.stringify(payload)
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.status === 'started' && data.task_id) {
+                pollProgress(data.task_id, payload.vlan_mode);
+            } else if (data.error || data.message) {
+                alert(`Error: ${data.message || data.error || 'An unknown error occurred.'}`);
+                resultsSection.style.display = 'none';
+                progressBarContainer.style.display = 'none';
+            }
+        })
+        .catch(() => {
+            alert('An error occurred. Please try again.');
+            resultsSection.style.display = 'none';
+            progressBarContainer.style.display = 'none';
+        });
+    });
+
+    // Polling function for progress
+    function pollProgress(taskId, vlanMode) {
+        const progressBar = document.getElementById('calculationProgress');
+        const resultsSection = document.getElementById('resultsSection');
+        const progressBarContainer = document.querySelector('#resultsSection .progress');
+        const intervalId = setInterval(() => {
+            fetch(`/get_progress/${taskId}`)
+                .then(response => {
+                    if (response.status === 404) {
+                        // The server no longer knows the task, so it will never finish
+                        return response.json().then(data => ({ progress: 0, error: data.message }));
+                    }
+                    return response.json();
+                })
+                .then(data => {
+                    progressBar.style.width = `${data.progress}%`;
+                    progressBar.setAttribute('aria-valuenow', data.progress);
+                    progressBar.textContent = `${data.progress}%`;
+
+                    if (data.error) {
+                        clearInterval(intervalId);
+                        alert(`Calculation error: ${data.error}`);
+                        resultsSection.style.display = 'none';
+                        progressBarContainer.style.display = 'none';
+                    } else if (data.progress === 100) {
+                        clearInterval(intervalId);
+                        updateResultsTable(data.results);
+                        showExplanation(vlanMode);
+                        progressBarContainer.style.display = 'none';
+                    } else if (data.results && data.results.length > 0) {
+                        updateResultsTable(data.results);
+                    }
+                })
+                .catch(error => {
+                    clearInterval(intervalId);
+                    alert('An error occurred while fetching progress. Please try again.');
+                    resultsSection.style.display = 'none';
+                    progressBarContainer.style.display = 'none';
+                });
+        }, 500);
+    }
+
+    // Results are rendered by a virtual table, so only the visible rows exist in the DOM
+    const HOST_COLUMNS = [
+        { key: 'network_id', label: 'Network ID', type: 'ip' },
+        { key: 'subnet_mask', label: 'Subnet Mask', type: 'ip' },
+        { key: 'broadcast', label: 'Broadcast', type: 'ip' },
+        { key: 'default_gateway', label: 'Default Gateway', type: 'ip' },
+        { key: 'usable_hosts', label: 'Usable Hosts', type: 'number' },
+        { key: 'first_usable', label: 'First Usable', type: 'ip' },
+        { key: 'last_usable', label: 'Last Usable', type: 'ip' },
+    ];
+    const VLAN_COLUMNS = [
+        { key: 'vlan_id', label: 'VLAN ID', type: 'number' },
+        { key: 'vlan_name', label: 'VLAN Name', type: 'text' },
+        ...HOST_COLUMNS,
+    ];
+    const resultsCount = document.getElementById('resultsCount');
+    const resultsTable = new VirtualTable({
+        scrollContainer: document.getElementById('resultsScroll'),
+        head: document.getElementById('resultsTableHead'),
+        body: document.getElementById('resultsTableBody'),
+        onViewChange: (shown, total) => {
+            resultsCount.textContent = shown === total
+                ? `${total.toLocaleString()} rows`
+                : `${shown.toLocaleString()} of ${total.toLocaleString()} rows`;
+        },
+    });
+    let filterTimer = null;
+    document.getElementById('resultsFilter').addEventListener('input', function() {
+        clearTimeout(filterTimer);
+        filterTimer = setTimeout(() => resultsTable.setFilter(this.value), 150);
+    });
+
+    function resetResultsTable(vlanMode) {
+        document.getElementById('resultsFilter').value = '';
+        resultsTable.setColumns(vlanMode ? VLAN_COLUMNS : HOST_COLUMNS);
+        resultsTable.clear();
+        resultsTable.setFilter('');
+    }
+
+    // Each progress poll returns every result so far; only the new ones are added
+    function updateResultsTable(results) {
+        resultsTable.append(results.slice(resultsTable.size));
+    }
+
+    function showExplanation(vlanMode) {
+        // Show explanation section and set content
+        const explanationSection = document.getElementById('calculationExplanation');
+        const explanationContent = document.getElementById('explanationContent');
+        if (vlanMode) {
+            explanationContent.innerHTML = `
+                <strong>VLAN Mode:</strong> The calculator divided your network into subnets based on the VLANs you specified. <br>
+                Each VLAN is assigned a unique subnet, ensuring isolation and proper address allocation. <br>
+                The subnet size is determined by the number of VLANs and the available address space in your network. <br>
+                <ul class='mb-0'>
+                  <li><strong>Step 1:</strong> The total address space is split into as many subnets as VLANs.</li>
+                  <li><strong>Step 2:</strong> Each subnet is assigned to a VLAN ID and name as you provided.</li>
+                  <li><strong>Step 3:</strong> Subnet masks and ranges are calculated to avoid overlap.</li>
+                </ul>
+                <span class='text-success'>This approach is ideal for segmenting networks by department, function, or security zone.</span>
+            `;
+        } else {
+            explanationContent.innerHTML = `
+                <strong>Host Mode:</strong> The calculator determines the smallest subnet size that can accommodate the number of hosts you entered. <br>
+                It then divides the network into as many subnets of that size as possible. <br>
+                <ul class='mb-0'>
+                  <li><strong>Step 1:</strong> Calculates the minimum subnet mask that supports your host count (including network and broadcast addresses).</li>
+                  <li><strong>Step 2:</strong> Splits the network into subnets of that size.</li>
+                  <li><strong>Step 3:</strong> Lists each subnet with its network address, mask, usable host range, and gateway.</li>
+                </ul>
+                <span class='text-success'>This is useful for planning networks where you know the number of devices per segment.</span>
+            `;
+        }
+        explanationSection.style.display = 'block';
+    }
+
+    // Download as CSV functionality
+    document.getElementById('downloadCsvBtn').addEventListener('click', function() {
+        if (resultsTable.size === 0) {
+            alert('No results to download. Please calculate subnets first.');
+            return;
+        }
+        const quote = value => '"' + String(value ?? '').replace(/"/g, '""') + '"';
+        // Rows are exported in the table's current filter and sort order
+        const lines = [resultsTable.columns.map(c => quote(c.label)).join(',')];
+        for (const row of resultsTable.viewRows()) {
+            lines.push(resultsTable.columns.map(c => quote(row[c.key])).join(','));
+        }
+        const csv = lines.join('\n') + '\n';
+        // Download CSV
+        const blob = new Blob([csv], { type: 'text/csv' });
+        const url = URL.createObjectURL(blob);
+        const a = document.createElement('a');
+        a.href = url;
+        a.download = 'subnet_results.csv';
+        document.body.appendChild(a);
+        a.click();
+        document.body.removeChild(a);
+        URL.revokeObjectURL(url);
+    });
+
+    // Clear button functionality
+    document.getElementById('clearBtn').addEventListener('click', function() {
+        // Reset form fields
+        document.getElementById('subnetForm').reset();
+        // Hide VLAN section and show host section by default
+        document.getElementById('vlan_section').style.display = 'none';
+        document.getElementById('host_section').style.display = 'block';
+        document.getElementById('vlan_details').innerHTML = '';
+        // Clear results
+        document.getElementById('resultsSection').style.display = 'none';
+        resultsTable.clear();
+        // Reset progress bar
+        const progressBar = document.getElementById('calculationProgress');
+        progressBar.style.width = '0%';
+        progressBar.setAttribute('aria-valuenow', '0');
+        progressBar.textContent = '0%';
+    });
+});
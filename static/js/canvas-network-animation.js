@@ -34,8 +34,12 @@ class NetworkAnimation {
             this.mouse.y = e.clientY;
         });
 
-        // Start animation
-        this.animate();
+        // Start animation; the shared scheduler pauses it in background tabs
+        animationScheduler.add({
+            element: this.canvas,
+            frame: () => this.animate(),
+            setQuality: (quality) => this.setQuality(quality)
+        });
     }
 
     resize() {
@@ -44,8 +48,13 @@ class NetworkAnimation {
     }
 
     createNodes() {
-        const nodeCount = Math.floor((window.innerWidth * window.innerHeight) / 15000);
-        for (let i = 0; i < nodeCount; i++) {
+        this.fullNodeCount = Math.floor((window.innerWidth * window.innerHeight) / 15000);
+        this.setNodeCount(this.fullNodeCount);
+    }
+
+    setNodeCount(count) {
+        this.nodes.length = Math.min(this.nodes.length, count);
+        while (this.nodes.length < count) {
             this.nodes.push({
                 x: Math.random() * this.canvas.width,
                 y: Math.random() * this.canvas.height,
@@ -56,6 +65,11 @@ class NetworkAnimation {
         }
     }
 
+    // Connections cost O(n^2), so fewer nodes is the main saving on slow devices
+    setQuality(quality) {
+        this.setNodeCount(Math.max(10, Math.round(this.fullNodeCount * quality)));
+    }
+
     drawNode(node) {
         this.ctx.beginPath();
         this.ctx.arc(node.x, node.y, node.radius, 0, Math.PI * 2);
@@ -136,9 +150,6 @@ class NetworkAnimation {
                 }
             }
         }
-
-        // Continue animation
-        requestAnimationFrame(() => this.animate());
     }
 
     updateTheme(isDark) {
@@ -8,6 +8,8 @@ class NetworkAnimation {
         this.lines = [];
         this.numNodes = 50;
         this.numLines = 30;
+        this.activeNodes = this.numNodes;
+        this.activeLines = this.numLines;
         
         this.init();
     }
@@ -23,8 +25,20 @@ class NetworkAnimation {
             this.createLine();
         }
         
-        // Start animation
-        this.animate();
+        // Start animation; the shared scheduler pauses it in background tabs
+        animationScheduler.add({
+            element: this.container,
+            frame: () => this.animate(),
+            setQuality: (quality) => this.setQuality(quality)
+        });
+    }
+
+    // Hide part of the nodes and lines to cut per-frame style updates
+    setQuality(quality) {
+        this.activeNodes = Math.max(10, Math.round(this.numNodes * quality));
+        this.activeLines = Math.max(5, Math.round(this.numLines * quality));
+        this.nodes.forEach((node, i) => { node.style.display = i < this.activeNodes ? '' : 'none'; });
+        this.lines.forEach((line, i) => { line.style.display = i < this.activeLines ? '' : 'none'; });
     }
     
     createNode() {
@@ -63,7 +77,7 @@ class NetworkAnimation {
     
     animate() {
         // Animate nodes
-        this.nodes.forEach(node => {
+        this.nodes.slice(0, this.activeNodes).forEach(node => {
             const x = parseFloat(node.style.left);
             const y = parseFloat(node.style.top);
             
@@ -77,7 +91,7 @@ class NetworkAnimation {
         });
         
         // Animate lines
-        this.lines.forEach(line => {
+        this.lines.slice(0, this.activeLines).forEach(line => {
             const x = parseFloat(line.style.left);
             const y = parseFloat(line.style.top);
             const angle = parseFloat(line.style.transform.match(/rotate\(([^)]+)\)/)[1]);
@@ -92,8 +106,6 @@ class NetworkAnimation {
             line.style.top = `${Math.max(0, Math.min(window.innerHeight, newY))}px`;
             line.style.transform = `rotate(${newAngle}deg)`;
         });
-        
-        requestAnimationFrame(() => this.animate());
     }
 }
 
@@ -23,6 +23,7 @@
   const SPEED = 0.4;
 
   let nodes = [];
+  let nodeCount = NODE_COUNT;
   let width = 0, height = 0;
 
   function themeColors() {
@@ -62,11 +63,18 @@
 
   function initNodes() {
     nodes = [];
-    for (let i = 0; i < NODE_COUNT; i++) {
+    for (let i = 0; i < nodeCount; i++) {
       nodes.push(randomNode());
     }
   }
 
+  // Fewer nodes when the shared scheduler reports frames over budget
+  function setQuality(quality) {
+    nodeCount = Math.max(8, Math.round(NODE_COUNT * quality));
+    nodes.length = Math.min(nodes.length, nodeCount);
+    while (nodes.length < nodeCount) nodes.push(randomNode());
+  }
+
   function draw() {
     const colors = themeColors();
     ctx.clearRect(0, 0, width, height);
@@ -129,7 +137,6 @@
   function animate() {
     update();
     draw();
-    requestAnimationFrame(animate);
   }
 
   // Listen for theme changes
@@ -145,5 +152,6 @@
   // Init
   resize();
   initNodes();
-  animate();
+  // Runs from the shared scheduler, which pauses it while the hero is off-screen
+  animationScheduler.add({ element: bgDiv, frame: animate, setQuality: setQuality });
 })(); 
\ No newline at end of file
@@ -0,0 +1,153 @@
+// Subnet calculations in the browser.
+//
+// A port of validate_ip_cidr, plan_host_subnet and plan_vlan_subnets from
+// app.py: the same validation messages, the same rows and the same errors,
+// so the calculator can show results as the user types instead of posting
+// to /calculate_subnets and polling for progress. benchmarks/subnet_engine.py
+// checks both implementations against a shared set of test vectors.
+const SubnetEngine = (function () {
+    class SubnetError extends Error {}
+
+    // Python's ipaddress private-network table, which validate_ip_cidr relies on
+    const PRIVATE_NETWORKS = [
+        ['0.0.0.0', 8], ['10.0.0.0', 8], ['127.0.0.0', 8], ['169.254.0.0', 16],
+        ['172.16.0.0', 12], ['192.0.0.0', 29], ['192.0.0.170', 31], ['192.0.2.0', 24],
+        ['192.168.0.0', 16], ['198.18.0.0', 15], ['198.51.100.0', 24], ['203.0.113.0', 24],
+        ['240.0.0.0', 4], ['255.255.255.255', 32],
+    ].map(([ip, prefix]) => [ipToInt(ip), prefix]);
+    const LOOPBACK = [ipToInt('127.0.0.0'), 8];
+    const LINK_LOCAL = [ipToInt('169.254.0.0'), 16];
+    const MULTICAST = [ipToInt('224.0.0.0'), 4];
+    const RESERVED = [ipToInt('240.0.0.0'), 4];
+
+    function ipToInt(ip) {
+        return ip.split('.').reduce((acc, octet) => acc * 256 + Number(octet), 0);
+    }
+
+    function intToIp(value) {
+        return [value >>> 24, (value >>> 16) & 255, (value >>> 8) & 255, value & 255].join('.');
+    }
+
+    function maskFor(prefix) {
+        return prefix === 0 ? 0 : (0xFFFFFFFF << (32 - prefix)) >>> 0;
+    }
+
+    function contains([base, prefix], address) {
+        return ((address & maskFor(prefix)) >>> 0) === base;
+    }
+
+    // Like ipaddress: a network is in a range when both its ends are
+    function networkIn(range, network, broadcast) {
+        return contains(range, network) && contains(range, broadcast);
+    }
+
+    // Returns null when valid, otherwise the same message as validate_ip_cidr
+    function validateIpCidr(ipCidr) {
+        if (!ipCidr || typeof ipCidr !== 'string') {
+            return 'IP/CIDR input is required';
+        }
+        ipCidr = ipCidr.trim();
+        if (!/^(\d{1,3}\.){3}\d{1,3}\/\d{1,2}$/.test(ipCidr)) {
+            return 'Invalid IP/CIDR format. Expected format: xxx.xxx.xxx.xxx/xx';
+        }
+        const [ip, cidrText] = ipCidr.split('/');
+        const cidr = parseInt(cidrText, 10);
+        if (cidr < 1 || cidr > 32) {
+            return 'CIDR must be between 1 and 32';
+        }
+        const octets = ip.split('.');
+        for (const octet of octets) {
+            if (octet.length > 1 && octet.startsWith('0')) {
+                return 'IP octets cannot have leading zeros';
+            }
+        }
+        for (const octet of octets) {
+            if (Number(octet) > 255) {
+                return `IP octet ${octet} must be between 0 and 255`;
+            }
+        }
+
+        const address = ipToInt(ip);
+        const network = (address & maskFor(cidr)) >>> 0;
+        if (network !== address) {
+            return `Invalid network address: ${ipCidr} has host bits set`;
+        }
+        const size = 2 ** (32 - cidr);
+        if (size < 2) {
+            return 'Network is too small for the specified CIDR';
+        }
+        if (size > 16777216) {
+            return 'Network is too large. Maximum allowed is a /8 network';
+        }
+        const broadcast = network + size - 1;
+        const isPrivate = PRIVATE_NETWORKS.some(range => networkIn(range, network, broadcast));
+        const isLoopback = networkIn(LOOPBACK, network, broadcast);
+        const isLinkLocal = networkIn(LINK_LOCAL, network, broadcast);
+        if (isPrivate && !isLoopback && !isLinkLocal) return null;
+        if (isLoopback) return 'Loopback addresses are not allowed';
+        if (isLinkLocal) return 'Link-local addresses are not allowed';
+        if (networkIn(MULTICAST, network, broadcast)) return 'Multicast addresses are not allowed';
+        if (networkIn(RESERVED, network, broadcast)) return 'Reserved addresses are not allowed';
+        return 'Only private network addresses are allowed';
+    }
+
+    function parseNetwork(networkIp) {
+        const error = validateIpCidr(networkIp);
+        if (error) throw new SubnetError(error);
+        const [ip, prefix] = networkIp.trim().split('/');
+        return { address: ipToInt(ip), prefix: parseInt(prefix, 10) };
+    }
+
+    // Same fields as subnet_details() in app.py
+    function subnetDetails(address, prefix) {
+        const size = 2 ** (32 - prefix);
+        const broadcast = address + size - 1;
+        const usableHosts = size > 2 ? size - 2 : 0;
+        const firstUsable = usableHosts > 0 ? intToIp(address + 1) : 'N/A';
+        const lastUsable = usableHosts > 0 ? intToIp(broadcast - 1) : 'N/A';
+        return {
+            network_id: intToIp(address),
+            subnet_mask: intToIp(maskFor(prefix)),
+            broadcast: intToIp(broadcast),
+            default_gateway: firstUsable,
+            usable_hosts: usableHosts,
+            first_usable: firstUsable,
+            last_usable: lastUsable,
+        };
+    }
+
+    function planVlanSubnets(networkIp, vlans) {
+        const network = parseNetwork(networkIp);
+        const requiredPrefix = network.prefix + Math.ceil(Math.log2(vlans.length));
+        if (requiredPrefix > 32) {
+            throw new SubnetError('Too many VLANs requested for the given network');
+        }
+        const available = 2 ** (requiredPrefix - network.prefix);
+        const step = 2 ** (32 - requiredPrefix);
+        return vlans.map((vlan, count) => {
+            if (count >= available) {
+                throw new SubnetError(`Not enough subnets available. Maximum possible: ${count}`);
+            }
+            return {
+                vlan_id: Number(vlan.vlan_id),
+                vlan_name: vlan.vlan_name,
+                ...subnetDetails(network.address + count * step, requiredPrefix),
+            };
+        });
+    }
+
+    function planHostSubnet(networkIp, numHosts) {
+        const network = parseNetwork(networkIp);
+        // As in app.py, the whole network is the answer whenever it is big enough
+        if (2 ** (32 - network.prefix) >= numHosts + 2) {
+            return [subnetDetails(network.address, network.prefix)];
+        }
+        throw new SubnetError(`Network is too small for ${numHosts} hosts`);
+    }
+
+    return { SubnetError, validateIpCidr, planVlanSubnets, planHostSubnet };
+})();
+
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = SubnetEngine;
+}
@@ -243,36 +243,41 @@ class SubnetSimulation {
     }
 
     startAnimation() {
-        let frame = 0;
-        this.animationInterval = setInterval(() => {
-            frame++;
-            
-            // Animate subnet groups
-            document.querySelectorAll('.subnet-group').forEach((group, index) => {
-                const delay = index * 0.5;
-                const time = (frame * 0.05) + delay;
-                const scale = 1 + Math.sin(time) * 0.05;
-                group.style.transform = `translate(-50%, -50%) scale(${scale})`;
-            });
-            
-            // Animate connection lines
-            document.querySelectorAll('.connection-line').forEach((line, index) => {
-                const delay = index * 0.3;
-                const time = (frame * 0.03) + delay;
-                const opacity = 0.3 + Math.sin(time) * 0.4;
-                line.style.opacity = opacity;
-            });
-            
-        }, 50);
+        // Driven by the shared scheduler; the phase advances at the pace of the
+        // old 50 ms interval but updates every frame
+        let start = null;
+        this.stopAnimation = animationScheduler.add({
+            element: document.getElementById('subnetGroups'),
+            frame: (dt, now) => {
+                if (start === null) start = now;
+                const frame = (now - start) / 50;
+
+                // Animate subnet groups
+                document.querySelectorAll('.subnet-group').forEach((group, index) => {
+                    const delay = index * 0.5;
+                    const time = (frame * 0.05) + delay;
+                    const scale = 1 + Math.sin(time) * 0.05;
+                    group.style.transform = `translate(-50%, -50%) scale(${scale})`;
+                });
+
+                // Animate connection lines
+                document.querySelectorAll('.connection-line').forEach((line, index) => {
+                    const delay = index * 0.3;
+                    const time = (frame * 0.03) + delay;
+                    const opacity = 0.3 + Math.sin(time) * 0.4;
+                    line.style.opacity = opacity;
+                });
+            }
+        });
     }
 
     resetSimulation() {
         this.isRunning = false;
         
         // Clear animation
-        if (this.animationInterval) {
-            clearInterval(this.animationInterval);
-            this.animationInterval = null;
+        if (this.stopAnimation) {
+            this.stopAnimation();
+            this.stopAnimation = null;
         }
         
         // Reset button state
@@ -0,0 +1,263 @@
+// Virtual-scrolling table for large result sets.
+//
+// Only the rows inside the scroll viewport (plus a few above and below) have
+// DOM nodes; two spacer rows stand in for everything else so the scrollbar
+// still reflects the full list. Rows are appended without touching those
+// already rendered, and sorting and filtering work on an index array, so
+// tens of thousands of rows stay responsive.
+class VirtualTable {
+    constructor({ scrollContainer, head, body, onViewChange = null, overscan = 10 }) {
+        this.scrollContainer = scrollContainer;
+        this.head = head;
+        this.body = body;
+        this.onViewChange = onViewChange;
+        this.overscan = overscan;
+
+        this.columns = [];
+        this.rows = [];
+        this.searchText = [];
+        this.view = [];
+        this.sortKey = null;
+        this.sortType = 'text';
+        this.sortDir = 1;
+        this.filter = '';
+
+        // Bumped whenever rows already in the view change position
+        this.viewVersion = 0;
+        this.rowHeight = 0;
+        this.renderedRange = null;
+        this.renderPending = false;
+        this.rowPool = [];
+
+        this.topSpacer = this.createSpacer();
+        this.bottomSpacer = this.createSpacer();
+
+        this.scrollContainer.addEventListener('scroll', () => this.scheduleRender(), { passive: true });
+        window.addEventListener('resize', () => this.scheduleRender());
+        this.head.addEventListener('click', (e) => {
+            const th = e.target.closest('th[data-key]');
+            if (th) this.sortBy(th.dataset.key);
+        });
+    }
+
+    createSpacer() {
+        const tr = document.createElement('tr');
+        tr.className = 'virtual-table-spacer';
+        tr.setAttribute('aria-hidden', 'true');
+        const td = document.createElement('td');
+        td.style.padding = '0';
+        td.style.border = '0';
+        tr.appendChild(td);
+        return tr;
+    }
+
+    // columns: [{ key, label, type: 'text' | 'number' | 'ip' }]
+    setColumns(columns) {
+        this.columns = columns;
+        if (!columns.some(c => c.key === this.sortKey)) this.sortKey = null;
+        this.rowPool = [];
+        this.topSpacer.firstChild.colSpan = columns.length;
+        this.bottomSpacer.firstChild.colSpan = columns.length;
+        this.renderHead();
+        this.body.replaceChildren(this.topSpacer, this.bottomSpacer);
+        this.viewVersion++;
+    }
+
+    renderHead() {
+        const tr = document.createElement('tr');
+        for (const column of this.columns) {
+            const th = document.createElement('th');
+            th.dataset.key = column.key;
+            th.scope = 'col';
+            th.className = 'sortable';
+            th.textContent = column.label;
+            if (column.key === this.sortKey) {
+                th.setAttribute('aria-sort', this.sortDir === 1 ? 'ascending' : 'descending');
+                th.classList.add(this.sortDir === 1 ? 'sorted-asc' : 'sorted-desc');
+            }
+            tr.appendChild(th);
+        }
+        this.head.replaceChildren(tr);
+    }
+
+    clear() {
+        this.rows = [];
+        this.searchText = [];
+        this.view = [];
+        this.viewVersion++;
+        this.scrollContainer.scrollTop = 0;
+        this.scheduleRender();
+    }
+
+    get size() {
+        return this.rows.length;
+    }
+
+    // Add rows to the end of the data set; existing rows are left alone
+    append(newRows) {
+        if (newRows.length === 0) return;
+        const start = this.rows.length;
+        const added = [];
+        for (let i = 0; i < newRows.length; i++) {
+            const row = newRows[i];
+            this.rows.push(row);
+            this.searchText.push(this.columns.map(c => String(row[c.key] ?? '')).join('\u0000').toLowerCase());
+            if (this.matches(start + i)) added.push(start + i);
+        }
+        if (this.sortKey === null) {
+            for (const index of added) this.view.push(index);
+        } else if (added.length > 0) {
+            this.view = this.mergeSorted(this.view, this.sortIndices(added));
+            this.viewVersion++;
+        }
+        this.scheduleRender();
+    }
+
+    setFilter(text) {
+        const filter = text.trim().toLowerCase();
+        if (filter === this.filter) return;
+        this.filter = filter;
+        this.rebuildView();
+    }
+
+    sortBy(key) {
+        if (this.sortKey === key) {
+            this.sortDir = -this.sortDir;
+        } else {
+            this.sortKey = key;
+            this.sortDir = 1;
+        }
+        const column = this.columns.find(c => c.key === key);
+        this.sortType = column ? column.type : 'text';
+        this.renderHead();
+        this.rebuildView();
+    }
+
+    matches(index) {
+        return this.filter === '' || this.searchText[index].includes(this.filter);
+    }
+
+    rebuildView() {
+        const view = [];
+        for (let i = 0; i < this.rows.length; i++) {
+            if (this.matches(i)) view.push(i);
+        }
+        this.view = this.sortKey === null ? view : this.sortIndices(view);
+        this.viewVersion++;
+        this.scrollContainer.scrollTop = 0;
+        this.scheduleRender();
+    }
+
+    sortKeyFor(index) {
+        const value = this.rows[index][this.sortKey];
+        if (this.sortType === 'number') {
+            const n = Number(value);
+            return isNaN(n) ? -Infinity : n;
+        }
+        if (this.sortType === 'ip') {
+            const parts = String(value).split('.');
+            if (parts.length !== 4) return -1;
+            return ((+parts[0] * 256 + +parts[1]) * 256 + +parts[2]) * 256 + +parts[3];
+        }
+        return String(value ?? '').toLowerCase();
+    }
+
+    compareKeys(a, b) {
+        return (a < b ? -1 : a > b ? 1 : 0) * this.sortDir;
+    }
+
+    // Sort row indices by the current column, keeping arrival order for ties
+    sortIndices(indices) {
+        const keyed = indices.map(index => [this.sortKeyFor(index), index]);
+        keyed.sort((a, b) => this.compareKeys(a[0], b[0]) || a[1] - b[1]);
+        return keyed.map(pair => pair[1]);
+    }
+
+    mergeSorted(existing, added) {
+        if (added.length === 0) return existing;
+        const merged = new Array(existing.length + added.length);
+        let i = 0, j = 0, k = 0;
+        let keyA = i < existing.length ? this.sortKeyFor(existing[i]) : null;
+        let keyB = this.sortKeyFor(added[j]);
+        while (i < existing.length && j < added.length) {
+            if (this.compareKeys(keyA, keyB) <= 0) {
+                merged[k++] = existing[i++];
+                if (i < existing.length) keyA = this.sortKeyFor(existing[i]);
+            } else {
+                merged[k++] = added[j++];
+                if (j < added.length) keyB = this.sortKeyFor(added[j]);
+            }
+        }
+        while (i < existing.length) merged[k++] = existing[i++];
+        while (j < added.length) merged[k++] = added[j++];
+        return merged;
+    }
+
+    // Rows in the current filter and sort order, e.g. for export
+    viewRows() {
+        return this.view.map(index => this.rows[index]);
+    }
+
+    scheduleRender() {
+        if (this.renderPending) return;
+        this.renderPending = true;
+        requestAnimationFrame(() => {
+            this.renderPending = false;
+            this.render();
+        });
+    }
+
+    rowElement(slot) {
+        let tr = this.rowPool[slot];
+        if (!tr) {
+            tr = document.createElement('tr');
+            for (let c = 0; c < this.columns.length; c++) tr.appendChild(document.createElement('td'));
+            this.rowPool[slot] = tr;
+        }
+        return tr;
+    }
+
+    render() {
+        if (this.columns.length === 0) return;
+        const total = this.view.length;
+        if (!this.rowHeight && total > 0) {
+            // Measure one real row; every row has the same single-line layout
+            const probe = this.rowElement(0);
+            this.fillRow(probe, this.rows[this.view[0]]);
+            this.body.insertBefore(probe, this.bottomSpacer);
+            const height = probe.getBoundingClientRect().height;
+            if (height) this.rowHeight = height;
+        }
+        const rowHeight = this.rowHeight || 37;
+        const viewport = this.scrollContainer.clientHeight || 600;
+        const first = Math.min(total, Math.max(0, Math.floor(this.scrollContainer.scrollTop / rowHeight) - this.overscan));
+        const last = Math.min(total, Math.ceil((this.scrollContainer.scrollTop + viewport) / rowHeight) + this.overscan);
+
+        this.topSpacer.style.height = `${first * rowHeight}px`;
+        this.bottomSpacer.style.height = `${(total - last) * rowHeight}px`;
+        if (this.onViewChange) this.onViewChange(total, this.rows.length);
+
+        // Rows appended below the viewport only change the bottom spacer
+        const range = this.renderedRange;
+        if (range && range.first === first && range.last === last && range.version === this.viewVersion) return;
+        this.renderedRange = { first, last, version: this.viewVersion };
+
+        const fragment = document.createDocumentFragment();
+        for (let i = first; i < last; i++) {
+            const tr = this.rowElement(i - first);
+            this.fillRow(tr, this.rows[this.view[i]]);
+            // Stripe by position in the list; nth-child striping would shift while scrolling
+            tr.classList.toggle('striped', i % 2 === 0);
+            fragment.appendChild(tr);
+        }
+        this.body.replaceChildren(this.topSpacer, fragment, this.bottomSpacer);
+    }
+
+    fillRow(tr, row) {
+        const cells = tr.cells;
+        for (let c = 0; c < this.columns.length; c++) {
+            const text = String(row[this.columns[c].key] ?? '');
+            if (cells[c].textContent !== text) cells[c].textContent = text;
+        }
+    }
+}
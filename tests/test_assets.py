@@ -0,0 +1,17 @@
+from assets import minify_js
+
+
+def test_minify_js_drops_comment_lines():
+    source = "// note\nfoo();\n\n/* block\n   comment */\n    bar();\n"
+    assert minify_js(source) == "foo();\nbar();"
+
+
+def test_minify_js_keeps_code_after_block_comment():
+    assert minify_js("/* x */ init();") == "init();"
+    assert minify_js("/* one */ /* two */ run();") == "run();"
+    assert minify_js("a();\n/* multi\n   line */ b();") == "a();\nb();"
+
+
+def test_minify_js_keeps_template_literals():
+    source = "const s = `\n  /* kept */ x\n`;\nf();"
+    assert minify_js(source) == "const s = `\n  /* kept */ x\n`;\nf();"
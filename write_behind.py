@@ -0,0 +1,195 @@
+"""
+Write-behind buffer for rows that do not need to be committed before the
+response goes out.
+
+Finished calculations (history rows and auto-saved notes) are queued in
+memory with write_buffer.add() and inserted later by a background thread,
+so a calculation never waits on a SQLite commit. The thread writes
+everything queued in one transaction, grouped into one executemany per
+table, when WRITE_BEHIND_MAX_ITEMS rows are waiting or every
+WRITE_BEHIND_INTERVAL seconds, and once more when the process exits.
+
+Rows still in memory are lost if the process is killed outright, which is
+acceptable for history and auto-save. When the database is locked or
+unavailable (OperationalError) the batch is logged and retried with the
+next one; if the queue grows past WRITE_BEHIND_MAX_PENDING the oldest rows
+are dropped. Any other failure is a problem with the rows themselves, so
+the batch is written again one table and then one row at a time, and only
+the rows that still fail are logged and dropped.
+
+Configuration:
+    WRITE_BEHIND_ENABLED      Buffer writes; when False, add() writes immediately (default: True)
+    WRITE_BEHIND_MAX_ITEMS    Queued rows that trigger an early write (default: 100)
+    WRITE_BEHIND_INTERVAL     Seconds between writes (default: 2)
+    WRITE_BEHIND_MAX_PENDING  Rows kept while the database is failing (default: 10000)
+"""
+
+import os
+import atexit
+import threading
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+
+
+class WriteBehindBuffer:
+    """Per-process queue of rows inserted in batches by a background thread"""
+
+    def __init__(self):
+        self.app = None
+        self.enabled = True
+        self.max_items = 100
+        self.interval = 2.0
+        self.max_pending = 10000
+        self._reset()
+        # A forked worker must not write rows its parent queued, and needs its own thread
+        os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self.flush)
+
+    def init_app(self, app):
+        app.config.setdefault('WRITE_BEHIND_ENABLED', True)
+        app.config.setdefault('WRITE_BEHIND_MAX_ITEMS', 100)
+        app.config.setdefault('WRITE_BEHIND_INTERVAL', 2.0)
+        app.config.setdefault('WRITE_BEHIND_MAX_PENDING', 10000)
+        self.app = app
+        self.enabled = app.config['WRITE_BEHIND_ENABLED']
+        self.max_items = int(app.config['WRITE_BEHIND_MAX_ITEMS'])
+        self.interval = float(app.config['WRITE_BEHIND_INTERVAL'])
+        self.max_pending = int(app.config['WRITE_BEHIND_MAX_PENDING'])
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        # Only one thread writes at a time so batches commit in order
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending = []
+        # Values of rows that must never be written, such as a deleted user's
+        self._discarded = []
+        self._flusher = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, model, **values):
+        """Queue one row for model's table, unless it matches a discard()"""
+        with self._lock:
+            if any(_matches(values, match) for match in self._discarded):
+                return
+            self._pending.append((model, values))
+            pending = len(self._pending)
+        if not self.enabled:
+            self.flush()
+            return
+        if self._flusher is None:
+            self._start_flusher()
+        if pending >= self.max_items:
+            self._wake.set()
+
+    def discard(self, **match):
+        """Drop queued rows whose values include match, e.g. discard(user_id=...), and every
+        such row added from now on; returns the number of queued rows dropped.
+
+        Waits for a flush in progress, so no matching row is written after this returns.
+        Rows still on their way (a calculation that finishes later) are dropped by add().
+        """
+        with self._flush_lock, self._lock:
+            self._discarded.append(match)
+            kept = [(model, values) for model, values in self._pending if not _matches(values, match)]
+            dropped = len(self._pending) - len(kept)
+            self._pending = kept
+        return dropped
+
+    def stop_discarding(self, **match):
+        """Accept rows matching an earlier discard(match) again"""
+        with self._lock:
+            if match in self._discarded:
+                self._discarded.remove(match)
+
+    def _start_flusher(self):
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._flush_periodically, name='write-behind', daemon=True)
+        self._flusher.start()
+
+    def _flush_periodically(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Insert every queued row in one transaction; returns the number written"""
+        if self.app is None:
+            return 0
+        with self._flush_lock:
+            with self._lock:
+                items, self._pending = self._pending, []
+            if not items:
+                return 0
+            # Group rows per table, keeping tables in the order they were first queued
+            batches = {}
+            for model, values in items:
+                batches.setdefault(model, []).append(values)
+
+            with self.app.app_context():
+                db = self.app.extensions['sqlalchemy']
+                try:
+                    for model, rows in batches.items():
+                        db.session.execute(insert(model), rows)
+                    db.session.commit()
+                    return len(items)
+                except OperationalError as e:
+                    # Locked or unavailable database: the same batch can succeed later
+                    db.session.rollback()
+                    self.app.logger.error(f"Write-behind flush of {len(items)} rows failed: {str(e)}")
+                    self._requeue(items)
+                    return 0
+                except Exception as e:
+                    db.session.rollback()
+                    self.app.logger.error(f"Write-behind flush of {len(items)} rows failed, "
+                                          f"retrying per table: {str(e)}")
+                    return self._write_separately(db, batches)
+                finally:
+                    db.session.remove()
+
+    def _write_separately(self, db, batches):
+        """Insert each table's rows in its own transaction, and a failing table's rows one at a
+        time; drops the rows that cannot be written and returns the number written"""
+        written = 0
+        chunks = list(batches.items())
+        while chunks:
+            model, rows = chunks.pop(0)
+            try:
+                db.session.execute(insert(model), rows)
+                db.session.commit()
+                written += len(rows)
+            except OperationalError as e:
+                db.session.rollback()
+                self.app.logger.error(f"Write-behind flush of {model.__tablename__} failed: {str(e)}")
+                chunks.insert(0, (model, rows))
+                self._requeue([(model, values) for model, rows in chunks for values in rows])
+                break
+            except Exception as e:
+                db.session.rollback()
+                if len(rows) > 1:
+                    chunks[:0] = [(model, [values]) for values in rows]
+                else:
+                    self.app.logger.error(f"Write-behind dropped a {model.__tablename__} row "
+                                          f"that cannot be written: {str(e)}")
+        return written
+
+    def _requeue(self, items):
+        with self._lock:
+            self._pending[:0] = items
+            overflow = len(self._pending) - self.max_pending
+            if overflow > 0:
+                del self._pending[:overflow]
+        if overflow > 0:
+            self.app.logger.error(f"Write-behind queue full, dropped {overflow} rows")
+
+
+def _matches(values, match):
+    return all(values.get(key) == value for key, value in match.items())
+
+
+write_buffer = WriteBehindBuffer()
@@ -0,0 +1,9 @@
+"""
+WSGI entry point for NetMaster.
+
+    gunicorn wsgi:app
+"""
+
+from app import create_app
+
+app = create_app()